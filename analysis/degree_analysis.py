@@ -0,0 +1,254 @@
+"""
+Degree distributions computed in the database. With per-node output the (name, degree) rows are streamed to CSV a
+batch at a time and the histogram is counted from the same stream, otherwise the histogram is aggregated server side so
+only (degree, frequency) pairs come back. Either way each degree is computed once.
+
+Projections:
+    package     Package nodes, DependsOn collapsed to distinct package -> package edges
+    version     PackageVersion nodes over HasResolvedDependencyOn
+    depends_on  Package in-degree counting every DependsOn edge (one per dependent version), what degree_distrib.py
+                has always reported
+
+The package in-degree over DependsOn and the distinct package out-degree are read from the in_degree and
+distinct_out_degree properties the inserts maintain, only the distinct dependent count is computed from the edges. On
+data loaded before the inserts maintained them (the Zenodo dump) the counters are missing, which is checked for before
+each database is read, and those degrees are computed from the edges instead until
+`python -m storage_interface.graph.degrees` has been run.
+
+The package projections can also be read from a GraphSnapshot (write_snapshot_degrees), which holds the same degrees.
+
+Histogram files are `degree,frequency` rows without a header, the input tail-estimation expects.
+Run as `python -m analysis.degree_analysis` to write every spec for both ecosystems to output/<ecosystem>/degrees.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from neo4j import Query
+from pydantic import BaseModel
+
+import storage_interface.graph.queries as cq
+from storage_interface.graph.neo4j_client import Neo4jClient
+from storage_interface.graph.snapshot import GraphSnapshot
+
+OUTPUT_DIR = Path(__file__).parent.joinpath("output")
+
+# The counters are only set once a Package gains a DependsOn edge on that side
+_PACKAGE_OUT = "coalesce(node.distinct_out_degree, 0)"
+_DEPENDS_ON_IN = "coalesce(node.in_degree, 0)"
+# The same degrees from the edges, for graphs without the counters
+_LIVE_PACKAGE_OUT = (
+    "SIZE(COLLECT {\n"
+    "    MATCH (node)-[:Released]->(:PackageVersion)-[:DependsOn]->(dependency:Package)\n"
+    "    RETURN DISTINCT dependency\n"
+    "})"
+)
+_LIVE_DEPENDS_ON_IN = "apoc.node.degree(node, '<DependsOn')"
+_PACKAGE_IN = (
+    "SIZE(COLLECT {\n"
+    "    MATCH (dependent:Package)-[:Released]->(:PackageVersion)-[:DependsOn]->(node)\n"
+    "    RETURN DISTINCT dependent\n"
+    "})"
+)
+_PACKAGE_MATCH = "MATCH (node:Package)"
+_VERSION_MATCH = "MATCH (package:Package)-[:Released]->(node:PackageVersion)"
+
+
+class DegreeSpec(BaseModel):
+    name: str
+    node_match: str  # Binds each node of the projection as `node`
+    degree: str  # Expression for the degree of `node`
+    node_name: str = "node.name"
+    live_degree: Optional[str] = None  # Set if degree reads the degree counters, computes it from the edges instead
+
+    def live(self) -> "DegreeSpec":
+        return self if self.live_degree is None else self.model_copy(update={"degree": self.live_degree})
+
+    def per_node_query(self) -> Query:
+        return Query(
+            f"{self.node_match}\n"
+            f"WITH {self.node_name} as name, {self.degree} as degree\n"
+            "RETURN name, degree\n"
+            "ORDER BY degree DESC"
+        )
+
+    def histogram_query(self) -> Query:
+        return Query(
+            f"{self.node_match}\n"
+            f"WITH {self.degree} as degree\n"
+            "RETURN degree, count(*) as frequency\n"
+            "ORDER BY degree"
+        )
+
+    def queries(self) -> Dict[str, Query]:
+        queries = {"per_node_query": self.per_node_query(), "histogram_query": self.histogram_query()}
+        if self.live_degree is not None:
+            live = self.live()
+            queries.update(live_per_node_query=live.per_node_query(), live_histogram_query=live.histogram_query())
+        return queries
+
+
+DEGREE_SPECS: Dict[str, DegreeSpec] = {
+    spec.name: spec for spec in [
+        DegreeSpec(name="package_in", node_match=_PACKAGE_MATCH, degree=_PACKAGE_IN),
+        DegreeSpec(
+            name="package_out", node_match=_PACKAGE_MATCH, degree=_PACKAGE_OUT, live_degree=_LIVE_PACKAGE_OUT
+        ),
+        DegreeSpec(
+            name="package_total", node_match=_PACKAGE_MATCH, degree=f"{_PACKAGE_IN} + {_PACKAGE_OUT}",
+            live_degree=f"{_PACKAGE_IN} + {_LIVE_PACKAGE_OUT}",
+        ),
+        DegreeSpec(
+            name="version_in", node_match=_VERSION_MATCH, node_name="package.name + '@' + node.version",
+            degree="apoc.node.degree(node, '<HasResolvedDependencyOn')",
+        ),
+        DegreeSpec(
+            name="version_out", node_match=_VERSION_MATCH, node_name="package.name + '@' + node.version",
+            degree="apoc.node.degree(node, 'HasResolvedDependencyOn>')",
+        ),
+        DegreeSpec(
+            name="version_total", node_match=_VERSION_MATCH, node_name="package.name + '@' + node.version",
+            degree="apoc.node.degree(node, 'HasResolvedDependencyOn')",
+        ),
+        DegreeSpec(
+            name="depends_on_in", node_match=_PACKAGE_MATCH, degree=_DEPENDS_ON_IN, live_degree=_LIVE_DEPENDS_ON_IN
+        ),
+    ]
+}
+
+
+# The package level specs a GraphSnapshot can answer, as each package's degree in package id order
+SNAPSHOT_DEGREES: Dict[str, Callable[[GraphSnapshot], np.ndarray]] = {
+    "package_in": lambda snapshot: snapshot.in_degrees(),
+    "package_out": lambda snapshot: snapshot.out_degrees(),
+    "package_total": lambda snapshot: snapshot.in_degrees() + snapshot.out_degrees(),
+    "depends_on_in": lambda snapshot: np.asarray(snapshot.depends_on_in_degrees),
+}
+
+
+def degree_counters_missing(client: Neo4jClient, database: str) -> bool:
+    """
+    True if some Package with DependsOn edges lacks the counter for that side, logging what to run about it
+    """
+    response = client._run_query(cq.MISSING_DEGREE_COUNTERS_QUERY, dict(), database, label="degree_counters_missing")
+    if len(response.values) == 0:
+        return False
+    logger.warning(
+        f"{database}: {response.values[0][0]} has DependsOn edges but no degree counters, computing degrees from the "
+        "edges. Run `python -m storage_interface.graph.degrees` to backfill them"
+    )
+    return True
+
+
+def degree_histogram(client: Neo4jClient, spec: DegreeSpec, database: str) -> List[Tuple[int, int]]:
+    """
+    (degree, number of nodes with that degree), ascending by degree
+    """
+    response = client._run_query(spec.histogram_query(), dict(), database, label=f"degree_{spec.name}_histogram")
+    return [(degree, frequency) for degree, frequency in response.values]
+
+
+def write_degrees(
+    client: Neo4jClient,
+    spec: DegreeSpec,
+    database: str,
+    per_node_path: Optional[Path],
+    histogram_path: Path,
+    batch_size: int = 50000,
+    counters_missing: Optional[bool] = None,
+) -> int:
+    """
+    Writes the histogram, and the per-node degrees if per_node_path is given. Returns the number of nodes.
+    counters_missing is checked with degree_counters_missing unless given
+    """
+    if spec.live_degree is not None:
+        if counters_missing is None:
+            counters_missing = degree_counters_missing(client, database)
+        if counters_missing:
+            spec = spec.live()
+    if per_node_path is None:
+        histogram = degree_histogram(client, spec, database)
+    else:
+        frequencies: Counter = Counter()
+        batches = client.stream_query_batches(
+            spec.per_node_query(), dict(), database, batch_size, label=f"degree_{spec.name}"
+        )
+        with per_node_path.open("w", newline="") as per_node_file:
+            for batch in batches:
+                chunk = pd.DataFrame(batch, columns=["name", "degree"])
+                chunk.to_csv(per_node_file, index=False, header=False)
+                frequencies.update(chunk["degree"].value_counts().to_dict())
+        histogram = sorted(frequencies.items())
+    return _write_histogram(histogram, histogram_path, f"{database} {spec.name}")
+
+
+def write_snapshot_degrees(
+    snapshot: GraphSnapshot, spec_name: str, per_node_path: Optional[Path], histogram_path: Path
+) -> int:
+    """
+    write_degrees for one of the SNAPSHOT_DEGREES specs, from the snapshot instead of the database. The files are
+    the same, per-node rows in descending degree order
+    """
+    degrees = SNAPSHOT_DEGREES[spec_name](snapshot).astype(np.int64)
+    if per_node_path is not None:
+        order = np.argsort(-degrees, kind="stable")
+        names = list(snapshot.package_names)
+        pd.DataFrame({"name": [names[idx] for idx in order], "degree": degrees[order]}).to_csv(
+            per_node_path, index=False, header=False
+        )
+    values, frequencies = np.unique(degrees, return_counts=True)
+    histogram = list(zip(values.tolist(), frequencies.tolist()))
+    return _write_histogram(histogram, histogram_path, f"{snapshot.meta['database']} {spec_name} (snapshot)")
+
+
+def _write_histogram(histogram: List[Tuple[int, int]], histogram_path: Path, label: str) -> int:
+    with histogram_path.open("w") as histogram_file:
+        histogram_file.writelines(f"{degree},{frequency}\n" for degree, frequency in histogram)
+    node_count = sum(frequency for _, frequency in histogram)
+    logger.info(f"{label}: {node_count} nodes, max degree {histogram[-1][0] if histogram else 0}")
+    return node_count
+
+
+def run(
+    client: Neo4jClient,
+    databases: Iterable[str] = ("npm", "pypi"),
+    spec_names: Optional[Iterable[str]] = None,
+    output_dir: Path = OUTPUT_DIR,
+    per_node: bool = True,
+    max_workers: Optional[int] = None,
+):
+    """
+    Runs every (database, spec) pair on a thread pool, the ecosystems live in separate databases so their queries
+    don't contend with each other
+    """
+    specs = [DEGREE_SPECS[name] for name in (spec_names or DEGREE_SPECS.keys())]
+    databases = list(databases)
+    jobs = []
+    with ThreadPoolExecutor(max_workers=max_workers or 2 * len(databases)) as pool:
+        for database in databases:
+            degrees_dir = output_dir.joinpath(database, "degrees")
+            degrees_dir.mkdir(parents=True, exist_ok=True)
+            counters_missing = degree_counters_missing(client, database)
+            for spec in specs:
+                jobs.append(pool.submit(
+                    write_degrees, client, spec, database,
+                    degrees_dir.joinpath(f"{spec.name}.csv") if per_node else None,
+                    degrees_dir.joinpath(f"{spec.name}_distrib.csv"),
+                    counters_missing=counters_missing,
+                ))
+        for job in as_completed(jobs):
+            job.result()
+
+
+def main():
+    neo_client = Neo4jClient.shared()
+    run(neo_client)
+    neo_client.metrics.log_summary()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,46 +1,47 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
-from neo4j import Query
-import pandas as pd
-
+from analysis.degree_analysis import DEGREE_SPECS, write_degrees, write_snapshot_degrees
 from storage_interface.graph.neo4j_client import Neo4jClient
+from storage_interface.graph.snapshot import GraphSnapshot, snapshot_arg
 
 OUTPUT_DIR = Path(__file__).parent.joinpath("output")
 
 
-def main():
+def main(snapshot_dir: Optional[Path] = None):
+    """
+    With snapshot_dir (`--snapshot [directory]`) the degrees are read from the snapshots exported there by
+    storage_interface.graph.snapshot, without connecting to Neo4J
+    """
     OUTPUT_DIR.mkdir(exist_ok=True)
     OUTPUT_DIR.joinpath("npm").mkdir(exist_ok=True)
     OUTPUT_DIR.joinpath("pypi").mkdir(exist_ok=True)
-    neo_client = Neo4jClient()
-    degree_query = Query(
-        "MATCH (package:Package)\n"
-        "CALL {\n"
-        "    WITH package\n"
-        "    WITH apoc.node.degree(package, '<DependsOn') as inDegree\n"
-        "    RETURN inDegree\n"
-        "}\n"
-        "RETURN package.name as name, inDegree\n"
-        "ORDER BY inDegree DESC"
-    )
-
-    # Get the in-degree for each package of the 2 ecosystems
-    npm_degs_raw = neo_client._run_query(degree_query, dict(), database="npm").values
-    pypi_degs_raw = neo_client._run_query(degree_query, dict(), database="pypi").values
-    # Parse query result to Dataframe where each row is: package name, in degree
-    npm_degs = pd.DataFrame(npm_degs_raw)
-    pypi_degs = pd.DataFrame(pypi_degs_raw)
-    # Write to csvs in output dir
-    npm_degs.to_csv(OUTPUT_DIR.joinpath("npm/degrees.csv"), index=False, header=False)
-    pypi_degs.to_csv(OUTPUT_DIR.joinpath("pypi/degrees.csv"), index=False, header=False)
-
-    # Gen in degree distributions for both ecosystems
-    npm_distrib = npm_degs[1].value_counts().sort_index()
-    pypi_distrib = pypi_degs[1].value_counts().sort_index()
-    # Write distribs to csvs in output dir
-    npm_distrib.to_csv(OUTPUT_DIR.joinpath("npm/deg_distrib.csv"), index=True, header=False)
-    pypi_distrib.to_csv(OUTPUT_DIR.joinpath("pypi/deg_distrib.csv"), index=True, header=False)
+    if snapshot_dir is not None:
+        for ecosystem in ["npm", "pypi"]:
+            write_snapshot_degrees(
+                GraphSnapshot(snapshot_dir.joinpath(ecosystem)), "depends_on_in",
+                OUTPUT_DIR.joinpath(f"{ecosystem}/degrees.csv"), OUTPUT_DIR.joinpath(f"{ecosystem}/deg_distrib.csv"),
+            )
+        return
+    neo_client = Neo4jClient.shared()
+
+    # For both ecosystems at once: stream each package's in-degree to degrees.csv (package name, in degree) and
+    # write the in-degree distribution, counted from the same stream, to deg_distrib.csv (degree, package count).
+    # The in-degree is read from the in_degree counters, or computed from the edges where they were never backfilled
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        jobs = [
+            pool.submit(
+                write_degrees, neo_client, DEGREE_SPECS["depends_on_in"], ecosystem,
+                OUTPUT_DIR.joinpath(f"{ecosystem}/degrees.csv"), OUTPUT_DIR.joinpath(f"{ecosystem}/deg_distrib.csv"),
+            )
+            for ecosystem in ["npm", "pypi"]
+        ]
+        for job in jobs:
+            job.result()
+    neo_client.metrics.log_summary()
 
 
 if __name__ == '__main__':
-    main()
+    main(snapshot_arg(sys.argv[1:]))
@@ -0,0 +1,108 @@
+"""
+Client side DISC (dependency isolating centrality) over a sparse package level adjacency matrix.
+
+For a package p with distinct out-degree d(p):
+    isolatingCoefficient(p) = |{dependents q of p : d(q) <= threshold}|
+    isolatingCentrality(p)  = d(p) * isolatingCoefficient(p)
+which is what the nested COLLECT Cypher in disc_sampling used to compute server side. Here the adjacency is built
+once, after which each threshold costs one sparse matrix-vector product.
+"""
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from scipy import sparse
+
+from storage_interface.graph.queries import DISC_THRESHOLD
+
+DISC_COLUMNS = ["package_name", "outDegree", "isolatingCoefficient", "isolatingCentrality"]
+
+
+class DiscEngine:
+    """
+    adjacency[i, j] == 1 iff some version of package i depends on package j, names[i] is the name of package i
+    """
+    def __init__(self, names: List[str], adjacency: sparse.csr_matrix):
+        self.names = names
+        self.adjacency = adjacency
+        self._out_degrees: Optional[np.ndarray] = None
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Builders ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    @classmethod
+    def from_edges(
+        cls, names: Iterable[str], edges: Iterable[Tuple[str, str]], chunk_size: int = 100000
+    ) -> "DiscEngine":
+        """
+        names should cover every package (packages without edges still get a 0 row), edges are (dependent,
+        dependency) pairs and may repeat. Edges are id-encoded chunk_size at a time so the name pairs are never
+        all held at once
+        """
+        names = list(names)
+        name_to_id = {name: idx for idx, name in enumerate(names)}
+        sources: List[np.ndarray] = []
+        targets: List[np.ndarray] = []
+        edges = iter(edges)
+        while True:
+            chunk = list(islice(edges, chunk_size))
+            if len(chunk) == 0:
+                break
+            sources.append(np.fromiter((name_to_id[name] for name, _ in chunk), dtype=np.int32, count=len(chunk)))
+            targets.append(np.fromiter((name_to_id[dep] for _, dep in chunk), dtype=np.int32, count=len(chunk)))
+        source_ids = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int32)
+        target_ids = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int32)
+        adjacency = sparse.coo_matrix(
+            (np.ones(len(source_ids), dtype=np.int8), (source_ids, target_ids)), shape=(len(names), len(names))
+        ).tocsr()
+        # Summing duplicates can leave counts > 1, DISC only cares whether an edge exists
+        adjacency.data[:] = 1
+        logger.info(f"DISC adjacency: {len(names)} packages, {adjacency.nnz} package level edges")
+        return cls(names, adjacency)
+
+    @classmethod
+    def from_backend(cls, backend, database: str) -> "DiscEngine":
+        """
+        Streams the package names and package level edges out of a GraphBackend (Neo4jClient or the embedded one)
+        """
+        return cls.from_edges(list(backend.package_names(database)), backend.package_dependencies(database))
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "DiscEngine":
+        """
+        Wraps a GraphSnapshot's DependsOn CSR arrays without copying the indices
+        """
+        package_count = snapshot.package_count
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(snapshot.depends_on_indices), dtype=np.int8), snapshot.depends_on_indices,
+             snapshot.depends_on_indptr),
+            shape=(package_count, package_count),
+        )
+        return cls(list(snapshot.package_names), adjacency)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Scores ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def out_degrees(self) -> np.ndarray:
+        if self._out_degrees is None:
+            self._out_degrees = np.diff(self.adjacency.indptr).astype(np.int64)
+        return self._out_degrees
+
+    def isolating_coefficients(self, threshold: int = DISC_THRESHOLD) -> np.ndarray:
+        """
+        For each package, how many of its dependents have an out-degree <= threshold
+        """
+        low_degree = (self.out_degrees() <= threshold).astype(np.int64)
+        return np.asarray(self.adjacency.T @ low_degree, dtype=np.int64)
+
+    def scores(self, threshold: int = DISC_THRESHOLD) -> pd.DataFrame:
+        """
+        Same columns as the old DISC Cypher, ordered by isolatingCentrality descending
+        """
+        out_degrees = self.out_degrees()
+        coefficients = self.isolating_coefficients(threshold)
+        frame = pd.DataFrame({
+            "package_name": self.names,
+            "outDegree": out_degrees,
+            "isolatingCoefficient": coefficients,
+            "isolatingCentrality": out_degrees * coefficients,
+        }, columns=DISC_COLUMNS)
+        return frame.sort_values("isolatingCentrality", ascending=False, kind="stable").reset_index(drop=True)
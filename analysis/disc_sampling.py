@@ -1,61 +1,74 @@
+import sys
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
-from neo4j import Query
 
+from analysis.disc_engine import DISC_THRESHOLD, DiscEngine
+from analysis.stratified_sampling import CypherPopulation, sample_dataframe, sample_population
 from storage_interface.graph.neo4j_client import Neo4jClient
+from storage_interface.graph.snapshot import GraphSnapshot, snapshot_arg
 
 OUTPUT_DIR = Path(__file__).parent.joinpath("output")
-DISC_QUERY = Query(
-    "MATCH (bp:Package)\n"
-    "WITH bp, SIZE(COLLECT{\n"
-    "    MATCH (bp)-[:Released]->(sv:PackageVersion)-[dd:DependsOn]->(deptarg:Package)\n"
-    "    WITH DISTINCT deptarg.name as dependency\n"
-    "    RETURN dependency\n"
-    "}) as bpOutDegree\n"
-    "WITH bp, bpOutDegree, SIZE(COLLECT {\n"
-    "    MATCH (np:Package)-[:Released]->(sv:PackageVersion)-[dd:DependsOn]->(bp)\n"
-    "    WITH np, SIZE(COLLECT{\n"
-    "        MATCH (np)-[:Released]->(sv:PackageVersion)-[dd:DependsOn]->(deptarg:Package)\n"
-    "        WITH DISTINCT deptarg.name as dependency\n"
-    "        RETURN dependency\n"
-    "    }) as npOutDegree\n"
-    "    WHERE npOutDegree <= 2 //Degree threshold\n"
-    "    RETURN distinct np.name\n"
-    "}) as isolatingCoefficient\n"
-    "RETURN bp.name as package, bpOutDegree, isolatingCoefficient, bpOutDegree*isolatingCoefficient as  isolatingCentrality\n"
-    "ORDER BY isolatingCentrality DESC"
-)
-
 
-def bin_and_sample(target: str) -> pd.DataFrame:
-    neo_client = Neo4jClient()
-    disc_raw = neo_client._run_query(DISC_QUERY, dict(), database=target).values
-    isolating_scores = pd.DataFrame(
-        disc_raw, columns=["package_name", "outDegree", "isolatingCoefficient", "isolatingCentrality"]
-    )
-
-    isolating_scores["bin"], bins = pd.cut(isolating_scores.isolatingCentrality, bins=20, retbins=True)
-    binned = isolating_scores.groupby(["bin"])
-    non_empty_groups = {group: data for group, data in binned if not data.empty}
+# The DISC properties the dep relation inserts maintain, only valid for queries.DISC_THRESHOLD. Packages without
+# DependsOn edges never get them and score 0, as in DiscEngine
+DISC_POPULATION = CypherPopulation(
+    match="MATCH (package:Package)",
+    columns={
+        "package_name": "package.name",
+        "outDegree": "coalesce(package.distinct_out_degree, 0)",
+        "isolatingCoefficient": "coalesce(package.isolating_coefficient, 0)",
+        "isolatingCentrality": "package.isolating_centrality",
+    },
+    value_column="isolatingCentrality",
+)
 
-    samples = []
-    for bin, entries in non_empty_groups.items():
-        sample = entries.sample(n=15, replace=True)
-        samples.append(sample)
 
-    sampled = pd.concat(samples).reset_index(drop=True)
+def bin_and_sample(
+    target: str,
+    threshold: int = DISC_THRESHOLD,
+    seed: Optional[int] = None,
+    edges: str = "equal_width",
+    server_side: bool = False,
+    snapshot: Optional[GraphSnapshot] = None,
+) -> pd.DataFrame:
+    """
+    Scores are computed client side by DiscEngine, from snapshot if given (without connecting to Neo4J), unless
+    server_side, which bins and samples the maintained DISC properties in the database
+    """
+    if server_side:
+        if threshold != DISC_THRESHOLD:
+            raise ValueError(f"The stored DISC scores use threshold {DISC_THRESHOLD}, not {threshold}")
+        sampled = sample_population(
+            Neo4jClient.shared(), DISC_POPULATION, target, edges=edges, seed=seed, server_side=True
+        )
+    else:
+        if snapshot is not None:
+            engine = DiscEngine.from_snapshot(snapshot)
+        else:
+            engine = DiscEngine.from_backend(Neo4jClient.shared(), target)
+        isolating_scores = engine.scores(threshold)
+        sampled = sample_dataframe(isolating_scores, "package_name", "isolatingCentrality", edges=edges, seed=seed)
     sampled.to_csv(OUTPUT_DIR.joinpath(f"{target}/sampled_disc_packs.csv"))
     return sampled
 
 
-def main():
+def main(snapshot_dir: Optional[Path] = None):
+    """
+    With snapshot_dir (`--snapshot [directory]`) the scores are computed from the snapshots exported there
+    """
     OUTPUT_DIR.mkdir(exist_ok=True)
     OUTPUT_DIR.joinpath("npm").mkdir(exist_ok=True)
     OUTPUT_DIR.joinpath("pypi").mkdir(exist_ok=True)
+    if snapshot_dir is not None:
+        for ecosystem in ["npm", "pypi"]:
+            bin_and_sample(ecosystem, snapshot=GraphSnapshot(snapshot_dir.joinpath(ecosystem)))
+        return
     npm_sampled = bin_and_sample("npm")
     pypi_sampled = bin_and_sample("pypi")
+    Neo4jClient.shared().metrics.log_summary()
 
 
 if __name__ == '__main__':
-    main()
+    main(snapshot_arg(sys.argv[1:]))
@@ -0,0 +1,101 @@
+"""
+SQLite store of full OSSF Scorecard reports, so a crashed scoring run resumes where it stopped and repos shared by the
+criticality and popularity samples are only scored once.
+
+Entries are keyed by (repo, revision, scorecard version), revision being the HEAD commit scorecard reports it scored
+or the report date when there is none. A lookup returns the newest report for the repo scored within the TTL.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from analysis.ossf_engine import OssfReport
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.joinpath("output", "ossf_scores.sqlite3")
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS ossf_score ("
+    "    repo TEXT NOT NULL, revision TEXT NOT NULL, scorecard_version TEXT NOT NULL, score REAL NOT NULL,"
+    "    report TEXT NOT NULL, scored_at REAL NOT NULL,"
+    "    PRIMARY KEY (repo, revision, scorecard_version))",
+    "CREATE INDEX IF NOT EXISTS ossf_score_recency ON ossf_score (repo, scored_at)",
+]
+
+
+def report_revision(report: OssfReport) -> str:
+    return report.repo.get("commit") or report.date
+
+
+def report_scorecard_version(report: OssfReport) -> str:
+    return report.scorecard.get("version") or "unknown"
+
+
+class OssfScoreCache:
+    """
+    Every put() commits, so each scored repo is checkpointed as soon as it finishes. Pass scorecard_version to only
+    reuse reports from that scorecard release, ttl_seconds=None keeps entries forever.
+    """
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_CACHE_PATH,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        scorecard_version: Optional[str] = None,
+    ):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.scorecard_version = scorecard_version
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    def __enter__(self) -> "OssfScoreCache":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _oldest_fresh(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds is not None else float("-inf")
+
+    def get(self, repo: str) -> Optional[OssfReport]:
+        """
+        repo in format: owner/repo. Newest report scored within the TTL, or None
+        """
+        query = "SELECT report FROM ossf_score WHERE repo = ? AND scored_at >= ?"
+        params = [repo.lower(), self._oldest_fresh()]
+        if self.scorecard_version is not None:
+            query += " AND scorecard_version = ?"
+            params.append(self.scorecard_version)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY scored_at DESC LIMIT 1", params).fetchone()
+        return OssfReport.model_validate_json(row[0]) if row is not None else None
+
+    def put(self, repo: str, report: OssfReport, scored_at: Optional[float] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ossf_score VALUES (?, ?, ?, ?, ?, ?)",
+                (repo.lower(), report_revision(report), report_scorecard_version(report), report.score,
+                 report.model_dump_json(), scored_at if scored_at is not None else time.time()),
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Deletes entries older than the TTL, returns how many were removed
+        """
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM ossf_score WHERE scored_at < ?", (self._oldest_fresh(),)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ossf_score").fetchone()[0]
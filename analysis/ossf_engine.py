@@ -0,0 +1,183 @@
+"""
+Runs OSSF Scorecard containers concurrently. One docker client is shared by a bounded pool of worker threads, each
+container gets a wall clock timeout after which it is killed, and results are yielded in the order they finish.
+
+Scorecard spends almost all of its time waiting on the GitHub API, so the pool can be sized well past the core count,
+the practical ceiling is the rate limit. Each container takes a permit from the shared GithubRateBudget, which picks
+the token it runs with, and the token's quota is re-read once the container exits.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Set
+
+import docker
+from docker.errors import DockerException
+from loguru import logger
+from pydantic import BaseModel
+from requests.exceptions import RequestException
+
+from api_clients.rate_limit import GithubRateBudget
+
+SCORECARD_IMAGE = "gcr.io/openssf/scorecard:stable"
+# Rough REST requests one scorecard run spends, reserved up front and corrected by a refresh once the run ends
+SCORECARD_REQUEST_COST = 150
+
+
+class OssfReport(BaseModel):
+    date: str
+    repo: dict
+    scorecard: dict
+    score: float
+    checks: List[dict]
+
+
+class ScorecardResult(BaseModel):
+    repo: str  # owner/repo
+    report: Optional[OssfReport] = None
+    error: Optional[str] = None
+    seconds: float
+    cached: bool = False
+
+    @property
+    def score(self) -> Optional[float]:
+        return self.report.score if self.report is not None else None
+
+
+class ScorecardTimeout(Exception):
+    pass
+
+
+class ScorecardEngine:
+    """
+    score() keeps at most 2 * workers repos in flight, so a long (or lazily produced) repo list is consumed as the
+    pool drains rather than all submitted up front. A repo that fails or times out comes back as a ScorecardResult
+    with error set, it never stops the run.
+    """
+    _shared_instance: Optional["ScorecardEngine"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout_seconds: float = 900.0,
+        image: str = SCORECARD_IMAGE,
+        budget: Optional[GithubRateBudget] = None,
+        request_cost: int = SCORECARD_REQUEST_COST,
+    ):
+        self.workers = workers or os.cpu_count() or 4
+        self.timeout_seconds = timeout_seconds
+        self.image = image
+        self.budget = budget if budget is not None else GithubRateBudget.shared()
+        self.request_cost = request_cost
+        self._docker_client: Optional[docker.DockerClient] = None
+        self._docker_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ScorecardEngine":
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+        return cls._shared_instance
+
+    @property
+    def docker_client(self) -> docker.DockerClient:
+        with self._docker_lock:
+            if self._docker_client is None:
+                # One pooled connection per worker so concurrent calls don't queue on the docker socket
+                self._docker_client = docker.from_env(max_pool_size=self.workers)
+        return self._docker_client
+
+    def close(self):
+        with self._docker_lock:
+            if self._docker_client is not None:
+                self._docker_client.close()
+                self._docker_client = None
+
+    def __enter__(self) -> "ScorecardEngine":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Runs ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def run_report(self, repo: str) -> OssfReport:
+        """
+        repo in format: owner/repo. Raises ScorecardTimeout if the container outlives timeout_seconds, the
+        container is removed either way
+        """
+        with self.budget.permit(self.request_cost) as token:
+            try:
+                return self._run_container(repo, token)
+            finally:
+                if not self.budget.refresh(token):
+                    self.budget.spend(token, self.request_cost)
+
+    def _run_container(self, repo: str, token: str) -> OssfReport:
+        logger.debug(f"Running Ossf Scorecard Docker Container against {repo}")
+        container = self.docker_client.containers.run(
+            image=self.image,
+            command=f"--repo={repo} --format=json",
+            environment={"GITHUB_AUTH_TOKEN": token},
+            detach=True,
+        )
+        try:
+            try:
+                exit_status = container.wait(timeout=self.timeout_seconds)
+            except RequestException:
+                container.kill()
+                raise ScorecardTimeout(f"Scorecard on {repo} ran past {self.timeout_seconds}s")
+            raw_output = container.logs(stdout=True, stderr=False)
+            if exit_status.get("StatusCode", 0) != 0:
+                stderr = container.logs(stdout=False, stderr=True).decode(errors="replace").strip()
+                raise RuntimeError(f"Scorecard on {repo} exited {exit_status['StatusCode']}: {stderr[-500:]}")
+        finally:
+            try:
+                container.remove(force=True)
+            except DockerException as err:
+                logger.warning(f"Could not remove scorecard container for {repo}: {err}")
+        return OssfReport.model_validate_json(raw_output)
+
+    def score_one(self, repo: str) -> ScorecardResult:
+        start = time.perf_counter()
+        try:
+            report = self.run_report(repo)
+        except Exception as err:
+            return ScorecardResult(repo=repo, error=f"{type(err).__name__}: {err}", seconds=time.perf_counter() - start)
+        return ScorecardResult(repo=repo, report=report, seconds=time.perf_counter() - start)
+
+    def score(self, repos: Iterable[str], cache=None) -> Iterator[ScorecardResult]:
+        """
+        Yields one ScorecardResult per repo as each container finishes, not in input order. Given an OssfScoreCache,
+        repos with a fresh cached report are yielded without running a container and every new report is stored as
+        soon as it arrives
+        """
+        repos = iter(repos)
+        max_in_flight = 2 * self.workers
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scorecard") as pool:
+            pending: Set[Future] = set()
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    repo = next(repos, None)
+                    if repo is None:
+                        exhausted = True
+                        break
+                    cached_report = cache.get(repo) if cache is not None else None
+                    if cached_report is not None:
+                        yield ScorecardResult(repo=repo, report=cached_report, seconds=0.0, cached=True)
+                        continue
+                    pending.add(pool.submit(self.score_one, repo))
+                if len(pending) == 0:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for job in done:
+                    result: ScorecardResult = job.result()
+                    if result.error is None:
+                        if cache is not None:
+                            cache.put(result.repo, result.report)
+                        logger.info(f"{result.repo} scored: {result.score} ({result.seconds:.0f}s)")
+                    else:
+                        logger.warning(f"OSSF on {result.repo} failed: {result.error}")
+                    yield result
@@ -0,0 +1,78 @@
+"""
+The criticality (DISC) and popularity OSSF studies only differ in which sample they score and where the results go,
+this is everything else: loading a sample, scoring it, and joining the scores back on to it.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import pandas as pd
+from loguru import logger
+from pydantic import BaseModel
+
+from analysis.ossf_cache import OssfScoreCache
+from analysis.ossf_engine import ScorecardEngine
+from analysis.repo_worklist import build_worklist
+from storage_interface.graph.neo4j_client import Neo4jClient
+
+OUTPUT_DIR = Path(__file__).parent.joinpath("output")
+
+
+class OssfStudy(BaseModel):
+    name: str
+    sample_file: str  # Written by the study's *_sampling.py
+    scores_file: str
+    bin_avgs_file: str
+
+
+STUDIES: Dict[str, OssfStudy] = {
+    study.name: study for study in [
+        OssfStudy(
+            name="disc", sample_file="sampled_disc_packs.csv", scores_file="disc-ossf-scores.csv",
+            bin_avgs_file="disc_bin_avgs.csv",
+        ),
+        OssfStudy(
+            name="popularity", sample_file="sampled_fork_packs.csv", scores_file="pop-ossf-scores.csv",
+            bin_avgs_file="pop_bin_avgs.csv",
+        ),
+    ]
+}
+
+
+def load_sample(study: OssfStudy, target: str) -> pd.DataFrame:
+    return pd.read_csv(OUTPUT_DIR.joinpath(f"{target}/{study.sample_file}"), index_col=0)
+
+
+def join_scores(sampled_packages_df: pd.DataFrame, ossf_scores: Iterable[Tuple[str, float]]) -> pd.DataFrame:
+    """
+    Sample rows with their package's ossf_score, rows for packages that weren't scored are dropped
+    """
+    ossf_scores_df = pd.DataFrame(list(ossf_scores), columns=["package_name", "ossf_score"]).set_index("package_name")
+    return sampled_packages_df.join(ossf_scores_df, "package_name", how="outer").dropna(subset=["ossf_score"])
+
+
+def score_sample(study: OssfStudy, target: str) -> pd.DataFrame:
+    neo_client = Neo4jClient.shared()
+    sampled_packages_df = load_sample(study, target)
+    # Fetch every sampled package's repo url at once, packages sharing a repo are scored once
+    repo_packages = build_worklist(neo_client, target, sampled_packages_df.package_name)
+
+    # Score the repos concurrently, collecting results as each container finishes. Reports are checkpointed to the
+    # score cache as they arrive, so a re-run only scores repos missing from it
+    logger.info(f"Scoring {len(repo_packages)} {target} repos...")
+    ossf_scores = []
+    with ScorecardEngine() as engine, OssfScoreCache() as cache:
+        for scored, result in enumerate(engine.score(repo_packages.keys(), cache=cache), start=1):
+            logger.info(f"{scored}/{len(repo_packages)} repos done")
+            if result.report is None:
+                continue
+            ossf_scores.extend((package_name, result.score) for package_name in repo_packages[result.repo])
+
+    return join_scores(sampled_packages_df, ossf_scores)
+
+
+def write_outputs(study: OssfStudy, target: str, scored_df: pd.DataFrame):
+    scored_df.to_csv(OUTPUT_DIR.joinpath(f"{target}/{study.scores_file}"))
+    # Average scores for each bin
+    bin_avgs: pd.DataFrame = scored_df.groupby("bin").mean(numeric_only=True)
+    # Save average scores to csv
+    bin_avgs.to_csv(OUTPUT_DIR.joinpath(f"{target}/{study.bin_avgs_file}"))
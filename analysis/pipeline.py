@@ -0,0 +1,302 @@
+"""
+Runs the analysis stages in dependency order, skipping any whose inputs haven't changed since they last succeeded.
+
+A stage's digest covers the source of the modules it runs and of every in-repo module they import, transitively (so
+the clients, caches and queries they use), the contents of its input files and, for stages that read the graph, a
+fingerprint of each database's node and relationship counts. It is recorded in output/pipeline_state.json when the
+stage succeeds, and the stage is skipped next time if the digest is the same and its outputs are still there. Stages
+start on a thread pool as soon as the stages they come after have finished. Sampling and the tail estimation bootstrap
+are seeded, so an unchanged graph re-samples identically and the scoring stages after it are skipped too.
+
+    python -m analysis.pipeline [stage ...] [--force]
+
+Naming stages runs those and the stages they come after, --force ignores the recorded digests. The fingerprint only
+counts, so a property-only change such as re-captured fork counts needs --force.
+"""
+import ast
+import hashlib
+import json
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from loguru import logger
+from pydantic import BaseModel
+
+REPO_ROOT = Path(__file__).parent.parent
+OUTPUT_DIR = Path(__file__).parent.joinpath("output")
+STATE_PATH = OUTPUT_DIR.joinpath("pipeline_state.json")
+ECOSYSTEMS = ["npm", "pypi"]
+SEED = 1
+
+
+class Stage(BaseModel):
+    name: str
+    run: Callable[[], Any]
+    after: List[str] = []  # Stages that must finish first
+    modules: List[str] = []  # Hashed into the digest along with the in-repo modules they import
+    inputs: List[Path] = []  # Files hashed into the digest
+    outputs: List[Path] = []  # Re-run if any are missing
+    reads_graph: bool = False  # Include the graph fingerprint of every ecosystem
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Stages ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def _for_each_ecosystem(path: str) -> List[Path]:
+    return [OUTPUT_DIR.joinpath(ecosystem, path) for ecosystem in ECOSYSTEMS]
+
+
+def _run_degrees():
+    from analysis import degree_distrib
+    degree_distrib.main()
+
+
+def _run_tail_estimation():
+    from analysis import tail
+    for ecosystem in ECOSYSTEMS:
+        tail.estimate_tail(
+            OUTPUT_DIR.joinpath(ecosystem, "deg_distrib.csv"), OUTPUT_DIR.joinpath(ecosystem, "tail_estim"),
+            tail.TailEstimationConfig(seed=SEED),
+        )
+
+
+def _run_disc_sampling():
+    from analysis import disc_sampling
+    for ecosystem in ECOSYSTEMS:
+        OUTPUT_DIR.joinpath(ecosystem).mkdir(parents=True, exist_ok=True)
+        disc_sampling.bin_and_sample(ecosystem, seed=SEED)
+
+
+def _run_popularity_sampling():
+    from analysis import popularity_sampling
+    for ecosystem in ECOSYSTEMS:
+        OUTPUT_DIR.joinpath(ecosystem).mkdir(parents=True, exist_ok=True)
+        popularity_sampling.bin_and_sample(ecosystem, seed=SEED)
+
+
+def _run_disc_scoring():
+    from analysis import disc_ossf_scoring
+    disc_ossf_scoring.main()
+
+
+def _run_popularity_scoring():
+    from analysis import popularity_ossf_scoring
+    popularity_ossf_scoring.main()
+
+
+_SCORING_MODULES = ["analysis.ossf_study", "analysis.ossf_engine", "analysis.repo_worklist"]
+_SAMPLING_MODULES = ["analysis.stratified_sampling"]
+
+STAGES: Dict[str, Stage] = {
+    stage.name: stage for stage in [
+        Stage(
+            name="degrees", run=_run_degrees, reads_graph=True,
+            modules=["analysis.degree_distrib", "analysis.degree_analysis"],
+            outputs=_for_each_ecosystem("degrees.csv") + _for_each_ecosystem("deg_distrib.csv"),
+        ),
+        Stage(
+            name="tail_estimation", run=_run_tail_estimation, after=["degrees"], modules=["analysis.tail"],
+            inputs=_for_each_ecosystem("deg_distrib.csv"), outputs=_for_each_ecosystem("tail_estim_adj_hill_plot.dat"),
+        ),
+        Stage(
+            name="disc_sampling", run=_run_disc_sampling, reads_graph=True,
+            modules=["analysis.disc_sampling", "analysis.disc_engine"] + _SAMPLING_MODULES,
+            outputs=_for_each_ecosystem("sampled_disc_packs.csv"),
+        ),
+        Stage(
+            name="disc_scoring", run=_run_disc_scoring, after=["disc_sampling"], reads_graph=True,
+            modules=["analysis.disc_ossf_scoring"] + _SCORING_MODULES,
+            inputs=_for_each_ecosystem("sampled_disc_packs.csv"),
+            outputs=_for_each_ecosystem("disc-ossf-scores.csv") + _for_each_ecosystem("disc_bin_avgs.csv"),
+        ),
+        Stage(
+            name="popularity_sampling", run=_run_popularity_sampling, reads_graph=True,
+            modules=["analysis.popularity_sampling"] + _SAMPLING_MODULES,
+            outputs=_for_each_ecosystem("sampled_fork_packs.csv"),
+        ),
+        Stage(
+            name="popularity_scoring", run=_run_popularity_scoring, after=["popularity_sampling"], reads_graph=True,
+            modules=["analysis.popularity_ossf_scoring"] + _SCORING_MODULES,
+            inputs=_for_each_ecosystem("sampled_fork_packs.csv"),
+            outputs=_for_each_ecosystem("pop-ossf-scores.csv") + _for_each_ecosystem("pop_bin_avgs.csv"),
+        ),
+    ]
+}
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Runner ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def _module_path(module: str) -> Optional[Path]:
+    # Resolved against the repo rather than with find_spec, which would import the parent packages
+    base = REPO_ROOT.joinpath(*module.split("."))
+    for path in (base.with_suffix(".py"), base.joinpath("__init__.py")):
+        if path.is_file():
+            return path
+    return None
+
+
+def _imported_modules(module: str, path: Path) -> Iterator[str]:
+    """
+    Every module path imports, including imports inside functions, and the packages above each of them. `from a import
+    b` yields a.b as well, whether b is a module or a name in a
+    """
+    package = module if path.name == "__init__.py" else module.rpartition(".")[0]
+    for node in ast.walk(ast.parse(path.read_text(), str(path))):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level > 0:
+                parts = package.split(".")
+                relative_to = ".".join(parts[:len(parts) - node.level + 1])
+                base = f"{relative_to}.{base}" if base else relative_to
+            names = [base] + [f"{base}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in names:
+            parts = name.split(".")
+            for end in range(1, len(parts) + 1):
+                yield ".".join(parts[:end])
+
+
+def source_closure(modules: Iterable[str]) -> List[Path]:
+    """
+    Source files of modules and of every in-repo module they import, transitively, sorted
+    """
+    found: Dict[str, Path] = dict()
+    to_visit = list(modules)
+    for module in to_visit:
+        if _module_path(module) is None:
+            raise ValueError(f"Stage module {module} isn't in the repo")
+    while to_visit:
+        module = to_visit.pop()
+        if module in found:
+            continue
+        path = _module_path(module)
+        if path is None:
+            continue
+        found[module] = path
+        to_visit.extend(_imported_modules(module, path))
+    return sorted(set(found.values()))
+
+
+def _hash_file(digest, path: Path):
+    digest.update(path.as_posix().encode())
+    if not path.exists():
+        digest.update(b"<missing>")
+        return
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+
+
+class PipelineRunner:
+    """
+    graph_fingerprint is called at most once per ecosystem per run, with the ecosystem's database name. It defaults to
+    the shared Neo4jClient's
+    """
+    def __init__(
+        self,
+        stages: Dict[str, Stage] = STAGES,
+        state_path: Path = STATE_PATH,
+        graph_fingerprint: Optional[Callable[[str], Dict[str, int]]] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.stages = stages
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self._graph_fingerprint = graph_fingerprint
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+        self._state: Dict[str, str] = json.loads(state_path.read_text()) if state_path.exists() else dict()
+
+    def graph_fingerprint(self) -> str:
+        with self._lock:
+            if self._fingerprint is None:
+                fingerprint = self._graph_fingerprint
+                if fingerprint is None:
+                    from storage_interface.graph.neo4j_client import Neo4jClient
+                    fingerprint = Neo4jClient.shared().graph_fingerprint
+                counts = {ecosystem: fingerprint(ecosystem) for ecosystem in ECOSYSTEMS}
+                logger.info(f"Graph fingerprint: {counts}")
+                self._fingerprint = json.dumps(counts, sort_keys=True)
+            return self._fingerprint
+
+    def digest(self, stage: Stage) -> str:
+        digest = hashlib.sha256(stage.name.encode())
+        for path in source_closure(stage.modules):
+            _hash_file(digest, path)
+        for path in stage.inputs:
+            _hash_file(digest, path)
+        if stage.reads_graph:
+            digest.update(self.graph_fingerprint().encode())
+        return digest.hexdigest()
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(self._state, indent=2, sort_keys=True))
+
+    def _execute(self, stage: Stage, force: bool) -> str:
+        stage_digest = self.digest(stage)
+        if not force and self._state.get(stage.name) == stage_digest and all(path.exists() for path in stage.outputs):
+            logger.info(f"{stage.name} is up to date, skipping")
+            return "skipped"
+        logger.info(f"Running {stage.name}")
+        stage.run()
+        with self._lock:
+            self._state[stage.name] = stage_digest
+            self._save_state()
+        logger.info(f"{stage.name} done")
+        return "ran"
+
+    def _with_prerequisites(self, names: Iterable[str]) -> Set[str]:
+        selected: Set[str] = set()
+        to_visit = list(names)
+        while to_visit:
+            name = to_visit.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}, expected one of {list(self.stages)}")
+            if name not in selected:
+                selected.add(name)
+                to_visit.extend(self.stages[name].after)
+        return selected
+
+    def run(self, stage_names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, str]:
+        """
+        Returns each selected stage's outcome: ran, skipped, failed, or blocked (something it comes after failed)
+        """
+        waiting = self._with_prerequisites(stage_names or self.stages.keys())
+        outcomes: Dict[str, str] = dict()
+        running: Dict[Future, str] = dict()
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(waiting) or 1) as pool:
+            while waiting or running:
+                for name in sorted(waiting):
+                    after = self.stages[name].after
+                    if any(outcomes.get(dependency) in ("failed", "blocked") for dependency in after):
+                        outcomes[name] = "blocked"
+                        waiting.discard(name)
+                    elif all(dependency in outcomes for dependency in after):
+                        running[pool.submit(self._execute, self.stages[name], force)] = name
+                        waiting.discard(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for job in done:
+                    name = running.pop(job)
+                    try:
+                        outcomes[name] = job.result()
+                    except Exception as err:
+                        logger.exception(f"{name} failed: {err}")
+                        outcomes[name] = "failed"
+        logger.info(f"Pipeline finished: {outcomes}")
+        return outcomes
+
+
+def main():
+    args = sys.argv[1:]
+    force = "--force" in args
+    PipelineRunner().run([arg for arg in args if arg != "--force"], force=force)
+
+
+if __name__ == '__main__':
+    main()
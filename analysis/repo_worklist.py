@@ -0,0 +1,46 @@
+"""
+Turns a sample of package names into the list of GitHub repos to score: every repo_url is fetched in one UNWIND query,
+canonicalized to owner/repo with a single vectorized regex pass, and packages sharing a repo are grouped so the repo
+is scored once.
+"""
+from typing import Dict, Iterable, List
+
+import pandas as pd
+from loguru import logger
+
+# owner/repo straight after github.com/, stopping at the next path segment, query string or fragment. Covers the
+# https, http, ssh://git@, git://, git+ and user@ forms GithubClient._repo_url_to_identifier handles
+_GITHUB_REPO = r"github\.com/(?P<owner>[^/\s#?]+)/(?P<repo>[^/\s#?]+)"
+
+
+def canonical_repo_ids(repo_urls: pd.Series) -> pd.Series:
+    """
+    Lowercased owner/repo for each url, NA where the url is missing or not on GitHub. Unlike
+    _repo_url_to_identifier, deeper paths (tree/..., issues, subdirectories) always collapse to the repo
+    """
+    parts = repo_urls.astype("string").str.lower().str.extract(_GITHUB_REPO)
+    repos = parts["repo"].str.replace(r"\.git$", "", regex=True)
+    repo_ids = parts["owner"] + "/" + repos
+    return repo_ids.where(repos.str.len() > 0)
+
+
+def build_worklist(backend, database: str, package_names: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    {owner/repo: [package names]} for the sampled packages that have a GitHub repo, in first-seen order.
+    backend is a GraphBackend
+    """
+    names = pd.Series(list(package_names), dtype="string").str.lower().drop_duplicates()
+    repo_urls = backend.package_repo_urls(names, database)
+    packages = pd.DataFrame({"package_name": names, "repo_url": names.map(repo_urls)})
+    packages["repo_id"] = canonical_repo_ids(packages["repo_url"])
+
+    scorable = packages.dropna(subset=["repo_id"])
+    worklist = {
+        repo_id: list(package_group) for repo_id, package_group in scorable.groupby("repo_id", sort=False).package_name
+    }
+    missing = len(names) - len(repo_urls)
+    logger.info(
+        f"{database}: {len(names)} sampled packages, {missing} not in the graph, "
+        f"{len(packages) - len(scorable) - missing} without a GitHub repo, {len(worklist)} repos to score"
+    )
+    return worklist
@@ -0,0 +1,162 @@
+"""
+Job queue mode for the OSSF studies, on RQ. The enqueuer turns a study's sample into one scoring job per repo, any
+number of workers on any machine that can reach Redis consume them, each report lands in a Redis hash as its job
+finishes, and the collector rebuilds the same CSVs the sequential *_ossf_scoring.py scripts write.
+
+    python -m analysis.scoring_queue enqueue disc npm
+    python -m analysis.scoring_queue worker              (on each node, once per worker wanted)
+    python -m analysis.scoring_queue collect disc npm
+
+Collecting can happen at any point, repos without a result yet are left out and reported. Re-running enqueue only
+queues repos that have no result. `python -m analysis.scoring_queue local disc npm` does all three in-process
+against fakeredis (pip install fakeredis) with jobs run synchronously, for trying the pipeline without a Redis server.
+"""
+import hashlib
+import json
+import sys
+from typing import Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+from redis import Redis
+from rq import Queue, Retry, SimpleWorker, get_current_job
+
+from analysis.ossf_cache import OssfScoreCache
+from analysis.ossf_engine import OssfReport, ScorecardEngine
+from analysis.ossf_study import STUDIES, join_scores, load_sample, write_outputs
+from analysis.repo_worklist import build_worklist
+from storage_interface.config import RedisConfig
+from storage_interface.graph.neo4j_client import Neo4jClient
+
+QUEUE_NAME = "ossf-scoring"
+_local_connection: Optional[Redis] = None
+
+
+def connect(local: bool = False) -> Redis:
+    """
+    Redis from RedisConfig, or with local=True a process wide fakeredis stand-in
+    """
+    global _local_connection
+    if not local:
+        config = RedisConfig()
+        return Redis(host=config.host, port=config.port, db=config.db, password=config.password)
+    if _local_connection is None:
+        try:
+            from fakeredis import FakeStrictRedis
+        except ImportError as err:
+            raise ImportError("Local queue mode requires fakeredis, install it with: pip install fakeredis") from err
+        _local_connection = FakeStrictRedis()
+    return _local_connection
+
+
+def get_queue(connection: Redis, name: str = QUEUE_NAME, local: bool = False) -> Queue:
+    # Synchronous in local mode, enqueue() runs the job before returning
+    return Queue(name, connection=connection, is_async=not local)
+
+
+def _key(kind: str, study_name: str, target: str) -> str:
+    return f"ossf:{kind}:{study_name}:{target}"
+
+
+def _job_id(study_name: str, target: str, repo: str) -> str:
+    # RQ job ids only allow letters, digits, - and _
+    return f"ossf-{study_name}-{target}-{hashlib.sha1(repo.encode()).hexdigest()[:16]}"
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Jobs ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def score_repo_job(study_name: str, target: str, repo: str):
+    """
+    Scores repo, reusing this node's score cache, and stores the report in the study's results hash. Raising lets
+    RQ retry it
+    """
+    with OssfScoreCache() as cache:
+        report = cache.get(repo)
+        if report is None:
+            report = ScorecardEngine.shared().run_report(repo)
+            cache.put(repo, report)
+    get_current_job().connection.hset(_key("results", study_name, target), repo, report.model_dump_json())
+    logger.info(f"{repo} scored: {report.score}")
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Enqueue/Collect ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def enqueue_study(study_name: str, target: str, queue: Queue, retries: int = 2) -> int:
+    """
+    Queues a job for every repo in the sample without a result, returns how many were queued
+    """
+    study = STUDIES[study_name]
+    connection = queue.connection
+    repo_packages = build_worklist(Neo4jClient.shared(), target, load_sample(study, target).package_name)
+    # The collector maps each repo's score back on to the packages that share it
+    connection.delete(_key("expected", study_name, target))
+    if len(repo_packages) > 0:
+        connection.hset(
+            _key("expected", study_name, target),
+            mapping={repo: json.dumps(package_names) for repo, package_names in repo_packages.items()},
+        )
+    scored = {repo.decode() for repo in connection.hkeys(_key("results", study_name, target))}
+    queued = 0
+    for repo in repo_packages:
+        if repo in scored:
+            continue
+        queue.enqueue(
+            score_repo_job, study_name, target, repo,
+            job_id=_job_id(study_name, target, repo),
+            job_timeout=ScorecardEngine.shared().timeout_seconds + 300,
+            retry=Retry(max=retries, interval=[60, 300]) if retries > 0 else None,
+        )
+        queued += 1
+    logger.info(f"Queued {queued} {study_name} {target} repos, {len(repo_packages) - queued} already scored")
+    return queued
+
+
+def collect_study(study_name: str, target: str, connection: Redis) -> pd.DataFrame:
+    """
+    Joins every result so far on to the sample and writes the study's output CSVs
+    """
+    study = STUDIES[study_name]
+    expected: Dict[str, List[str]] = {
+        repo.decode(): json.loads(package_names)
+        for repo, package_names in connection.hgetall(_key("expected", study_name, target)).items()
+    }
+    results = {
+        repo.decode(): OssfReport.model_validate_json(report)
+        for repo, report in connection.hgetall(_key("results", study_name, target)).items()
+    }
+    ossf_scores = [
+        (package_name, report.score)
+        for repo, report in results.items() if repo in expected
+        for package_name in expected[repo]
+    ]
+    outstanding = len(expected.keys() - results.keys())
+    logger.info(f"Collected {len(expected) - outstanding}/{len(expected)} {study_name} {target} repos")
+    scored_df = join_scores(load_sample(study, target), ossf_scores)
+    write_outputs(study, target, scored_df)
+    return scored_df
+
+
+def work(queue_names: List[str], connection: Redis):
+    """
+    A SimpleWorker runs jobs in its own process, so the docker client and rate limit budget carry across jobs
+    """
+    queues = [Queue(name, connection=connection) for name in queue_names]
+    SimpleWorker(queues, connection=connection).work()
+
+
+def main():
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "worker":
+        work(args or [QUEUE_NAME], connect())
+    elif command == "enqueue":
+        enqueue_study(args[0], args[1], get_queue(connect()))
+    elif command == "collect":
+        collect_study(args[0], args[1], connect())
+    elif command == "local":
+        connection = connect(local=True)
+        enqueue_study(args[0], args[1], get_queue(connection, local=True), retries=0)
+        collect_study(args[0], args[1], connection)
+    else:
+        raise ValueError(f"Unknown command {command}, expected one of: worker, enqueue, collect, local")
+
+
+if __name__ == '__main__':
+    main()
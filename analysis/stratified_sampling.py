@@ -0,0 +1,278 @@
+"""
+Stratified sampling shared by the DISC and popularity studies: split a scored population into value bins and draw up to
+per_bin packages from each, without replacement.
+
+Bin edges are either equal width over [min, max], the same edges pd.cut(bins=n) gives, or quantiles. Every row gets a
+key from a seeded hash of its name, and a bin's sample is the per_bin rows with the smallest keys (a bottom-k sample).
+That draw is uniform, reproducible for a seed whatever order the rows arrive in, and mergeable batch by batch, so a
+population is sampled in one streaming pass holding only the current batch plus bins * per_bin rows.
+
+With server_side=True each bin's sample is drawn by its own Cypher query, filtered to the bin and ordered by an md5 of
+the seed and name with a LIMIT, so only the sampled rows leave the database. Samples are reproducible within a mode,
+but the two modes hash differently so they draw different packages for the same seed.
+"""
+import hashlib
+import secrets
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from neo4j import Query
+from pydantic import BaseModel
+
+from storage_interface.graph.neo4j_client import Neo4jClient
+
+DEFAULT_BINS = 20
+DEFAULT_PER_BIN = 15
+EDGE_METHODS = ("equal_width", "quantile")
+
+
+def equal_width_edges(minimum: float, maximum: float, bins: int = DEFAULT_BINS) -> np.ndarray:
+    """
+    What pd.cut(values, bins) uses: bins + 1 evenly spaced edges, the first nudged down by 0.1% of the range so the
+    minimum falls inside the right-closed first bin
+    """
+    if minimum == maximum:
+        adjust = 0.001 * abs(minimum) if minimum != 0 else 0.001
+        return np.linspace(minimum - adjust, maximum + adjust, bins + 1)
+    edges = np.linspace(minimum, maximum, bins + 1)
+    edges[0] -= (maximum - minimum) * 0.001
+    return edges
+
+
+def quantile_edges(values: np.ndarray, bins: int = DEFAULT_BINS) -> np.ndarray:
+    """
+    Edges putting roughly equal numbers of values in each bin, repeated edges (heavily tied values) are merged so
+    there may be fewer bins than asked for
+    """
+    return np.unique(np.quantile(np.asarray(values, dtype=float), np.linspace(0, 1, bins + 1)))
+
+
+class StratifiedSampler:
+    """
+    Bins are right-closed, (edges[i], edges[i + 1]], like pd.cut. include_lowest also puts values equal to edges[0]
+    in the first bin, needed for quantile edges. A seed of None draws a different sample each run
+    """
+    def __init__(
+        self, edges: np.ndarray, per_bin: int = DEFAULT_PER_BIN, seed: Optional[int] = None,
+        include_lowest: bool = False,
+    ):
+        self.edges = np.asarray(edges, dtype=float)
+        self.per_bin = per_bin
+        self.seed = seed
+        self.include_lowest = include_lowest
+        # hash_pandas_object takes a 16 character key, the server side queries hash with it too
+        self.hash_key = hashlib.md5(str(seed).encode()).hexdigest()[:16] if seed is not None else secrets.token_hex(8)
+        self.labels = pd.cut(pd.Series([], dtype=float), self.edges, include_lowest=include_lowest).cat.categories
+
+    @classmethod
+    def equal_width(
+        cls, minimum: float, maximum: float, bins: int = DEFAULT_BINS, per_bin: int = DEFAULT_PER_BIN,
+        seed: Optional[int] = None,
+    ) -> "StratifiedSampler":
+        return cls(equal_width_edges(minimum, maximum, bins), per_bin, seed)
+
+    @classmethod
+    def from_quantiles(
+        cls, values: np.ndarray, bins: int = DEFAULT_BINS, per_bin: int = DEFAULT_PER_BIN, seed: Optional[int] = None,
+    ) -> "StratifiedSampler":
+        return cls(quantile_edges(values, bins), per_bin, seed, include_lowest=True)
+
+    def bin_indices(self, values) -> np.ndarray:
+        """
+        Bin of each value, -1 for values outside every bin (or NaN)
+        """
+        values = np.asarray(values, dtype=float)
+        indices = np.searchsorted(self.edges, values, side="left") - 1
+        if self.include_lowest:
+            indices[values == self.edges[0]] = 0
+        indices[(indices >= len(self.edges) - 1) | np.isnan(values)] = -1
+        return np.maximum(indices, -1)
+
+    def keys(self, names: pd.Series) -> np.ndarray:
+        # Names are nearly all distinct, so skip the factorize pass hash_pandas_object does by default
+        hashed = pd.util.hash_pandas_object(names.astype(str), index=False, hash_key=self.hash_key, categorize=False)
+        return hashed.to_numpy()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Sampling ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def sample_batches(self, batches: Iterable[pd.DataFrame], name_column: str, value_column: str) -> pd.DataFrame:
+        """
+        One pass over the batches, each merged into the running per-bin samples and then dropped
+        """
+        reservoir: Optional[pd.DataFrame] = None
+        for batch in batches:
+            batch = batch.assign(_bin=self.bin_indices(batch[value_column]), _key=self.keys(batch[name_column]))
+            merged = batch if reservoir is None else pd.concat([reservoir, batch], ignore_index=True)
+            reservoir = merged.iloc[self._bottom_k(merged["_bin"].to_numpy(), merged["_key"].to_numpy())]
+        if reservoir is None:
+            return pd.DataFrame()
+        return self.label(reservoir.drop(columns="_key"), value_column)
+
+    def _bottom_k(self, bin_indices: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """
+        Positions of the per_bin smallest keys in each bin, skipping rows outside every bin
+        """
+        positions = np.flatnonzero(bin_indices >= 0)
+        positions = positions[np.lexsort((keys[positions], bin_indices[positions]))]
+        sorted_bins = bin_indices[positions]
+        # Rank of each row within its bin, rows are now grouped by bin in key order
+        group_starts = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, len(sorted_bins)])
+        ranks = np.arange(len(sorted_bins)) - np.repeat(group_starts, group_sizes)
+        return positions[ranks < self.per_bin]
+
+    def sample_frame(self, frame: pd.DataFrame, name_column: str, value_column: str) -> pd.DataFrame:
+        return self.sample_batches([frame], name_column, value_column)
+
+    def label(self, sample: pd.DataFrame, value_column: str) -> pd.DataFrame:
+        """
+        Adds the bin column, a categorical of the same intervals pd.cut would label the bins with, and orders the
+        sample by bin
+        """
+        bin_indices = self.bin_indices(sample[value_column])
+        sample = sample.drop(columns="_bin", errors="ignore").assign(
+            bin=pd.Categorical.from_codes(bin_indices, self.labels)
+        )
+        sample = sample.iloc[np.argsort(bin_indices, kind="stable")].reset_index(drop=True)
+        counts = sample["bin"].value_counts(sort=False)
+        short = counts[(counts > 0) & (counts < self.per_bin)]
+        logger.info(
+            f"Sampled {len(sample)} rows from {int((counts > 0).sum())}/{len(self.labels)} non-empty bins, "
+            f"{len(short)} with fewer than {self.per_bin} rows to draw from"
+        )
+        return sample
+
+
+def sample_dataframe(
+    frame: pd.DataFrame,
+    name_column: str,
+    value_column: str,
+    bins: int = DEFAULT_BINS,
+    per_bin: int = DEFAULT_PER_BIN,
+    edges: str = "equal_width",
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    For a population that is already in memory
+    """
+    if edges not in EDGE_METHODS:
+        raise ValueError(f"edges must be one of {EDGE_METHODS}, got {edges}")
+    values = frame[value_column].dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return frame.head(0).assign(bin=pd.Series(dtype="category"))
+    if edges == "equal_width":
+        sampler = StratifiedSampler.equal_width(values.min(), values.max(), bins, per_bin, seed)
+    else:
+        sampler = StratifiedSampler.from_quantiles(values, bins, per_bin, seed)
+    return sampler.sample_frame(frame, name_column, value_column)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Cypher ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+class CypherPopulation(BaseModel):
+    """
+    A missing (null) value counts as 0 in every query, so each member lands in a bin whether the population is sampled
+    from the streamed rows or a bin per query, as it does when a score is computed client side
+    """
+    match: str  # Pattern binding each member of the population
+    columns: Dict[str, str]  # Output column -> expression, in order, including name_column and value_column
+    name_column: str = "package_name"
+    value_column: str
+
+    def _value(self) -> str:
+        return f"coalesce({self.columns[self.value_column]}, 0)"
+
+    def _returns(self) -> str:
+        return ", ".join(
+            f"{self._value() if column == self.value_column else expression} as {column}"
+            for column, expression in self.columns.items()
+        )
+
+    def stats_query(self) -> Query:
+        return Query(
+            f"{self.match}\n"
+            f"WITH {self._value()} as value\n"
+            "RETURN min(value) as minimum, max(value) as maximum, count(value) as population"
+        )
+
+    def values_query(self) -> Query:
+        return Query(
+            f"{self.match}\n"
+            f"RETURN {self._value()} as value"
+        )
+
+    def rows_query(self) -> Query:
+        return Query(f"{self.match}\nRETURN {self._returns()}")
+
+    def bin_query(self) -> Query:
+        return Query(
+            f"{self.match}\n"
+            f"WITH {self._returns()}\n"
+            f"WHERE ({self.value_column} > $low OR ($include_low AND {self.value_column} = $low))"
+            f" AND {self.value_column} <= $high\n"
+            f"RETURN {', '.join(self.columns)}\n"
+            f"ORDER BY apoc.util.md5([$seed, toString({self.name_column})])\n"
+            "LIMIT $per_bin"
+        )
+
+    def queries(self) -> Dict[str, Query]:
+        return {
+            "stats_query": self.stats_query(), "values_query": self.values_query(), "rows_query": self.rows_query(),
+            "bin_query": self.bin_query(),
+        }
+
+
+def sample_population(
+    client: Neo4jClient,
+    population: CypherPopulation,
+    database: str,
+    bins: int = DEFAULT_BINS,
+    per_bin: int = DEFAULT_PER_BIN,
+    edges: str = "equal_width",
+    seed: Optional[int] = None,
+    server_side: bool = False,
+    batch_size: int = 10000,
+) -> pd.DataFrame:
+    """
+    Equal width edges come from a min/max aggregated in the database, quantile edges from streaming just the value
+    column. The rows are then either streamed through a StratifiedSampler or, with server_side, sampled a bin per query
+    """
+    if edges not in EDGE_METHODS:
+        raise ValueError(f"edges must be one of {EDGE_METHODS}, got {edges}")
+    columns = list(population.columns)
+    if edges == "equal_width":
+        minimum, maximum, count = client._run_query(
+            population.stats_query(), dict(), database, label="sample_population_stats"
+        ).values[0]
+        if count == 0:
+            return pd.DataFrame(columns=columns + ["bin"])
+        sampler = StratifiedSampler.equal_width(minimum, maximum, bins, per_bin, seed)
+    else:
+        values = np.fromiter(
+            (value for value, in client.stream_query(population.values_query(), dict(), database, batch_size)),
+            dtype=float,
+        )
+        if len(values) == 0:
+            return pd.DataFrame(columns=columns + ["bin"])
+        sampler = StratifiedSampler.from_quantiles(values, bins, per_bin, seed)
+
+    if not server_side:
+        batches = client.stream_query_batches(
+            population.rows_query(), dict(), database, batch_size, label="sample_population_rows"
+        )
+        return sampler.sample_batches(
+            (pd.DataFrame(batch, columns=columns) for batch in batches), population.name_column, population.value_column
+        )
+
+    frames = []
+    for low, high in zip(sampler.edges[:-1], sampler.edges[1:]):
+        response = client._run_query(
+            population.bin_query(),
+            {
+                "low": float(low), "high": float(high), "per_bin": per_bin, "seed": sampler.hash_key,
+                "include_low": bool(sampler.include_lowest and low == sampler.edges[0]),
+            },
+            database, label="sample_population_bin",
+        )
+        frames.append(pd.DataFrame(response.values, columns=columns))
+    return sampler.label(pd.concat(frames, ignore_index=True), population.value_column)
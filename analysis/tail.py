@@ -0,0 +1,665 @@
+"""
+Heavy-tail estimation of degree distributions, the estimators of the tail-estimation submodule (Voitalov et al.,
+"Scale-free networks well done") run in process on NumPy arrays.
+
+Estimators of the extreme value index xi (the tail exponent is gamma = 1 + 1/xi):
+    hill        Hill's, over every number of order statistics k, with k chosen by double bootstrap
+    smooth_hill Hill's averaged over windows of k, for the plot only
+    moments     Dekkers-Einmahl-de Haan, double bootstrap
+    kernel      Groeneboom-Lopuhaa-de Wolf with a biweight kernel over a grid of bandwidths h, double bootstrap
+                against the triweight one
+    pickands    for the plot only
+
+Every estimator over every k is a handful of cumulative sums over the sorted log degrees. A bootstrap resample is drawn
+as how many times each order statistic is picked, so it comes out sorted without a sort, and one resample feeds all
+three double bootstraps. Resamples are split across a process pool, each seeded from its own child of the seed so the
+estimates don't depend on the number of workers. The pool's workers are started by a forkserver (spawned where there is
+none) rather than forked, as the pipeline runs this from a thread pool alongside the neo4j driver's threads.
+
+    python -m analysis.tail [ecosystem ...]             output/<ecosystem>/deg_distrib.csv -> tail_estim*
+    python -m analysis.tail <distrib.csv> <output prefix>
+
+Writes the plot data files tail-estimation.py's --savedata 1 does, and its figures unless plots is off.
+"""
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel
+
+OUTPUT_DIR = Path(__file__).parent.joinpath("output")
+ECOSYSTEMS = ["npm", "pypi"]
+
+
+class TailEstimationConfig(BaseModel):
+    """
+    Defaults are tail-estimation.py's
+    """
+    bins: int = 30  # Log spaced bins of the PDF
+    r_smooth: int = 2  # Window growth of the smooth Hill estimator
+    alpha: float = 0.6  # Kernel estimators' alpha
+    hsteps: int = 200  # Bandwidths the kernel estimators are evaluated at
+    noise: bool = True  # Spread integer degrees so there are no ties
+    p_noise: int = 1
+    bootstrap: bool = True
+    t_bootstrap: float = 0.5  # Sets the first bootstrap sample size
+    r_bootstrap: int = 500  # Resamples per bootstrap sample size
+    eps_stop: float = 1.0  # Fraction of order statistics searched for the AMSE minimum, see discrete_eps_stop
+    bootstrap_redraws: int = 3  # Times the moments and kernel double bootstraps are redrawn after a false minimum
+    seed: Optional[int] = None
+    workers: Optional[int] = None  # Bootstrap processes, defaults to the cpu count
+    plots: bool = True
+    diagnostic_plots: bool = True
+
+
+class AmseCurve:
+    """
+    The bootstrap AMSE of one estimator at one sample size, over k (or the bandwidth h, a fraction of the sample, for
+    the kernel estimator)
+    """
+    def __init__(self, x: np.ndarray, amse: np.ndarray, sample_size: int, fraction: bool = False):
+        self.x = x
+        self.amse = amse
+        self.sample_size = sample_size
+        self.fraction = fraction
+        self.chosen: Optional[float] = None
+
+    @property
+    def chosen_k(self) -> Optional[float]:
+        if self.chosen is None:
+            return None
+        return self.chosen * self.sample_size if self.fraction else self.chosen
+
+
+class TailEstimate:
+    """
+    One estimator's xi over k, the number of order statistics it uses, and the k its double bootstrap chose if one ran
+    """
+    def __init__(self, name: str, k: np.ndarray, xi: np.ndarray):
+        self.name = name
+        self.k = k
+        self.xi = xi
+        self.k_star: Optional[int] = None
+        self.xi_star: Optional[float] = None
+        self.amse: List[AmseCurve] = []
+
+    @property
+    def gamma(self) -> Optional[float]:
+        if self.xi_star is None or not self.xi_star > 0:
+            return None
+        return 1. + 1. / self.xi_star
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Data ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def load_degrees(path: Path) -> np.ndarray:
+    """
+    Every node's degree from a `degree,frequency` histogram such as deg_distrib.csv
+    """
+    histogram = np.loadtxt(path, delimiter=",", ndmin=2)
+    if len(histogram) == 0:
+        return np.zeros(0)
+    return np.repeat(histogram[:, 0], histogram[:, 1].astype(np.int64))
+
+
+def add_uniform_noise(degrees: np.ndarray, p: int = 1, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Uniform noise in [-5 * 10^-p, 5 * 10^-p] on each degree, dropping any that aren't positive afterwards (so about
+    half the zero degrees), as tail-estimation does
+    """
+    rng = rng or np.random.default_rng()
+    noisy = degrees + rng.uniform(-5. * 10 ** -p, 5. * 10 ** -p, size=len(degrees))
+    return noisy[noisy > 0]
+
+
+def discrete_eps_stop(degrees: np.ndarray, sample_size: int) -> Optional[float]:
+    """
+    For integer degrees, the fraction of the sample_size order statistics above the smallest positive degree. The ties
+    at that degree (most of a degree distribution) are only spread by the noise, and an AMSE search that reaches into
+    them finds no consistent kernel minima or picks one in the body, so this is estimate_tail's eps_stop unless one is
+    set. None for non integer data, or if every positive degree is the same
+    """
+    positive = degrees[degrees > 0]
+    if len(positive) == 0 or sample_size == 0 or not np.array_equal(positive, np.floor(positive)):
+        return None
+    above = int(np.count_nonzero(positive > positive.min()))
+    return above / sample_size if above > 0 else None
+
+
+def get_distribution(data: np.ndarray, bins: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Density over log spaced bins at each non-empty bin's midpoint
+    """
+    lower = np.log10(data.min()) if data.min() > 0 else -1
+    edges = np.logspace(lower, np.log10(data.max()), bins)
+    density, _ = np.histogram(data, bins=edges, density=True)
+    midpoints = edges[1:] - np.diff(edges) / 2.
+    return midpoints[density > 0], density[density > 0]
+
+
+def get_ccdf(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    uniques, counts = np.unique(data, return_counts=True)
+    cumulative = np.cumsum(counts).astype(float) / data.size
+    return uniques[::-1], (1. - cumulative)[::-1]
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Estimators ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+# Every estimator takes data sorted in decreasing order, or its logs
+def log_moments(logs: np.ndarray, order: int) -> List[np.ndarray]:
+    """
+    [M_1, ..., M_order] with M_j(k) = 1/k sum_{i<k} (logs[i] - logs[k])^j for k = 1..n-1. Going from k to k + 1 adds
+    the spacing logs[k] - logs[k + 1] to every term, so each sum's increments are binomials of the spacing and the
+    lower order sums at k, all non-negative. Unlike expanding (logs[i] - logs[k])^j into running sums of powers of the
+    logs, nothing cancels, and tied logs (common at the top of a bootstrap resample) give exact zeros
+    """
+    spacings = logs[:-1] - logs[1:]
+    counts = np.arange(1, len(logs), dtype=float)
+    spacing_powers = [np.ones_like(spacings), spacings]
+    sums: List[np.ndarray] = []
+    for j in range(1, order + 1):
+        if j >= len(spacing_powers):
+            spacing_powers.append(spacing_powers[-1] * spacings)
+        # The k existing terms and the new one each gain spacing^j
+        increment = counts * spacing_powers[j]
+        binomial = 1.
+        for i in range(1, j):
+            binomial = binomial * (j - i + 1) / i
+            previous = np.r_[0., sums[i - 1][:-1]]
+            previous *= binomial
+            previous *= spacing_powers[j - i]
+            increment += previous
+        sums.append(np.cumsum(increment))
+    for total in sums:
+        total /= counts
+    return sums
+
+
+def hill_estimates(logs: np.ndarray) -> np.ndarray:
+    return log_moments(logs, 1)[0]
+
+
+def smooth_hill_estimates(logs: np.ndarray, r_smooth: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    xi at k = j + 1 is Hill's averaged over k from j to r_smooth * j - 1
+    """
+    hill = hill_estimates(logs)
+    windows = len(logs) // r_smooth
+    cumulative = np.r_[0., np.cumsum(hill)]
+    j = np.arange(1, windows)
+    xi = np.r_[hill[:1], (cumulative[r_smooth * j] - cumulative[j]) / ((r_smooth - 1) * j)]
+    return np.arange(1, windows + 1), xi
+
+
+def moments_estimates(logs: np.ndarray) -> np.ndarray:
+    m1, m2 = log_moments(logs, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return m1 + 1. - 0.5 / (1. - m1 * m1 / m2)
+
+
+@lru_cache(maxsize=4)
+def _kernel_weights(n: int, alpha: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # i/n, (i/n)^2 and (i/n)^alpha for i = 1..n-1, the same two sample sizes come up in every bootstrap resample
+    u = np.arange(1, n) / float(n)
+    return u, u * u, u ** alpha
+
+
+def kernel_estimates(logs: np.ndarray, hsteps: int = 200, alpha: float = 0.6) -> Tuple[np.ndarray, ...]:
+    """
+    (h, biweight xi, triweight xi) over hsteps log spaced bandwidths from 1/n to 1. Both kernels are polynomials in
+    i/(n h), so each sum over the order statistics inside a bandwidth is a combination of prefix sums of powers of i/n,
+    which are only needed at the bandwidths' last indices. Bandwidths covering fewer than two order statistics are NaN
+    """
+    n = len(logs)
+    h = np.logspace(np.log10(1. / n), 0., hsteps)
+    last = np.floor(n * h).astype(np.int64) - 2
+    valid = last >= 0
+    if not valid.any():
+        return h, np.full(hsteps, np.nan), np.full(hsteps, np.nan)
+    last = last[valid]
+    hv = h[valid]
+    u, u2, u_alpha = _kernel_weights(n, alpha)
+    differences = logs[:-1] - logs[1:]
+    # Sums between consecutive last indices, accumulated, then looked up for each bandwidth
+    ends = np.unique(last)
+    starts = np.r_[0, ends[:-1] + 1]
+    position = np.searchsorted(ends, last)
+
+    def prefix_sums(weighted: np.ndarray) -> np.ndarray:
+        return np.cumsum(np.add.reduceat(weighted[:ends[-1] + 1], starts))[position]
+
+    # odd[j] sums u^(2j+1) * differences, shifted[j] sums u^(alpha+2j) * differences, j = 0..3
+    odd, shifted = [], []
+    for weights, sums in ((u, odd), (u_alpha, shifted)):
+        weighted = weights * differences
+        for _ in range(4):
+            sums.append(prefix_sums(weighted))
+            weighted *= u2
+    inverse = [hv ** -(2 * j + 1) for j in range(4)]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # K(u) = 15/8 (1 - u^2)^2
+        positive = (15. / 8.) * (odd[0] * inverse[0] - 2. * odd[1] * inverse[1] + odd[2] * inverse[2])
+        q1 = shifted[0] * inverse[0] - 2. * shifted[1] * inverse[1] + shifted[2] * inverse[2]
+        q2 = (
+            (alpha + 1.) * shifted[0] * inverse[0] - 2. * (alpha + 3.) * shifted[1] * inverse[1]
+            + (alpha + 5.) * shifted[2] * inverse[2]
+        )
+        biweight = positive - 1. + q1 / q2
+        # K(u) = 35/16 (1 - u^2)^3
+        positive = (35. / 16.) * (
+            odd[0] * inverse[0] - 3. * odd[1] * inverse[1] + 3. * odd[2] * inverse[2] - odd[3] * inverse[3]
+        )
+        q1 = (
+            shifted[0] * inverse[0] - 3. * shifted[1] * inverse[1] + 3. * shifted[2] * inverse[2]
+            - shifted[3] * inverse[3]
+        )
+        q2 = (
+            (alpha + 1.) * shifted[0] * inverse[0] - 3. * (alpha + 3.) * shifted[1] * inverse[1]
+            + 3. * (alpha + 5.) * shifted[2] * inverse[2] - (alpha + 7.) * shifted[3] * inverse[3]
+        )
+        triweight = positive - 1. + q1 / q2
+
+    results = []
+    for estimate in (biweight, triweight):
+        full = np.full(hsteps, np.nan)
+        full[valid] = estimate
+        results.append(full)
+    return h, results[0], results[1]
+
+
+def pickands_estimates(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    k = np.arange(1, len(data) // 4 + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xi = np.log((data[k - 1] - data[2 * k - 1]) / (data[2 * k - 1] - data[4 * k - 1])) / np.log(2.)
+    return k, xi
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bootstrap ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+_worker_logs: Optional[np.ndarray] = None
+
+
+def _init_worker(logs: np.ndarray):
+    global _worker_logs
+    _worker_logs = logs
+
+
+def _accumulate(totals: Dict[str, List[np.ndarray]], name: str, amse: np.ndarray):
+    # Overwrites amse, resamples where it isn't finite don't count towards that k's average
+    finite = np.isfinite(amse)
+    amse[~finite] = 0.
+    if name not in totals:
+        totals[name] = [np.zeros(len(amse)), np.zeros(len(amse), dtype=np.int64)]
+    totals[name][0] += amse
+    totals[name][1] += finite
+
+
+def _bootstrap_chunk(
+    sample_size: int, seeds: List[np.random.SeedSequence], hsteps: int, alpha: float
+) -> Dict[str, List[np.ndarray]]:
+    """
+    AMSE sums and finite counts over resamples of sample_size from the worker's logs, one resample per seed
+    """
+    logs = _worker_logs
+    totals: Dict[str, List[np.ndarray]] = dict()
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        # How often each order statistic is drawn, repeating the logs that many times keeps them sorted
+        picks = np.bincount(rng.integers(0, len(logs), sample_size), minlength=len(logs))
+        sample = np.repeat(logs, picks)
+        m1, m2, m3 = log_moments(sample, 3)
+        # In place, at these sizes every temporary array costs as much as the arithmetic
+        # Hill's: (M2 - 2 M1^2)^2
+        amse = m1 * m1
+        amse *= -2.
+        amse += m2
+        amse *= amse
+        _accumulate(totals, "hill", amse)
+        # Moments: (xi_2 - xi_3)^2 with xi_2 = M1 + 1 - 1/2 (1 - M1^2/M2)^-1, xi_3 = sqrt(M2/2) + 1 - 2/3 (1 - M1 M2/M3)^-1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.multiply(m1, m1, out=amse)
+            amse /= m2
+            np.subtract(1., amse, out=amse)
+            np.divide(-0.5, amse, out=amse)
+            amse += m1
+            m1 *= m2
+            m1 /= m3
+            np.subtract(1., m1, out=m1)
+            np.divide(2. / 3., m1, out=m1)
+            amse += m1
+            m2 *= 0.5
+            np.sqrt(m2, out=m2)
+            amse -= m2
+        amse *= amse
+        _accumulate(totals, "moments", amse)
+        _, biweight, triweight = kernel_estimates(sample, hsteps, alpha)
+        _accumulate(totals, "kernel", (biweight - triweight) ** 2)
+    return totals
+
+
+def _workers(config: TailEstimationConfig) -> int:
+    return max(1, config.workers or os.cpu_count() or 1)
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    # A fork would copy whatever locks the caller's other threads hold at that moment into the workers
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def bootstrap_amse(
+    logs: np.ndarray, sample_sizes: List[int], config: TailEstimationConfig, seed: np.random.SeedSequence
+) -> Dict[str, List[AmseCurve]]:
+    """
+    Each estimator's AMSE curve at each sample size, from r_bootstrap resamples per size
+    """
+    workers = min(_workers(config), config.r_bootstrap)
+    tasks = []
+    for sample_size, seeds in zip(sample_sizes, seed.spawn(len(sample_sizes))):
+        for chunk in np.array_split(np.array(seeds.spawn(config.r_bootstrap), dtype=object), workers):
+            tasks.append((sample_size, list(chunk)))
+    logger.info(f"Bootstrapping {config.r_bootstrap} resamples of each of {sample_sizes} on {workers} processes")
+    if workers == 1:
+        _init_worker(logs)
+        chunks = [_bootstrap_chunk(size, seeds, config.hsteps, config.alpha) for size, seeds in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=_pool_context(), initializer=_init_worker, initargs=(logs,)
+        ) as pool:
+            chunks = list(pool.map(
+                _bootstrap_chunk, *zip(*tasks), [config.hsteps] * len(tasks), [config.alpha] * len(tasks)
+            ))
+
+    curves: Dict[str, List[AmseCurve]] = {name: [] for name in ("hill", "moments", "kernel")}
+    for sample_size in sample_sizes:
+        totals: Dict[str, List[np.ndarray]] = dict()
+        for (size, _), chunk in zip(tasks, chunks):
+            if size != sample_size:
+                continue
+            for name, (sums, counts) in chunk.items():
+                if name not in totals:
+                    totals[name] = [np.zeros_like(sums), np.zeros_like(counts)]
+                totals[name][0] += sums
+                totals[name][1] += counts
+        k = np.arange(1, sample_size)
+        h = np.logspace(np.log10(1. / sample_size), 0., config.hsteps)
+        for name, (sums, counts) in totals.items():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                amse = np.where(counts > 0, sums / counts, np.nan)
+            if name == "kernel":
+                curves[name].append(AmseCurve(h, amse, sample_size, fraction=True))
+            else:
+                curves[name].append(AmseCurve(k, amse, sample_size))
+    return curves
+
+
+def _amse_minimum(curve: AmseCurve, eps_stop: float, first: int) -> Optional[int]:
+    # eps_stop is a fraction of the sample, so for bandwidths the grid point nearest it
+    last = int(np.argmin(np.abs(curve.x - eps_stop))) if curve.fraction else int(eps_stop * len(curve.amse))
+    window = curve.amse[first:last]
+    if len(window) == 0 or np.isnan(window).all():
+        return None
+    return first + int(np.nanargmin(window))
+
+
+def _double_bootstrap(
+    name: str, curves: List[AmseCurve], eps_stop: float, shift: Optional[int]
+) -> Optional[Tuple[float, float]]:
+    """
+    The AMSE minima (x1, x2) of the two sample sizes. A second minimum at a larger k than the first means a false
+    minimum at the left edge, so the left edge moves in by shift and both are searched again, or without a shift
+    there's no result
+    """
+    first_curve, second_curve = curves
+    first = 1
+    while True:
+        i1 = _amse_minimum(first_curve, eps_stop, first)
+        i2 = _amse_minimum(second_curve, eps_stop, first)
+        if i1 is None or i2 is None:
+            return None
+        first_curve.chosen, second_curve.chosen = first_curve.x[i1], second_curve.x[i2]
+        if second_curve.chosen_k <= first_curve.chosen_k:
+            if first > 1:
+                logger.warning(f"{name}: k2 > k1, AMSE false minimum suspected, searched from index {first}")
+            return first_curve.chosen, second_curve.chosen
+        if shift is None:
+            return None
+        first += shift
+
+
+def _qi_rho(k1: float, n1: int) -> float:
+    """
+    Qi's estimate of the DBS constant from k1 of a sample of n1
+    """
+    return (1. - 2. * (np.log(k1) - np.log(n1)) / np.log(k1)) ** (np.log(k1) / np.log(n1) - 1.)
+
+
+def _moments_prefactor(xi: float, n1: int, k1: float) -> float:
+    """
+    Draisma et al.'s DBS constant for the moments estimator, xi its estimate at the chosen k1
+    """
+    rho = np.log(k1) / (2. * np.log(k1) - 2. * np.log(n1))
+    if xi >= 0:
+        v_sq = 1. + xi ** 2
+        v_bar_sq = 0.25 * (1. + xi ** 2)
+    else:
+        v_sq = (1. - xi) ** 2 * (1. - 2. * xi) * (6. * xi ** 2 - xi + 1.) / ((1. - 3. * xi) * (1. - 4. * xi))
+        v_bar_sq = (
+            0.25 * (1. - xi) ** 2
+            * (1. - 8. * xi + 48. * xi ** 2 - 154. * xi ** 3 + 263. * xi ** 4 - 222. * xi ** 5 + 72. * xi ** 6)
+            / ((1. - 2. * xi) * (1. - 3. * xi) * (1. - 4. * xi) * (1. - 5. * xi) * (1. - 6. * xi))
+        )
+    if xi < rho:
+        b = (1. - xi) * (1. - 2. * xi) / ((1. - rho - xi) * (1. - rho - 2. * xi))
+        b_bar = -0.5 * rho * (1. - xi) ** 2 / ((1. - xi - rho) * (1. - 2. * xi - rho) * (1. - 3. * xi - rho))
+    elif xi < 0:
+        b = 1. / (1. - xi)
+        b_bar = (1. - 2. * xi - np.sqrt((1. - xi) * (1. - 2. * xi))) / ((1. - xi) * (1. - 2. * xi))
+    else:
+        b = xi / (rho * (1. - rho)) + 1. / (1. - rho) ** 2
+        b_bar = -(rho + xi * (1. - rho)) / (2. * (1. - rho) ** 3)
+    return (v_sq * b_bar ** 2 / (v_bar_sq * b ** 2)) ** (1. / (1. - 2. * rho))
+
+
+def _choose(estimate: TailEstimate, k_star: float):
+    estimate.k_star = int(min(max(k_star, 1), len(estimate.xi)))
+    estimate.xi_star = float(estimate.xi[estimate.k_star - 1])
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Run ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def estimate(
+    ordered: np.ndarray,
+    config: TailEstimationConfig = TailEstimationConfig(),
+    seed: Optional[np.random.SeedSequence] = None,
+) -> Dict[str, TailEstimate]:
+    """
+    Every estimator over positive data sorted in decreasing order. After a false AMSE minimum, Hill's double bootstrap
+    moves the left edge of its search in while the moments and kernel ones are redrawn, as in tail-estimation
+    """
+    n = len(ordered)
+    logs = np.log(ordered)
+    estimates = {
+        "hill": TailEstimate("hill", np.arange(1, n), hill_estimates(logs)),
+        "smooth_hill": TailEstimate("smooth_hill", *smooth_hill_estimates(logs, config.r_smooth)),
+        "moments": TailEstimate("moments", np.arange(1, n), moments_estimates(logs)),
+        "pickands": TailEstimate("pickands", *pickands_estimates(ordered)),
+    }
+    h, biweight, _ = kernel_estimates(logs, config.hsteps, config.alpha)
+    estimates["kernel"] = TailEstimate("kernel", np.floor(h * n).astype(np.int64), biweight)
+    if not config.bootstrap:
+        return estimates
+
+    n1 = int(n ** (0.5 * (1. + np.log(int(config.t_bootstrap * n)) / np.log(n))))
+    n2 = int(n1 * n1 / float(n))
+    pending = ["hill", "moments", "kernel"]
+    draws = (seed or np.random.SeedSequence(config.seed)).spawn(config.bootstrap_redraws + 1)
+    for draw, draw_seed in enumerate(draws):
+        if draw > 0:
+            logger.warning(f"{pending}: k2 > k1, AMSE false minimum suspected, redrawing the bootstrap")
+        curves = bootstrap_amse(logs, [n1, n2], config, draw_seed)
+        for name in list(pending):
+            estimate_ = estimates[name]
+            estimate_.amse = curves[name]
+            shift = max(int(0.005 * n), 1) if name == "hill" else None
+            chosen = _double_bootstrap(name, curves[name], config.eps_stop, shift)
+            if chosen is None:
+                continue
+            pending.remove(name)
+            x1, x2 = chosen
+            if name == "hill":
+                _choose(estimate_, round(x1 * x1 / x2 * _qi_rho(x1, n1)))
+            elif name == "moments":
+                xi_k1 = estimate_.xi[min(int(x1 * n / n1), n - 1) - 1]
+                _choose(estimate_, int(x1 * x1 / x2 * _moments_prefactor(xi_k1, n1, x1)))
+            else:
+                # h* from the bandwidths as Hill's k* from the k's, then the nearest bandwidth of the full data
+                h_star = x1 * x1 / x2 * _qi_rho(max(x1 * n1, 2.), n1)
+                index = int(np.nanargmin(np.abs(h - h_star)))
+                estimate_.k_star = int(estimate_.k[index])
+                estimate_.xi_star = float(biweight[index])
+        if not pending:
+            break
+    for name in pending:
+        logger.warning(
+            f"{name} double bootstrap found no consistent AMSE minima in {len(draws)} draws, a smaller eps_stop "
+            "keeps the search out of the body of the distribution"
+        )
+    return estimates
+
+
+def _write_columns(path: Path, x: np.ndarray, y: np.ndarray):
+    # Formatting is most of writing millions of rows, this is a few times faster than pandas or np.savetxt
+    with path.open("w") as file:
+        file.writelines(f"{a!r} {b!r}\n" for a, b in zip(x.tolist(), y.tolist()))
+
+
+def _log_spaced(x: np.ndarray, y: np.ndarray, points: int = 2000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    At most points of a curve over a log x axis, plotting millions of k's looks the same and takes minutes
+    """
+    if len(x) <= points:
+        return x, y
+    index = np.unique(np.geomspace(1, len(x), points).astype(np.int64) - 1)
+    return x[index], y[index]
+
+
+def _plot(prefix: Path, data: Dict[str, Tuple[np.ndarray, np.ndarray]], estimates: Dict[str, TailEstimate]):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, axes = plt.subplots(2, 3, figsize=(18, 10))
+    for axis, name, title in ((axes[0, 0], "pdf", "PDF"), (axes[0, 1], "ccdf", "CCDF")):
+        axis.loglog(*_log_spaced(*data[name]), ".", color="royalblue", markersize=3)
+        axis.set_title(title)
+        axis.set_xlabel("degree")
+    panels = [
+        (axes[0, 2], ["hill", "smooth_hill"], "Hill"), (axes[1, 0], ["moments"], "Moments"),
+        (axes[1, 1], ["kernel"], "Kernel-type"), (axes[1, 2], ["pickands"], "Pickands"),
+    ]
+    for axis, names, title in panels:
+        for name in names:
+            estimate_ = estimates[name]
+            axis.semilogx(*_log_spaced(estimate_.k, estimate_.xi), label=name)
+            if estimate_.k_star is not None:
+                axis.axvline(estimate_.k_star, linestyle="--", color="gray")
+                title = f"{title}, xi* = {estimate_.xi_star:.3f} at k* = {estimate_.k_star}"
+        axis.set_title(title)
+        axis.set_xlabel("number of order statistics k")
+        axis.set_ylabel("xi")
+        axis.legend()
+    figure.tight_layout()
+    figure.savefig(f"{prefix}.pdf")
+    plt.close(figure)
+
+
+def _plot_diagnostics(prefix: Path, estimates: Dict[str, TailEstimate]):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    names = [name for name, estimate_ in estimates.items() if estimate_.amse]
+    if not names:
+        return
+    figure, axes = plt.subplots(len(names), 2, figsize=(12, 4 * len(names)), squeeze=False)
+    for row, name in enumerate(names):
+        for axis, curve in zip(axes[row], estimates[name].amse):
+            axis.loglog(*_log_spaced(curve.x, curve.amse))
+            if curve.chosen is not None:
+                axis.axvline(curve.chosen, linestyle="--", color="gray")
+            axis.set_title(f"{name} AMSE, bootstrap sample of {curve.sample_size}")
+    figure.tight_layout()
+    figure.savefig(f"{prefix}_diag.pdf")
+    plt.close(figure)
+
+
+def estimate_tail(
+    distribution_path: Path, output_prefix: Path, config: TailEstimationConfig = TailEstimationConfig()
+) -> Dict[str, TailEstimate]:
+    """
+    Estimates the tail of a `degree,frequency` histogram and writes output_prefix_*.dat (and figures)
+    """
+    noise_seed, bootstrap_seed = np.random.SeedSequence(config.seed).spawn(2)
+    degrees = load_degrees(distribution_path)
+    if config.noise:
+        ordered = add_uniform_noise(degrees, config.p_noise, np.random.default_rng(noise_seed))
+    else:
+        ordered = degrees[degrees > 0]
+    ordered = np.sort(ordered)[::-1]
+    logger.info(f"Estimating the tail of {distribution_path}, {len(ordered)} degrees")
+    eps_stop = discrete_eps_stop(degrees, len(ordered))
+    if "eps_stop" not in config.model_fields_set and eps_stop is not None:
+        logger.info(f"Integer degrees, searching the top {eps_stop:.3f} of the order statistics for AMSE minima")
+        config = config.model_copy(update={"eps_stop": eps_stop})
+    estimates = estimate(ordered, config, bootstrap_seed)
+    for name in ("hill", "moments", "kernel"):
+        estimate_ = estimates[name]
+        if estimate_.xi_star is None:
+            logger.info(f"{name}: no estimate")
+        elif estimate_.gamma is None:
+            logger.info(f"{name} estimated gamma: infinity (xi <= 0)")
+        else:
+            logger.info(f"{name} estimated gamma: {estimate_.gamma}")
+
+    data = {"pdf": get_distribution(ordered, config.bins), "ccdf": get_ccdf(ordered)}
+    output_prefix.parent.mkdir(parents=True, exist_ok=True)
+    files = {
+        "pdf": data["pdf"], "ccdf": data["ccdf"],
+        "sm_hill_plot": (estimates["smooth_hill"].k, estimates["smooth_hill"].xi),
+        "adj_hill_plot": (estimates["hill"].k, estimates["hill"].xi),
+        "mom_plot": (estimates["moments"].k, estimates["moments"].xi),
+        "kern_plot": (estimates["kernel"].k, estimates["kernel"].xi),
+        "pickands_plot": (estimates["pickands"].k, estimates["pickands"].xi),
+    }
+    for name, suffix in (("hill", "adj_hill"), ("moments", "mom"), ("kernel", "kern")):
+        estimate_ = estimates[name]
+        if estimate_.k_star is not None:
+            Path(f"{output_prefix}_{suffix}_estimate.dat").write_text(f"{estimate_.k_star} {estimate_.xi_star}\n")
+        for stage, curve in enumerate(estimate_.amse, start=1):
+            files[f"{suffix}_diag{stage}"] = (curve.x, curve.amse)
+    for suffix, (x, y) in files.items():
+        _write_columns(Path(f"{output_prefix}_{suffix}.dat"), x, y)
+    if config.plots:
+        _plot(output_prefix, data, estimates)
+        if config.diagnostic_plots:
+            _plot_diagnostics(output_prefix, estimates)
+    return estimates
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0].endswith(".csv"):
+        estimate_tail(Path(args[0]), Path(args[1]))
+        return
+    for ecosystem in args or ECOSYSTEMS:
+        estimate_tail(
+            OUTPUT_DIR.joinpath(ecosystem, "deg_distrib.csv"), OUTPUT_DIR.joinpath(ecosystem, "tail_estim")
+        )
+
+
+if __name__ == '__main__':
+    main()
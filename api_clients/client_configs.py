@@ -7,6 +7,7 @@ from pydantic_settings import BaseSettings
 class GithubConf(BaseSettings):
     api_url: str = Field(default="http://0.0.0.0:9090/github_local")
     auth_token: str = Field(default="")
+    auth_tokens: str = Field(default="")  # Extra tokens for the rate limit budget, comma separated
 
     class Config:
         env_prefix = "github_"
@@ -2,8 +2,9 @@ import datetime
 import math
 import re
 import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterator
 
 import github.GithubException
 from github import Github, Auth
@@ -13,38 +14,63 @@ from git import Repo, GitCommandError
 from loguru import logger
 
 from api_clients.client_configs import GithubConf
-from api_clients.models.github import VersionInfo
+from api_clients.models.github import RepoInfo, VersionInfo
+from api_clients.rate_limit import GithubRateBudget
 from shared_models.graph_models import GitSnapshot, CiCdUsed
 
 
 class GithubClient:
+    """
+    Every API call takes a permit from budget, which picks the token it runs with. Clients share
+    GithubRateBudget.shared() unless given their own. Permits cover only the REST calls, clones and local git commands
+    run outside them, and PyGithub objects don't leave the permit they were fetched under, as reading one of their
+    attributes can make an unbudgeted request. get_git_repo is the exception, kept for callers that need the
+    Repository itself, get_repo_info covers the common fields within the permit
+    """
     config: GithubConf
-    auth: Auth.Token
+    budget: GithubRateBudget
 
-    def __init__(self, config: GithubConf = GithubConf()):
+    def __init__(self, config: GithubConf = GithubConf(), budget: Optional[GithubRateBudget] = None):
         self.config = config
-        self.auth = Auth.Token(self.config.auth_token)
+        self.budget = budget if budget is not None else GithubRateBudget.shared()
 
     def vcs_tag_to_commit_hash(self, repo_url: str, vcs_tag: str) -> str:
         repo_identifier = self._repo_url_to_identifier(repo_url)
-        git_api = Github(auth=self.auth, base_url=self.config.api_url)
-        repo = git_api.get_repo(repo_identifier)
-        tags = list(repo.get_tags())
-        target_tag = repo.get_git_tag(vcs_tag)
-        for tag in tags:
-            if tag.name == target_tag.tag:
-                return tag.commit.sha
+        with self._github_api(cost=5) as git_api:
+            repo = git_api.get_repo(repo_identifier)
+            tags = list(repo.get_tags())
+            target_tag = repo.get_git_tag(vcs_tag)
+            for tag in tags:
+                if tag.name == target_tag.tag:
+                    return tag.commit.sha
         raise ValueError(f"Could not find tag {target_tag.tag} in {repo_url}")
 
     def get_git_repo(self, repo_identifier: str) -> Repository:
         """
         repo_identifier is expected to be in the form: owner/repository as seen in git urls:
         https://github.com/Microsoft/TypeScript.git --> microsoft/typescript
+
+        Only the fetch is budgeted, any further request made through the returned Repository is not
         """
-        github = Github(auth=self.auth, base_url=self.config.api_url)
-        repo = github.get_repo(repo_identifier)
+        with self._github_api(cost=1) as git_api:
+            repo = git_api.get_repo(repo_identifier)
         return repo
 
+    def get_repo_info(self, repo_identifier: str) -> RepoInfo:
+        """
+        The fields of get_git_repo's Repository most callers need, read within the permit so nothing is requested
+        outside the budget. repo_identifier takes the same owner/repository form
+        """
+        with self._github_api(cost=1) as git_api:
+            repo = git_api.get_repo(repo_identifier)
+            return RepoInfo(
+                full_name=repo.full_name,
+                clone_url=repo.clone_url,
+                stars=repo.stargazers_count,
+                forks=repo.forks,
+                watchers=repo.watchers,
+            )
+
     def get_version_info(self, repo_url: str, version: str) -> VersionInfo:
         if repo_url == "~MISSING~":
             return VersionInfo(vcs_tag=None, change_notes=None)
@@ -54,16 +80,15 @@ class GithubClient:
             logger.info(f"{repo_url} isn't a github url so can't pull version info")
             return VersionInfo(vcs_tag=None, change_notes=None)
 
-        git_api = Github(auth=self.auth, base_url=self.config.api_url)
-        try:
-            repo = git_api.get_repo(repo_identifier)
-        except github.GithubException as err:
-            logger.warning(f"Failed to get repo for {repo_url}, identifier: {repo_identifier}")
-            return VersionInfo(vcs_tag=None, change_notes=None)
+        with self._github_api(cost=1) as git_api:
+            try:
+                url = git_api.get_repo(repo_identifier).clone_url
+            except github.GithubException as err:
+                logger.warning(f"Failed to get repo for {repo_url}, identifier: {repo_identifier}")
+                return VersionInfo(vcs_tag=None, change_notes=None)
 
 
         logger.debug(f"Getting Releases and tagrefs")
-        url = repo.clone_url
         temp_dir = tempfile.TemporaryDirectory()
         local_repo = Repo.clone_from(url, to_path=temp_dir.name, progress=self._log_clone_progress)
         local_git_executor = local_repo.git
@@ -83,29 +108,32 @@ class GithubClient:
 
         vcs_tag: Optional[str] = None
         change_notes: Optional[str] = None
-        releases = repo.get_releases()
-        logger.debug(f"{releases.totalCount} releases found")
-
-        if releases.totalCount > 0:  # Project uses releases, try to match a correct one
-            target_release = None
-            for release in releases:
-                if self._is_tag_name_for_version(release.tag_name, version):
-                    target_release = release
-                    target_tag_ref = self._get_ref_by_tag_name(release.tag_name, tags)
-                    if target_tag_ref is None:
-                        continue
-                    vcs_tag = target_tag_ref
-                    logger.info(
-                        f"Suspected VCS Release Found for {repo_identifier} {version}. "
-                        f"release tag: {release.tag_name} tag sha: {vcs_tag}"
-                    )
-                    break
-            if target_release is None:
-                logger.info(f"Unable to find release for {repo_identifier} {version}")
-            else:
-                change_notes = target_release.body
-
-        else:  # Repo isn't configured to do releases, just try to pull the vcs_tag
+        # Lazy, the repo was already fetched above so only the release pages are requested
+        with self._github_api(cost=4, lazy=True) as git_api:
+            releases = git_api.get_repo(repo_identifier).get_releases()
+            release_count = releases.totalCount
+            logger.debug(f"{release_count} releases found")
+
+            if release_count > 0:  # Project uses releases, try to match a correct one
+                target_release = None
+                for release in releases:
+                    if self._is_tag_name_for_version(release.tag_name, version):
+                        target_release = release
+                        target_tag_ref = self._get_ref_by_tag_name(release.tag_name, tags)
+                        if target_tag_ref is None:
+                            continue
+                        vcs_tag = target_tag_ref
+                        logger.info(
+                            f"Suspected VCS Release Found for {repo_identifier} {version}. "
+                            f"release tag: {release.tag_name} tag sha: {vcs_tag}"
+                        )
+                        break
+                if target_release is None:
+                    logger.info(f"Unable to find release for {repo_identifier} {version}")
+                else:
+                    change_notes = target_release.body
+
+        if release_count == 0:  # Repo isn't configured to do releases, just try to pull the vcs_tag
             logger.debug(f"Looking through list of {len(tags)} refs")
             for tag_name, commit_hash in tags.items():
                 if self._is_tag_name_for_version(tag_name.replace("refs/tags/",""), version):
@@ -122,38 +150,53 @@ class GithubClient:
         except NotImplementedError as err:
             logger.info(f"{repo_url} isn't a github url so can't get GitSnapshot")
             return None
-        git_api = Github(auth=self.auth, base_url=self.config.api_url)
-        try:
-            repo = git_api.get_repo(repo_identifier)
-        except github.GithubException as err:
-            if err.status == 404:
-                logger.info(f"{repo_url} no longer exists so can't get GitSnapshot")
-                return None
-            else:
-                raise err
-
-        try:
-            issue_count = repo.get_issues(state="open").totalCount
-        except github.GithubException as err:
-            issue_count = -1
-
-        try:
-            contrib_count = repo.get_contributors().totalCount
-        except github.GithubException as err:
-            contrib_count = -1
-
-        active_contrib_count = self._get_active_contrib_count(repo)
+        with self._github_api(cost=3) as git_api:
+            try:
+                repo = git_api.get_repo(repo_identifier)
+            except github.GithubException as err:
+                if err.status == 404:
+                    logger.info(f"{repo_url} no longer exists so can't get GitSnapshot")
+                    return None
+                else:
+                    raise err
+
+            try:
+                issue_count = repo.get_issues(state="open").totalCount
+            except github.GithubException as err:
+                issue_count = -1
+
+            try:
+                contrib_count = repo.get_contributors().totalCount
+            except github.GithubException as err:
+                contrib_count = -1
+
+            stars, forks, watchers, clone_url = repo.stargazers_count, repo.forks, repo.watchers, repo.clone_url
+
+        active_contrib_count = self._get_active_contrib_count(clone_url)
 
         return GitSnapshot(
-            stars=repo.stargazers_count,
-            forks=repo.forks,
-            watchers=repo.watchers,
+            stars=stars,
+            forks=forks,
+            watchers=watchers,
             issue_count=issue_count,
             contributor_count=contrib_count if contrib_count != -1 else active_contrib_count,
             active_contributor_count=active_contrib_count,
-            ci_cd=self._check_for_ci_cd(repo),
+            ci_cd=self._check_for_ci_cd(clone_url),
         )
 
+    @contextmanager
+    def _github_api(self, cost: int, lazy: bool = False) -> Iterator[Github]:
+        """
+        A Github instance on the token budget granted cost requests, the quota its responses report is fed back to
+        the budget on exit. A lazy instance only requests an object once one of its unset attributes is read
+        """
+        with self.budget.permit(cost) as token:
+            git_api = Github(auth=Auth.Token(token), base_url=self.config.api_url, lazy=lazy)
+            try:
+                yield git_api
+            finally:
+                self.budget.observe_client(token, git_api)
+
     def _repo_url_to_identifier(self, url: str) -> str:
         web_url = url.replace("git+", "").replace(".git", "")
         if "github.com/" not in web_url:
@@ -211,11 +254,10 @@ class GithubClient:
     def _page_contains_tag_refs(page: List[GitRef]) -> bool:
         return any(["refs/tags/" in ref.ref for ref in page])
 
-    def _get_active_contrib_count(self, repo: Repository):
+    def _get_active_contrib_count(self, clone_url: str):
         logger.debug("checking for active contribs")
         six_months_ago = datetime.datetime.now() - datetime.timedelta(weeks=24)
 
-        clone_url = repo.clone_url
         temp_dir = tempfile.TemporaryDirectory()
         local_repo = Repo.clone_from(clone_url, to_path=temp_dir.name, progress=self._log_clone_progress)
         local_git_executor = local_repo.git
@@ -253,12 +295,11 @@ class GithubClient:
         temp_dir.cleanup()
         return len(active_contributors)
 
-    def _check_for_ci_cd(self, repo: Repository) -> CiCdUsed:
-        url = repo.clone_url
+    def _check_for_ci_cd(self, clone_url: str) -> CiCdUsed:
         temp_dir = tempfile.TemporaryDirectory()
 
         ci_cd = CiCdUsed.NOT_USED
-        Repo.clone_from(url, to_path=temp_dir.name, progress=self._log_clone_progress)
+        Repo.clone_from(clone_url, to_path=temp_dir.name, progress=self._log_clone_progress)
         if Path(temp_dir.name).joinpath(".github/workflows").exists():
             ci_cd = CiCdUsed.GITHUB_ACTIONS
         elif Path(temp_dir.name).joinpath("Jenkinsfile").exists():
@@ -6,3 +6,11 @@ from pydantic import BaseModel
 class VersionInfo(BaseModel):
     vcs_tag: Optional[str] = None
     change_notes: Optional[str] = None
+
+
+class RepoInfo(BaseModel):
+    full_name: str
+    clone_url: str
+    stars: int
+    forks: int
+    watchers: int
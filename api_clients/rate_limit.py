@@ -0,0 +1,212 @@
+"""
+One budget for every consumer of the GitHub REST quota, GithubClient calls and OSSF Scorecard containers alike.
+
+Each token's remaining quota is tracked from the X-RateLimit-* headers of the responses it gets back. Before any work
+spends a token, it takes a permit for its estimated request count, and permits are only granted while the token's
+remaining quota, less what outstanding permits have reserved, stays above a safety margin. Once every token is spent
+down to its margin, new permits wait for the earliest reset, so a run uses the whole hourly quota without tripping
+the limit.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional
+
+import requests
+from github import GithubException
+from loguru import logger
+
+from api_clients.client_configs import GithubConf
+
+# What a token is assumed to have before its first response is seen, the authenticated REST limit
+DEFAULT_LIMIT = 5000
+WINDOW_SECONDS = 3600
+SELECTION_POLICIES = ("least_used", "round_robin")
+
+
+class _TokenState:
+    __slots__ = ("token", "limit", "remaining", "reset_at", "observed", "reserved", "granted")
+
+    def __init__(self, token: str):
+        self.token = token
+        self.limit = DEFAULT_LIMIT
+        self.remaining = DEFAULT_LIMIT
+        self.reset_at = time.time() + WINDOW_SECONDS
+        self.observed = False  # Whether reset_at came from GitHub or is a guess
+        self.reserved = 0
+        self.granted = 0
+
+    def roll_window(self, now: float):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + WINDOW_SECONDS
+            self.observed = False
+
+    def available(self, margin: int) -> int:
+        return self.remaining - self.reserved - margin
+
+
+class GithubRateBudget:
+    """
+    tokens defaults to GithubConf's auth_token plus any comma separated auth_tokens. selection is "least_used", the
+    token with the most quota left, or "round_robin". margin requests per token are never handed out, headroom for
+    anything estimated low
+    """
+    _shared_instance: Optional["GithubRateBudget"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        tokens: Optional[List[str]] = None,
+        config: GithubConf = GithubConf(),
+        selection: str = "least_used",
+        margin: int = 100,
+    ):
+        if selection not in SELECTION_POLICIES:
+            raise ValueError(f"selection must be one of {SELECTION_POLICIES}, got {selection}")
+        if tokens is None:
+            tokens = [config.auth_token] + [token.strip() for token in config.auth_tokens.split(",") if token.strip()]
+        self.config = config
+        self.selection = selection
+        self.margin = margin
+        self._states: Dict[str, _TokenState] = {token: _TokenState(token) for token in dict.fromkeys(tokens)}
+        self._rotation = itertools.cycle(list(self._states.values()))
+        self._condition = threading.Condition()
+
+    @classmethod
+    def shared(cls) -> "GithubRateBudget":
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+        return cls._shared_instance
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Permits ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def acquire(self, cost: int = 1, timeout: Optional[float] = None) -> str:
+        """
+        Reserves cost requests on a token and returns it, blocking until some token can cover them. Raises
+        TimeoutError if none can within timeout seconds. Every acquire must be paired with a release
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            if cost > max(state.limit for state in self._states.values()) - self.margin:
+                raise ValueError(f"A permit for {cost} requests can never be granted, the limit is too low")
+            while True:
+                now = time.time()
+                for state in self._states.values():
+                    state.roll_window(now)
+                state = self._select(cost)
+                if state is not None:
+                    state.reserved += cost
+                    state.granted += cost
+                    return state.token
+                # Nothing can cover it until a permit is released or the earliest window resets
+                wait_seconds = max(min(s.reset_at for s in self._states.values()) - now, 0.0) + 1.0
+                if deadline is not None:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"No GitHub token had {cost} requests to spare within {timeout}s")
+                    wait_seconds = min(wait_seconds, deadline - time.monotonic())
+                logger.info(f"GitHub quota exhausted on every token, waiting up to {wait_seconds:.0f}s")
+                self._condition.wait(wait_seconds)
+
+    def release(self, token: str, cost: int = 1):
+        with self._condition:
+            self._states[token].reserved -= cost
+            self._condition.notify_all()
+
+    @contextmanager
+    def permit(self, cost: int = 1, timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        with budget.permit(cost) as token: ..., releasing the reservation when the block exits
+        """
+        token = self.acquire(cost, timeout)
+        try:
+            yield token
+        finally:
+            self.release(token, cost)
+
+    def _select(self, cost: int) -> Optional[_TokenState]:
+        if self.selection == "round_robin":
+            for _ in range(len(self._states)):
+                state = next(self._rotation)
+                if state.available(self.margin) >= cost:
+                    return state
+            return None
+        best = max(self._states.values(), key=lambda s: s.available(self.margin))
+        return best if best.available(self.margin) >= cost else None
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Observations ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def observe(self, token: str, limit: int, remaining: int, reset_at: float):
+        """
+        Records a rate limit reading for token. Within one window remaining only falls, so of readings that arrive
+        out of order from concurrent requests the lowest wins, and readings from a window that has since reset are
+        dropped
+        """
+        with self._condition:
+            state = self._states[token]
+            if state.observed:
+                if reset_at < state.reset_at - 1:
+                    return
+                if reset_at <= state.reset_at + 1:
+                    remaining = min(state.remaining, remaining)
+            state.limit = limit
+            state.remaining = remaining
+            state.reset_at = reset_at
+            state.observed = True
+            self._condition.notify_all()
+
+    def observe_headers(self, token: str, headers: Mapping[str, str]):
+        """
+        From a REST response's X-RateLimit-* headers, readings for other resources (search, graphql) are ignored
+        """
+        if headers.get("X-RateLimit-Resource", "core") != "core" or "X-RateLimit-Remaining" not in headers:
+            return
+        self.observe(
+            token, int(headers["X-RateLimit-Limit"]), int(headers["X-RateLimit-Remaining"]),
+            float(headers["X-RateLimit-Reset"]),
+        )
+
+    def observe_client(self, token: str, github_api):
+        """
+        From the headers of the last response a PyGithub Github instance saw
+        """
+        try:
+            remaining, limit = github_api.rate_limiting
+            reset_at = float(github_api.rate_limiting_resettime)
+        except (GithubException, requests.RequestException) as err:
+            logger.warning(f"Could not read GitHub rate limit: {err}")
+            return
+        self.observe(token, limit, remaining, reset_at)
+
+    def spend(self, token: str, cost: int):
+        """
+        Debits cost requests from token's remaining quota, for work whose responses the budget never saw
+        """
+        with self._condition:
+            self._states[token].remaining -= cost
+
+    def refresh(self, token: str) -> bool:
+        """
+        Reads token's core quota from /rate_limit, which doesn't count against it. Used after work the budget can't
+        see the responses of, such as a scorecard container. Returns whether the read succeeded
+        """
+        try:
+            response = requests.get(
+                f"{self.config.api_url.rstrip('/')}/rate_limit",
+                headers={"Authorization": f"Bearer {token}", "Accept": "application/vnd.github+json"},
+                timeout=10,
+            )
+            response.raise_for_status()
+            core = response.json()["resources"]["core"]
+        except (requests.RequestException, ValueError, KeyError) as err:
+            logger.warning(f"Could not refresh GitHub rate limit: {err}")
+            return False
+        self.observe(token, core["limit"], core["remaining"], float(core["reset"]))
+        return True
+
+    def remaining(self) -> Dict[str, int]:
+        """
+        Unreserved requests left per token, keyed by the token's last 4 characters
+        """
+        with self._condition:
+            return {f"...{token[-4:]}": state.available(0) for token, state in self._states.items()}
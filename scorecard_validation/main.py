@@ -1,11 +1,16 @@
+import hashlib
+import sys
 from pathlib import Path
 from typing import Dict, List, Tuple
 
 import pandas as pd
 from loguru import logger
-from neo4j import Query
 from pydantic import BaseModel
+from redis import Redis
+from rq import Queue, get_current_job
+from rq.job import JobStatus
 
+from analysis.scoring_queue import connect
 from scorecard_validation.bandit_on_repo import bandit_on_repo
 from scorecard_validation.count_loc import count_loc
 from scorecard_validation.ossf_on_repo import ossf_on_repo
@@ -14,12 +19,11 @@ from storage_interface.graph.neo4j_client import Neo4jClient
 
 
 OUTPUT_DIR = Path(__file__).parent.joinpath("output")
-RANDOM_SAMPLE_QUERY = Query(
-    "MATCH (package:Package)\n"
-    "RETURN package.name as name, package.repo_url as url, rand() as r\n"
-    "ORDER BY r\n"
-    "LIMIT $package_count"
-)
+# Jobs share the target-repo checkout and bandit image, so run at most one worker on this queue per machine:
+#   python -m analysis.scoring_queue worker scorecard-validation
+VALIDATION_QUEUE = "scorecard-validation"
+RESULTS_KEY = "validation:results"
+_PENDING = (JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED, JobStatus.SCHEDULED)
 
 
 class SecurityScores(BaseModel):
@@ -45,18 +49,67 @@ def calc_scores(repo_url: str) -> SecurityScores:
 
 
 def random_sample_pypi_graph(sample_size: int) -> pd.DataFrame:
-    neo_client = Neo4jClient()
-    raw_response = neo_client._run_query(
-        RANDOM_SAMPLE_QUERY, {"package_count": sample_size}, database="pypi"
-    ).values
-    sampled_packages = pd.DataFrame(raw_response, columns=["name", "url", "r"]).drop("r", axis=1)
+    neo_client = Neo4jClient.shared()
+    sampled_packages = pd.DataFrame(neo_client.random_packages("pypi", sample_size), columns=["name", "url"])
     # Ignore packages that are missing a VCS url or that aren't hosted on GitHub
     sampled_packages = sampled_packages.loc[sampled_packages['url'] != "~MISSING~"]
     sampled_packages = sampled_packages[sampled_packages['url'].str.contains("github")]
     return sampled_packages
 
 
+def _job_id(repo_url: str) -> str:
+    # RQ job ids only allow letters, digits, - and _
+    return f"validation-{hashlib.sha1(repo_url.encode()).hexdigest()[:16]}"
+
+
+def validation_job(name: str, repo_url: str):
+    scores = calc_scores(repo_url)
+    get_current_job().connection.hset(RESULTS_KEY, name, scores.model_dump_json())
+
+
+def enqueue_validation(queue: Queue, sample_size: int = 300) -> int:
+    """
+    Queues a job for every sampled repo without a result, returns how many were queued. Each repo has a stable job id,
+    so a repo whose job from an earlier run is still pending isn't queued again
+    """
+    target_repos = random_sample_pypi_graph(sample_size).drop_duplicates(subset="url")
+    scored = {name.decode() for name in queue.connection.hkeys(RESULTS_KEY)}
+    queued = 0
+    for _, row in target_repos.iterrows():
+        if row["name"] in scored:
+            continue
+        job_id = _job_id(row["url"])
+        job = queue.fetch_job(job_id)
+        if job is not None and job.get_status() in _PENDING:
+            continue
+        queue.enqueue(validation_job, row["name"], row["url"], job_id=job_id, job_timeout=3600)
+        queued += 1
+    logger.info(f"Queued {queued} repos for validation, {len(target_repos) - queued} already scored or pending")
+    return queued
+
+
+def collect_validation(connection: Redis) -> pd.DataFrame:
+    """
+    Writes the same security_scores.csv as main() from every job that has finished
+    """
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    results: List[Tuple[str, float, float]] = []
+    for name, raw_scores in connection.hgetall(RESULTS_KEY).items():
+        scores = SecurityScores.model_validate_json(raw_scores)
+        results.append((name.decode(), scores.ossf_scorecard, scores.vuln_density))
+    scored_sample = pd.DataFrame(results, columns=["name", "ossf_scorecard", "vuln_density"])
+    scored_sample.to_csv(OUTPUT_DIR.joinpath("security_scores.csv"), index=False)
+    return scored_sample
+
+
 def main():
+    # `enqueue` and `collect` run the validation through the job queue instead, see analysis.scoring_queue
+    if len(sys.argv) > 1 and sys.argv[1] == "enqueue":
+        enqueue_validation(Queue(VALIDATION_QUEUE, connection=connect()))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "collect":
+        collect_validation(connect())
+        return
     OUTPUT_DIR.mkdir(exist_ok=True)
     target_repos = random_sample_pypi_graph(300)
     results: List[Tuple[str, float, float]] = []
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, NamedTuple
 
 from shared_models.enums import SemVerConstraint
 
@@ -17,6 +17,13 @@ class CiCdUsed(str, Enum):
     NOT_USED = "not-used"
 
 
+def from_graph_timestamp(millis: float) -> datetime:
+    """
+    Graph timestamps are epoch millis, truncated to the second
+    """
+    return datetime.fromtimestamp(int(millis / 1000))
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Nodes ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
 class Package(BaseModel):
     name: str
@@ -55,7 +62,7 @@ class Package(BaseModel):
             repo_url=package_node["repo_url"],
             author=package_node["author"],
             maintainer=package_node["maintainer"],
-            indexed_at=datetime.fromtimestamp(int(package_node["indexed_at"]/1000))
+            indexed_at=from_graph_timestamp(package_node["indexed_at"])
         )
 
 
@@ -81,7 +88,7 @@ class PackageVersion(BaseModel):
             version=version_node["version"],
             change_notes=version_node["change_notes"],
             vcs_tag=version_node["vcs_tag"],
-            indexed_at=datetime.fromtimestamp(int(version_node["indexed_at"]/1000)),
+            indexed_at=from_graph_timestamp(version_node["indexed_at"]),
         )
 
 
@@ -148,7 +155,7 @@ class ReleaseEdge(BaseModel):  # package<Package> --Released-> version<PackageVe
         return cls(
             package=Package.from_node(release_relation.nodes[0]),
             version=PackageVersion.from_node(release_relation.nodes[1]),
-            released_at=datetime.fromtimestamp(int(release_relation["released_at"]/1000)),
+            released_at=from_graph_timestamp(release_relation["released_at"]),
         )
 
 
@@ -163,3 +170,48 @@ class CapturedEdge(BaseModel):  # snapshot<GitSnapshot> --Captured-> package<Pac
             **self.snapshot.graph_prop_dict(),
             "captured_at": self.captured_at.timestamp()*1000
         }
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Rows ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+# Unvalidated records for bulk reads, built straight from the record values of the *_ROWS queries, whose columns come
+# in the order of the fields here. Timestamps stay graph epoch millis, to_model() validates and converts them
+class PackageRow(NamedTuple):
+    name: str
+    language: str
+    description: Optional[str]
+    license: str
+    homepage_url: Optional[str]
+    repo_url: str
+    author: Optional[str]
+    maintainer: Optional[List[str]]
+    indexed_at: int
+
+    def to_model(self) -> Package:
+        return Package(**{**self._asdict(), "indexed_at": from_graph_timestamp(self.indexed_at)})
+
+
+class PackageVersionRow(NamedTuple):
+    version: str
+    change_notes: Optional[str]
+    vcs_tag: Optional[str]
+    indexed_at: int
+
+    def to_model(self) -> PackageVersion:
+        return PackageVersion(**{**self._asdict(), "indexed_at": from_graph_timestamp(self.indexed_at)})
+
+
+class ReleaseRow(NamedTuple):
+    package: PackageRow
+    version: PackageVersionRow
+    released_at: int
+
+    @classmethod
+    def from_values(cls, values: List[Any]) -> "ReleaseRow":
+        # Package columns, then version columns, then released_at
+        return cls(PackageRow._make(values[:9]), PackageVersionRow._make(values[9:13]), values[13])
+
+    def to_model(self) -> ReleaseEdge:
+        return ReleaseEdge(
+            package=self.package.to_model(), version=self.version.to_model(),
+            released_at=from_graph_timestamp(self.released_at),
+        )
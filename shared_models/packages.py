@@ -3,7 +3,7 @@ from typing import Dict, List, Optional
 
 from shared_models.enums import SemVerConstraint
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class PackageLocation(str, Enum):
@@ -38,6 +38,8 @@ LANG_TO_LOCATION_MAP: Dict[PackageLanguage, PackageLocation] = {
 
 
 class PackageIdentifier(BaseModel):
+    model_config = ConfigDict(frozen=True)  # Hashable, identifiers are used as set members and dict keys
+
     name: str
     location: PackageLocation
 
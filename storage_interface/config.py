@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic_settings import BaseSettings
 
@@ -7,8 +8,22 @@ class Neo4jConfig(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 7687
     password: str
+    bulk_chunk_size: int = 1000  # Rows sent per UNWIND query by the bulk insert methods
+    profile_queries: bool = False  # PROFILE every query to record db hits, adds server side overhead
 
     class Config:
         env_prefix = "neo4j_"
         env_file = Path(__file__).parents[1].joinpath(".env")
         extra = "ignore"
+
+
+class RedisConfig(BaseSettings):
+    host: str = "0.0.0.0"
+    port: int = 6379
+    db: int = 0
+    password: Optional[str] = None
+
+    class Config:
+        env_prefix = "redis_"
+        env_file = Path(__file__).parents[1].joinpath(".env")
+        extra = "ignore"
@@ -0,0 +1,380 @@
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Union, Callable, Sequence, Set, Tuple, AsyncIterator, Awaitable, TypeVar
+
+from loguru import logger
+from neo4j import AsyncGraphDatabase, AsyncDriver, AsyncManagedTransaction, Query, exceptions
+from neo4j.exceptions import ConstraintError
+
+from storage_interface.config import Neo4jConfig
+import shared_models.graph_models as gm
+import shared_models.packages as pm
+from storage_interface.graph.internal_models import QueryResult, BulkWriteResult, RowFailure
+from storage_interface.graph.neo4j_client import Neo4jClient
+import storage_interface.graph.queries as cq
+from storage_interface.graph.schema import apply_schema_async
+from storage_interface.graph.metrics import QueryMetrics, query_label, as_profiled, profile_db_hits
+
+T = TypeVar("T")
+
+
+class AsyncNeo4jClient:
+    """
+    asyncio counterpart of Neo4jClient, built on the neo4j AsyncDriver so crawlers can overlap db writes with network
+    fetches. At most max_concurrency queries are in flight at once, the rest wait on a semaphore.
+    Must be opened before use, either with `async with AsyncNeo4jClient() as client` or `await client.open()`.
+    """
+    db_config: Neo4jConfig
+    db_driver: AsyncDriver
+    metrics: QueryMetrics
+    DB_MAP: Dict[pm.PackageLocation, str] = Neo4jClient.DB_MAP
+
+    _bootstrapped_uris: Set[str] = set()
+
+    def __init__(self, conf: Neo4jConfig = Neo4jConfig(), max_concurrency: int = 16):
+        self.db_config = conf
+        self.max_concurrency = max_concurrency
+        self.uri = f"neo4j://{self.db_config.host}:{self.db_config.port}"
+        logger.info(f"Targeting neo4j on URI {self.uri}")
+        self.db_driver = AsyncGraphDatabase.driver(uri=self.uri, auth=("neo4j", self.db_config.password))
+        self.metrics = QueryMetrics()
+        # asyncio primitives are bound to the running loop (on 3.8), so they're created in open()
+        self._limiter: Optional[asyncio.Semaphore] = None
+        self._bootstrap_lock: Optional[asyncio.Lock] = None
+
+    async def open(self) -> "AsyncNeo4jClient":
+        if self._limiter is None:
+            self._limiter = asyncio.Semaphore(self.max_concurrency)
+            self._bootstrap_lock = asyncio.Lock()
+        async with self._bootstrap_lock:
+            if self.uri not in self._bootstrapped_uris:
+                logger.info(f"DB Auth: {await self.db_driver.verify_authentication()}")
+                await self._create_dbs()
+                self._bootstrapped_uris.add(self.uri)
+        return self
+
+    async def close(self):
+        await self.db_driver.close()
+
+    async def __aenter__(self) -> "AsyncNeo4jClient":
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Read Queries ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    async def package_version_exists(self, target: pm.PackageVersionIdentifier) -> bool:
+        target_db = self.DB_MAP[target.location]
+        query_params = {"version": target.version, "name": target.name.lower()}
+        response = await self._run_query(cq.PACKAGE_VERSION_EXISTS_QUERY, query_params, target_db)
+        return response.values[0][0]
+
+    async def package_exists(self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]) -> bool:
+        target_db = self.DB_MAP[target.location]
+        query_params = {"name": target.name.lower()}
+        response = await self._run_query(cq.PACKAGE_EXISTS_QUERY, query_params, target_db)
+        return response.values[0][0]
+
+    async def read_package_node(
+        self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]
+    ) -> Optional[gm.Package]:
+        target_db = self.DB_MAP[target.location]
+        query_params = {"name": target.name.lower()}
+        response = await self._run_query(cq.READ_PACKAGE_QUERY, query_params, target_db)
+        if len(response.values) == 0:
+            return None
+        return gm.Package.from_node(response.values[0][0])
+
+    async def read_package_version_release_edge(
+        self, target: pm.PackageVersionIdentifier
+    ) -> Optional[gm.ReleaseEdge]:
+        target_db = self.DB_MAP[target.location]
+        query_params = {"name": target.name.lower(), "version": target.version}
+        response = await self._run_query(cq.READ_RELEASE_EDGE_QUERY, query_params, target_db)
+        if (response.values is None or len(response.values) == 0) or len(response.values[0]) != 3:
+            return None
+        package_node, release_relation, version_node = response.values[0]
+        return gm.ReleaseEdge.from_relation(release_relation)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Reads ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    async def existing_package_versions(
+        self, targets: Sequence[pm.PackageVersionIdentifier], chunk_size: Optional[int] = None
+    ) -> Set[pm.PackageVersionIdentifier]:
+        existing: Set[pm.PackageVersionIdentifier] = set()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=True)
+            rows = [{"name": name, "version": version} for name, version in by_key.keys()]
+            found = await self._run_grouped_read(cq.BULK_PACKAGE_VERSIONS_EXIST_QUERY, rows, database, chunk_size)
+            for values in found:
+                existing.update(by_key[(values[0], values[1])])
+        return existing
+
+    async def read_package_nodes(
+        self,
+        targets: Sequence[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.Package]:
+        packages: Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.Package] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=False)
+            rows = [{"name": name} for name, _ in by_key.keys()]
+            for values in await self._run_grouped_read(cq.BULK_READ_PACKAGES_QUERY, rows, database, chunk_size):
+                package = gm.Package.from_node(values[1])
+                for target in by_key[(values[0], None)]:
+                    packages[target] = package
+        return packages
+
+    async def read_release_edges(
+        self,
+        targets: Sequence[pm.PackageVersionIdentifier],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[pm.PackageVersionIdentifier, gm.ReleaseEdge]:
+        releases: Dict[pm.PackageVersionIdentifier, gm.ReleaseEdge] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=True)
+            rows = [{"name": name, "version": version} for name, version in by_key.keys()]
+            for values in await self._run_grouped_read(cq.BULK_READ_RELEASE_EDGES_QUERY, rows, database, chunk_size):
+                release = gm.ReleaseEdge.from_relation(values[2])
+                for target in by_key[(values[0], values[1])]:
+                    releases[target] = release
+        return releases
+
+    async def read_package_rows(
+        self,
+        targets: Sequence[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.PackageRow]:
+        packages: Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.PackageRow] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=False)
+            rows = [{"name": name} for name, _ in by_key.keys()]
+            for values in await self._run_grouped_read(cq.BULK_READ_PACKAGE_ROWS_QUERY, rows, database, chunk_size):
+                package = gm.PackageRow._make(values[1:])
+                for target in by_key[(values[0], None)]:
+                    packages[target] = package
+        return packages
+
+    async def read_release_rows(
+        self,
+        targets: Sequence[pm.PackageVersionIdentifier],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[pm.PackageVersionIdentifier, gm.ReleaseRow]:
+        releases: Dict[pm.PackageVersionIdentifier, gm.ReleaseRow] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=True)
+            rows = [{"name": name, "version": version} for name, version in by_key.keys()]
+            for values in await self._run_grouped_read(cq.BULK_READ_RELEASE_ROWS_QUERY, rows, database, chunk_size):
+                release = gm.ReleaseRow.from_values(values[2:])
+                for target in by_key[(values[0], values[1])]:
+                    releases[target] = release
+        return releases
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    async def insert_package(self, package: gm.Package, database: str) -> Optional[QueryResult]:
+        return await self._run_insert(cq.INSERT_PACKAGE_QUERY, package.graph_prop_dict(), database)
+
+    async def insert_package_release(self, release: gm.ReleaseEdge, database: str) -> Optional[QueryResult]:
+        return await self._run_insert(cq.INSERT_RELEASE_QUERY, release.graph_prop_dict(), database)
+
+    async def insert_git_snapshot(self, vcs_capture: gm.CapturedEdge, database: str) -> Optional[QueryResult]:
+        return await self._run_insert(cq.INSERT_GIT_SNAPSHOT_QUERY, vcs_capture.graph_prop_dict(), database)
+
+    async def insert_dep_relations(
+        self, resolved_dep: pm.ResolvedDependency, database: str
+    ) -> Optional[QueryResult]:
+        return await self._run_insert(cq.INSERT_DEP_RELATIONS_QUERY, self._dep_relation_params(resolved_dep), database)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    async def insert_packages(
+        self, packages: Sequence[gm.Package], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return await self._run_bulk_insert(
+            cq.BULK_INSERT_PACKAGES_QUERY, packages, gm.Package.graph_prop_dict, database, chunk_size
+        )
+
+    async def insert_package_releases(
+        self, releases: Sequence[gm.ReleaseEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return await self._run_bulk_insert(
+            cq.BULK_INSERT_RELEASES_QUERY, releases, gm.ReleaseEdge.graph_prop_dict, database, chunk_size
+        )
+
+    async def insert_git_snapshots(
+        self, vcs_captures: Sequence[gm.CapturedEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return await self._run_bulk_insert(
+            cq.BULK_INSERT_GIT_SNAPSHOTS_QUERY, vcs_captures, gm.CapturedEdge.graph_prop_dict, database, chunk_size
+        )
+
+    async def insert_dep_relations_bulk(
+        self, resolved_deps: Sequence[pm.ResolvedDependency], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return await self._run_bulk_insert(
+            cq.BULK_INSERT_DEP_RELATIONS_QUERY, resolved_deps, self._dep_relation_params, database, chunk_size
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Streaming ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    async def stream_query(
+        self,
+        cypher_query: Query,
+        query_params: Dict[str, Any],
+        database: Optional[str] = None,
+        fetch_size: int = 1000,
+        label: Optional[str] = None
+    ) -> AsyncIterator[list]:
+        """
+        Takes a limiter slot only while running the query and fetching each batch of fetch_size records, not while the
+        consumer handles them, so a consumer can await other client calls inside `async for` without holding up (or,
+        once max_concurrency streams are open, deadlocking) the rest of the client. Recorded in metrics as
+        Neo4jClient.stream_query records
+        """
+        logger.debug(f"Streaming Query: {cypher_query.text}, against {'default' if database is None else database} db")
+        started_at = time.perf_counter()
+        row_count = 0
+        try:
+            async with self.db_driver.session(database=database, fetch_size=fetch_size) as session:
+                async with self._limiter:
+                    response = await session.run(cypher_query, query_params)
+                while True:
+                    async with self._limiter:
+                        records = await response.fetch(fetch_size)
+                    if len(records) == 0:
+                        return
+                    for record in records:
+                        row_count += 1
+                        yield record.values()
+        finally:
+            # Recorded even if the consumer stops early, the server side timings aren't known until fully consumed
+            self.metrics.record(
+                label or query_label(cypher_query), database, time.perf_counter() - started_at, rows=row_count
+            )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Transactions ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    async def execute_read(
+        self, work: Callable[..., Awaitable[T]], database: Optional[str] = None, *args, **kwargs
+    ) -> T:
+        async with self._limiter:
+            async with self.db_driver.session(database=database) as session:
+                return await session.execute_read(work, *args, **kwargs)
+
+    async def execute_write(
+        self, work: Callable[..., Awaitable[T]], database: Optional[str] = None, *args, **kwargs
+    ) -> T:
+        async with self._limiter:
+            async with self.db_driver.session(database=database) as session:
+                return await session.execute_write(work, *args, **kwargs)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    _dep_relation_params = staticmethod(Neo4jClient._dep_relation_params)
+    _index_targets = staticmethod(Neo4jClient._index_targets)
+    _group_by_database = Neo4jClient._group_by_database
+
+    async def _run_insert(
+        self, cypher_query: Query, query_params: Dict[str, Any], database: str
+    ) -> Optional[QueryResult]:
+        try:
+            return await self._run_query(cypher_query, query_params, database)
+        except ConstraintError as err:
+            logger.debug(f"{err.message}")
+            return None
+
+    async def _run_grouped_read(
+        self, cypher_query: Query, rows: List[Dict[str, Any]], database: str, chunk_size: Optional[int] = None
+    ) -> List[list]:
+        chunk_size = chunk_size or max(len(rows), 1)
+        chunks = [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+        responses = await asyncio.gather(
+            *[self._run_query(cypher_query, {"rows": chunk}, database) for chunk in chunks]
+        )
+        return [values for response in responses for values in response.values]
+
+    async def _run_bulk_insert(
+        self,
+        cypher_query: Query,
+        items: Sequence[T],
+        to_row: Callable[[T], Dict[str, Any]],
+        database: str,
+        chunk_size: Optional[int] = None,
+    ) -> BulkWriteResult:
+        chunk_size = chunk_size or self.db_config.bulk_chunk_size
+        result = BulkWriteResult(rows_submitted=len(items))
+
+        indexed_rows: List[Tuple[int, Dict[str, Any]]] = []
+        for idx, item in enumerate(items):
+            try:
+                indexed_rows.append((idx, to_row(item)))
+            except ValueError as err:
+                result.failures.append(RowFailure(index=idx, reason=str(err)))
+
+        # Chunks are written sequentially, concurrent chunks from the same batch would just contend on the same locks
+        for start in range(0, len(indexed_rows), chunk_size):
+            chunk = indexed_rows[start:start + chunk_size]
+            result = result.merge(await self._write_chunk(cypher_query, chunk, database))
+        logger.debug(
+            f"Bulk insert into {database}: {result.rows_written}/{result.rows_submitted} rows written "
+            f"in {result.chunks_sent} chunks, {len(result.failures)} failures"
+        )
+        return result
+
+    async def _write_chunk(
+        self, cypher_query: Query, chunk: List[Tuple[int, Dict[str, Any]]], database: str
+    ) -> BulkWriteResult:
+        """
+        See Neo4jClient._write_chunk
+        """
+        rows = [row for _, row in chunk]
+
+        async def write(tx: AsyncManagedTransaction):
+            response = await tx.run(cypher_query, {"rows": rows})
+            return await response.consume()
+
+        started_at = time.perf_counter()
+        try:
+            summary = await self.execute_write(write, database)
+        except ConstraintError as err:
+            if len(chunk) == 1:
+                idx, row = chunk[0]
+                logger.debug(f"Row {idx} rejected: {err.message}")
+                failure = RowFailure(index=idx, row=row, reason=err.message or str(err))
+                return BulkWriteResult(chunks_sent=1, failures=[failure])
+            middle = len(chunk) // 2
+            left = await self._write_chunk(cypher_query, chunk[:middle], database)
+            right = await self._write_chunk(cypher_query, chunk[middle:], database)
+            return BulkWriteResult(chunks_sent=1).merge(left).merge(right)
+        self.metrics.record(query_label(cypher_query), database, time.perf_counter() - started_at, summary)
+        return BulkWriteResult(rows_written=len(chunk), chunks_sent=1)
+
+    async def _create_dbs(self):
+        async with self.db_driver.session() as session:
+            for database in self.DB_MAP.values():
+                try:
+                    await (await session.run(f"CREATE DATABASE {database}")).consume()
+                except exceptions.DatabaseError as err:
+                    if "already exists" not in err.message:
+                        raise err
+        # Constraints and indexes are declared IF NOT EXISTS, so are safe to re-apply to existing dbs
+        await apply_schema_async(self)
+
+    async def _run_query(
+        self,
+        cypher_query: Query,
+        query_params: Dict[str, Any],
+        database: Optional[str] = None,
+        fetch_size: int = 1000,
+        label: Optional[str] = None
+    ) -> QueryResult:
+        logger.debug(f"Running Query: {cypher_query.text}, against {'default' if database is None else database} db")
+        label = label or query_label(cypher_query)
+        if self.db_config.profile_queries:
+            cypher_query = as_profiled(cypher_query)
+        async with self._limiter:
+            # Timed inside the limiter so time spent queueing for a slot isn't counted against the query
+            started_at = time.perf_counter()
+            async with self.db_driver.session(database=database, fetch_size=fetch_size) as session:
+                response = await session.run(cypher_query, query_params)
+                result = QueryResult(values=await response.values(), keys=response.keys(), summary=None)
+                result.summary = await response.consume()
+            wall_seconds = time.perf_counter() - started_at
+        db_hits = profile_db_hits(result.summary.profile) if result.summary.profile is not None else None
+        self.metrics.record(label, database, wall_seconds, result.summary, len(result.values), db_hits)
+        return result
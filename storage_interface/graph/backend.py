@@ -0,0 +1,101 @@
+"""
+The surface of Neo4jClient that crawlers and analyses rely on, so code written against GraphBackend can be handed
+either the Neo4j client or the embedded SQLite backend (storage_interface.graph.embedded) for tests and small runs.
+That covers WriteScheduler, BufferedWriter and the client side DISC and sampling paths.
+
+Anything that runs its own Cypher is Neo4jClient only and not part of the protocol: stream_query(_batches) and the
+streaming adapters built on them, degree_analysis, snapshot export, server side sampling and the schema checks.
+
+Also holds the pure helpers both implementations share, here rather than in neo4j_client as importing that reads the
+Neo4j settings.
+"""
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple, Union, runtime_checkable,
+)
+
+import shared_models.graph_models as gm
+import shared_models.packages as pm
+from storage_interface.graph.internal_models import BulkWriteResult
+
+# Database each ecosystem is stored in
+DB_MAP: Dict[pm.PackageLocation, str] = {pm.PackageLocation.PYPI: "pypi", pm.PackageLocation.NPM: "npm"}
+
+
+def dep_relation_params(resolved_dep: pm.ResolvedDependency) -> Dict[str, Any]:
+    """
+    The parameters of one dep relation insert, names lowercased as every insert stores them
+    """
+    if resolved_dep.source is None:
+        raise ValueError("Dependency is missing source package")
+    return {
+        "dependent_name": resolved_dep.source.name.lower(),
+        "dependent_version": resolved_dep.source.version,
+        "target_name": resolved_dep.target_package.name.lower(),
+        "unresolved_version": resolved_dep.target_version,
+        "version_constraint": resolved_dep.version_constraint,
+        "resolved_version": resolved_dep.resolved_version,
+    }
+
+
+@runtime_checkable
+class GraphBackend(Protocol):
+    DB_MAP: Dict[pm.PackageLocation, str]
+
+    def close(self): ...
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Reads ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def package_version_exists(self, target: pm.PackageVersionIdentifier) -> bool: ...
+
+    def package_exists(self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]) -> bool: ...
+
+    def read_package_node(
+        self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]
+    ) -> Optional[gm.Package]: ...
+
+    def read_package_version_release_edge(self, target: pm.PackageVersionIdentifier) -> Optional[gm.ReleaseEdge]: ...
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    # Each returns None when the write was rejected by a constraint
+    def insert_package(self, package: gm.Package, database: str) -> Optional[Any]: ...
+
+    def insert_package_release(self, release: gm.ReleaseEdge, database: str) -> Optional[Any]: ...
+
+    def insert_git_snapshot(self, vcs_capture: gm.CapturedEdge, database: str) -> Optional[Any]: ...
+
+    def insert_dep_relations(self, resolved_dep: pm.ResolvedDependency, database: str) -> Optional[Any]: ...
+
+    # Rows rejected by a constraint, or malformed, are reported in BulkWriteResult.failures
+    def insert_packages(
+        self, packages: Sequence[gm.Package], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult: ...
+
+    def insert_package_releases(
+        self, releases: Sequence[gm.ReleaseEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult: ...
+
+    def insert_git_snapshots(
+        self, vcs_captures: Sequence[gm.CapturedEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult: ...
+
+    def insert_dep_relations_bulk(
+        self, resolved_deps: Sequence[pm.ResolvedDependency], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult: ...
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Analysis ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def package_names(self, database: str) -> Iterator[str]: ...
+
+    def package_in_degrees(self, database: str) -> Iterator[Tuple[str, int]]: ...
+
+    def package_dependencies(self, database: str) -> Iterator[Tuple[str, str]]: ...
+
+    def disc_scores(self, database: str) -> Iterator[Tuple[str, int, int, int]]: ...
+
+    def package_forks(self, database: str) -> Iterator[Tuple[str, int]]: ...
+
+    def random_packages(self, database: str, package_count: int) -> List[Tuple[str, Optional[str]]]: ...
+
+    def package_repo_url(self, name: str, database: str) -> Optional[str]: ...
+
+    def package_repo_urls(self, names: Iterable[str], database: str) -> Dict[str, Optional[str]]: ...
+
+    def graph_fingerprint(self, database: str) -> Dict[str, int]: ...
@@ -0,0 +1,81 @@
+"""
+Compares the two bulk release decodes on synthetic records, so it runs without a database: Released relationships
+into validated ReleaseEdge models (read_release_edges), and the property columns of BULK_READ_RELEASE_ROWS_QUERY into
+ReleaseRow tuples (read_release_rows). Driver hydration isn't included, which the row query also saves on as it returns
+no Node or Relationship objects.
+
+Run as `python -m storage_interface.graph.bench_decode [record count]`
+"""
+import sys
+import time
+from typing import Any, Callable, List
+
+from loguru import logger
+from neo4j.graph import Graph, Node, Relationship
+
+import shared_models.graph_models as gm
+
+
+def synthetic_releases(count: int) -> List[Relationship]:
+    graph = Graph()
+    released = graph.relationship_type("Released")
+    relations: List[Relationship] = []
+    for index in range(count):
+        package = Node(graph, f"p{index}", 2 * index, ["Package"], {
+            "name": f"Package-{index}",
+            "language": "javascript",
+            "description": "A package",
+            "license": "MIT",
+            "homepage_url": None,
+            "repo_url": f"https://github.com/owner/package-{index}",
+            "author": "someone",
+            "maintainer": ["someone", "someone else"],
+            "indexed_at": 1700000000000 + index,
+        })
+        version = Node(graph, f"v{index}", 2 * index + 1, ["PackageVersion"], {
+            "version": "1.0.0",
+            "change_notes": None,
+            "vcs_tag": None,
+            "indexed_at": 1700000000000 + index,
+        })
+        relation = released(graph, f"r{index}", index, {"released_at": 1690000000000 + index})
+        # The driver's hydration sets the end nodes the same way
+        relation._start_node = package
+        relation._end_node = version
+        relations.append(relation)
+    return relations
+
+
+def release_row_values(relations: List[Relationship]) -> List[List[Any]]:
+    """
+    The record values BULK_READ_RELEASE_ROWS_QUERY returns for the same releases, after the name and version keys
+    """
+    package_fields = gm.PackageRow._fields[1:]
+    version_fields = gm.PackageVersionRow._fields
+    return [
+        [relation.nodes[0]["name"].lower()] + [relation.nodes[0][field] for field in package_fields]
+        + [relation.nodes[1][field] for field in version_fields] + [relation["released_at"]]
+        for relation in relations
+    ]
+
+
+def time_decode(records: List[Any], decode: Callable[[Any], Any]) -> float:
+    started_at = time.perf_counter()
+    for record in records:
+        decode(record)
+    return time.perf_counter() - started_at
+
+
+def main(count: int = 200000):
+    relations = synthetic_releases(count)
+    row_values = release_row_values(relations)
+    validated = time_decode(relations, gm.ReleaseEdge.from_relation)
+    rows = time_decode(row_values, gm.ReleaseRow.from_values)
+    logger.info(
+        f"{count} releases: validated ReleaseEdges {validated:.2f}s ({count / validated:,.0f}/s), "
+        f"ReleaseRows {rows:.2f}s ({count / rows:,.0f}/s), {validated / rows:.1f}x"
+    )
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
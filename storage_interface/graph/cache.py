@@ -0,0 +1,226 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+from pydantic import BaseModel
+
+from storage_interface.config import Neo4jConfig
+from storage_interface.graph.internal_models import QueryResult, BulkWriteResult
+from storage_interface.graph.neo4j_client import Neo4jClient
+import shared_models.graph_models as gm
+import shared_models.packages as pm
+
+CacheKey = Tuple[str, str, Optional[str]]  # (database, package name, version - None for package level lookups)
+_MISSING = object()
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class LookupCache:
+    """
+    Thread safe LRU keyed by (database, name, version), bounded by entry count and by entry age.
+    Each key holds the results of the different lookups (exists, node, ...) made against it, so invalidating a key
+    drops every cached view of that package/version at once.
+
+    Invalidating also bumps the key's generation. A read-through takes the generation before it reads and passes it to
+    put, which drops the value if the key was invalidated in the meantime, so a read racing an insert can't cache the
+    pre-insert value. Generations are kept for the max_size most recently invalidated keys, older keys report the
+    newest generation evicted, which can only make put drop a value it could have kept.
+    """
+    def __init__(self, max_size: int = 100000, ttl_seconds: Optional[float] = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Dict[Hashable, Tuple[float, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._generations: "OrderedDict[CacheKey, int]" = OrderedDict()
+        self._last_generation = 0
+        self._evicted_generation = 0
+
+    def generation(self, key: CacheKey) -> int:
+        with self._lock:
+            return self._generations.get(key, self._evicted_generation)
+
+    def get(self, key: CacheKey, lookup: Hashable) -> Any:
+        """
+        Returns the cached value, or the module level _MISSING sentinel (None is a valid cached value)
+        """
+        with self._lock:
+            slots = self._entries.get(key)
+            cached = slots.get(lookup) if slots is not None else None
+            if cached is None or self._expired(cached[0]):
+                self._misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return cached[1]
+
+    def put(self, key: CacheKey, lookup: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        generation, from generation() before the value was read, skips the put if the key was invalidated since
+        """
+        with self._lock:
+            if generation is not None and self._generations.get(key, self._evicted_generation) != generation:
+                return
+            slots = self._entries.setdefault(key, dict())
+            slots[lookup] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: CacheKey):
+        with self._lock:
+            self._last_generation += 1
+            self._generations[key] = self._last_generation
+            self._generations.move_to_end(key)
+            while len(self._generations) > self.max_size:
+                _, self._evicted_generation = self._generations.popitem(last=False)
+            if self._entries.pop(key, None) is not None:
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+                size=len(self._entries),
+            )
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds
+
+
+class CachedNeo4jClient(Neo4jClient):
+    """
+    Neo4jClient with a read-through LookupCache in front of the package/version lookups used in the dependency
+    resolution loop. Inserts (single and bulk, of every kind) invalidate the package and version keys they touch, so
+    reads never go stale from writes made through this client. Writes made by other processes are only picked up once
+    the TTL lapses.
+    """
+    lookup_cache: LookupCache
+
+    def __init__(self, conf: Neo4jConfig = Neo4jConfig(), lookup_cache: Optional[LookupCache] = None):
+        super().__init__(conf)
+        self.lookup_cache = lookup_cache if lookup_cache is not None else LookupCache()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Read Queries ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def package_version_exists(self, target: pm.PackageVersionIdentifier) -> bool:
+        return self._read_through(
+            self._key(target, target.version), "exists", super().package_version_exists, target
+        )
+
+    def package_exists(self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]) -> bool:
+        return self._read_through(self._key(target), "exists", super().package_exists, target)
+
+    def read_package_node(
+        self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]
+    ) -> Optional[gm.Package]:
+        return self._read_through(self._key(target), "node", super().read_package_node, target)
+
+    def read_package_version_release_edge(self, target: pm.PackageVersionIdentifier) -> Optional[gm.ReleaseEdge]:
+        return self._read_through(
+            self._key(target, target.version), "release", super().read_package_version_release_edge, target
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Invalidation ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def insert_package(self, package: gm.Package, database: str) -> Optional[QueryResult]:
+        response = super().insert_package(package, database)
+        self._invalidate(database, package.name)
+        return response
+
+    def insert_package_release(self, release: gm.ReleaseEdge, database: str) -> Optional[QueryResult]:
+        response = super().insert_package_release(release, database)
+        self._invalidate(database, release.package.name, release.version.version)
+        return response
+
+    def insert_git_snapshot(self, vcs_capture: gm.CapturedEdge, database: str) -> Optional[QueryResult]:
+        response = super().insert_git_snapshot(vcs_capture, database)
+        self._invalidate(database, vcs_capture.package.name)
+        return response
+
+    def insert_dep_relations(self, resolved_dep: pm.ResolvedDependency, database: str) -> Optional[QueryResult]:
+        response = super().insert_dep_relations(resolved_dep, database)
+        self._invalidate_dep_relation(database, resolved_dep)
+        return response
+
+    def insert_packages(
+        self, packages: Sequence[gm.Package], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        result = super().insert_packages(packages, database, chunk_size)
+        for package in packages:
+            self._invalidate(database, package.name)
+        return result
+
+    def insert_package_releases(
+        self, releases: Sequence[gm.ReleaseEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        result = super().insert_package_releases(releases, database, chunk_size)
+        for release in releases:
+            self._invalidate(database, release.package.name, release.version.version)
+        return result
+
+    def insert_git_snapshots(
+        self, vcs_captures: Sequence[gm.CapturedEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        result = super().insert_git_snapshots(vcs_captures, database, chunk_size)
+        for vcs_capture in vcs_captures:
+            self._invalidate(database, vcs_capture.package.name)
+        return result
+
+    def insert_dep_relations_bulk(
+        self, resolved_deps: Sequence[pm.ResolvedDependency], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        result = super().insert_dep_relations_bulk(resolved_deps, database, chunk_size)
+        for resolved_dep in resolved_deps:
+            self._invalidate_dep_relation(database, resolved_dep)
+        return result
+
+    def cache_stats(self) -> CacheStats:
+        return self.lookup_cache.stats()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def _key(self, target: pm.PackageIdentifier, version: Optional[str] = None) -> CacheKey:
+        return self.DB_MAP[target.location], target.name.lower(), version
+
+    def _read_through(self, key: CacheKey, lookup: str, read: Callable[[Any], Any], target: Any) -> Any:
+        cached = self.lookup_cache.get(key, lookup)
+        if cached is not _MISSING:
+            return cached
+        generation = self.lookup_cache.generation(key)
+        value = read(target)
+        self.lookup_cache.put(key, lookup, value, generation)
+        return value
+
+    def _invalidate(self, database: str, name: str, version: Optional[str] = None):
+        # A new release also changes the package level view (the package node may have just been created)
+        self.lookup_cache.invalidate((database, name.lower(), None))
+        if version is not None:
+            self.lookup_cache.invalidate((database, name.lower(), version))
+
+    def _invalidate_dep_relation(self, database: str, resolved_dep: pm.ResolvedDependency):
+        # Both ends' Package nodes have their degree counters updated
+        if resolved_dep.source is not None:
+            self._invalidate(database, resolved_dep.source.name, resolved_dep.source.version)
+        self._invalidate(database, resolved_dep.target_package.name, resolved_dep.resolved_version)
@@ -0,0 +1,48 @@
+"""
+The in_degree, distinct_out_degree and DISC (isolating_coefficient, isolating_centrality) properties on Package nodes
+are maintained by the dep relation inserts, this module fills them in for data loaded before they were.
+
+Run as `python -m storage_interface.graph.degrees` once per database, it is safe to re-run. Re-run it after changing
+queries.DISC_THRESHOLD.
+"""
+from typing import Iterable, Optional
+
+from loguru import logger
+
+import storage_interface.graph.queries as cq
+
+
+def backfill_degrees(client, databases: Optional[Iterable[str]] = None, batch_size: int = 10000):
+    """
+    Recomputes both counters for every Package, committing every batch_size packages so the transaction state
+    stays small on the large ecosystems
+    """
+    databases = list(databases or client.DB_MAP.values())
+    for database in databases:
+        logger.info(f"Backfilling degree counters on {database}")
+        response = client._run_query(cq.BACKFILL_DEGREES_QUERY, {"batch_size": batch_size}, database)
+        logger.info(f"Set {response.summary.counters.properties_set} degree properties on {database}")
+
+
+def backfill_disc(client, databases: Optional[Iterable[str]] = None, batch_size: int = 10000):
+    """
+    Recomputes the DISC properties for every Package from the distinct_out_degree counters, which must be current
+    """
+    databases = list(databases or client.DB_MAP.values())
+    for database in databases:
+        logger.info(f"Backfilling DISC scores (threshold {cq.DISC_THRESHOLD}) on {database}")
+        response = client._run_query(cq.BACKFILL_DISC_QUERY, {"batch_size": batch_size}, database)
+        logger.info(f"Set {response.summary.counters.properties_set} DISC properties on {database}")
+
+
+def main():
+    from storage_interface.graph.neo4j_client import Neo4jClient
+
+    neo_client = Neo4jClient.shared()
+    backfill_degrees(neo_client)
+    backfill_disc(neo_client)
+    neo_client.metrics.log_summary()
+
+
+if __name__ == '__main__':
+    main()
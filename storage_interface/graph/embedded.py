@@ -0,0 +1,351 @@
+"""
+SQLite implementation of GraphBackend, for tests, CI and small experiments that shouldn't need the DozerDB container.
+
+Each node/edge type is a table keyed the way the Cypher MERGEs are, with every ecosystem database sharing the tables
+through a database column. Writes follow the Neo4j client's semantics: ON CREATE only properties, one GitSnapshot per
+package, dependency edges only between existing versions, and None returned where Neo4j would raise a ConstraintError.
+"""
+import json
+import sqlite3
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import shared_models.graph_models as gm
+import shared_models.packages as pm
+from storage_interface.graph.backend import DB_MAP, dep_relation_params
+from storage_interface.graph.internal_models import BulkWriteResult, QueryResult, RowFailure
+from storage_interface.graph.queries import DISC_THRESHOLD
+
+T = TypeVar("T")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS package ("
+    "    database TEXT NOT NULL, name TEXT NOT NULL, language TEXT NOT NULL, description TEXT, license TEXT,"
+    "    homepage_url TEXT, repo_url TEXT, author TEXT, maintainer TEXT, indexed_at INTEGER,"
+    "    PRIMARY KEY (database, name))",
+    "CREATE TABLE IF NOT EXISTS package_version ("
+    "    database TEXT NOT NULL, name TEXT NOT NULL, version TEXT NOT NULL, change_notes TEXT, vcs_tag TEXT,"
+    "    indexed_at INTEGER, released_at REAL,"
+    "    PRIMARY KEY (database, name, version))",
+    "CREATE TABLE IF NOT EXISTS git_snapshot ("
+    "    database TEXT NOT NULL, name TEXT NOT NULL, stars INTEGER, forks INTEGER, watchers INTEGER,"
+    "    issue_count INTEGER, contributor_count INTEGER, active_contributor_count INTEGER, ci_cd TEXT,"
+    "    indexed_at INTEGER, captured_at REAL,"
+    "    PRIMARY KEY (database, name))",
+    "CREATE TABLE IF NOT EXISTS depends_on ("
+    "    database TEXT NOT NULL, dependent_name TEXT NOT NULL, dependent_version TEXT NOT NULL,"
+    "    target_name TEXT NOT NULL, version TEXT, version_constraint TEXT,"
+    "    PRIMARY KEY (database, dependent_name, dependent_version, target_name))",
+    "CREATE TABLE IF NOT EXISTS resolved_dependency ("
+    "    database TEXT NOT NULL, dependent_name TEXT NOT NULL, dependent_version TEXT NOT NULL,"
+    "    target_name TEXT NOT NULL, target_version TEXT NOT NULL,"
+    "    PRIMARY KEY (database, dependent_name, dependent_version, target_name, target_version))",
+    "CREATE INDEX IF NOT EXISTS depends_on_target ON depends_on (database, target_name)",
+    "CREATE INDEX IF NOT EXISTS git_snapshot_forks ON git_snapshot (database, forks)",
+]
+
+PACKAGE_COLUMNS = [
+    "name", "language", "description", "license", "homepage_url", "repo_url", "author", "maintainer", "indexed_at"
+]
+VERSION_COLUMNS = ["version", "change_notes", "vcs_tag", "indexed_at"]
+
+
+class SQLiteGraphBackend:
+    """
+    Defaults to an in-memory database, pass a path to keep the graph between runs. One connection shared behind a
+    lock, so it is safe (if not concurrent) to use from several threads.
+    """
+    DB_MAP: Dict[pm.PackageLocation, str] = DB_MAP
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    def __enter__(self) -> "SQLiteGraphBackend":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Reads ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def package_version_exists(self, target: pm.PackageVersionIdentifier) -> bool:
+        return len(self._select(
+            "SELECT 1 FROM package_version WHERE database = ? AND name = ? AND version = ?",
+            (self.DB_MAP[target.location], target.name.lower(), target.version),
+        )) > 0
+
+    def package_exists(self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]) -> bool:
+        return len(self._select(
+            "SELECT 1 FROM package WHERE database = ? AND name = ?",
+            (self.DB_MAP[target.location], target.name.lower()),
+        )) > 0
+
+    def read_package_node(
+        self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]
+    ) -> Optional[gm.Package]:
+        rows = self._select(
+            f"SELECT {', '.join(PACKAGE_COLUMNS)} FROM package WHERE database = ? AND name = ?",
+            (self.DB_MAP[target.location], target.name.lower()),
+        )
+        return self._package_from_row(rows[0]) if len(rows) > 0 else None
+
+    def read_package_version_release_edge(self, target: pm.PackageVersionIdentifier) -> Optional[gm.ReleaseEdge]:
+        rows = self._select(
+            f"SELECT {', '.join('p.' + column for column in PACKAGE_COLUMNS)}, "
+            f"{', '.join('v.' + column for column in VERSION_COLUMNS)}, v.released_at "
+            "FROM package p JOIN package_version v ON v.database = p.database AND v.name = p.name "
+            "WHERE p.database = ? AND p.name = ? AND v.version = ?",
+            (self.DB_MAP[target.location], target.name.lower(), target.version),
+        )
+        if len(rows) == 0:
+            return None
+        row = rows[0]
+        version = dict(zip(VERSION_COLUMNS, row[len(PACKAGE_COLUMNS):-1]))
+        version["indexed_at"] = gm.from_graph_timestamp(version["indexed_at"])
+        return gm.ReleaseEdge(
+            package=self._package_from_row(row[:len(PACKAGE_COLUMNS)]),
+            version=gm.PackageVersion(**version),
+            released_at=gm.from_graph_timestamp(row[-1]),
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def insert_package(self, package: gm.Package, database: str) -> Optional[QueryResult]:
+        with self._lock, self._conn:
+            if not self._merge_package(package.graph_prop_dict(), database):
+                return None
+        return self._empty_result()
+
+    def insert_package_release(self, release: gm.ReleaseEdge, database: str) -> Optional[QueryResult]:
+        with self._lock, self._conn:
+            if not self._insert_release(release.graph_prop_dict(), database):
+                return None
+        return self._empty_result()
+
+    def insert_git_snapshot(self, vcs_capture: gm.CapturedEdge, database: str) -> Optional[QueryResult]:
+        with self._lock, self._conn:
+            self._insert_git_snapshot(vcs_capture.graph_prop_dict(), database)
+        return self._empty_result()
+
+    def insert_dep_relations(self, resolved_dep: pm.ResolvedDependency, database: str) -> Optional[QueryResult]:
+        params = self._dep_relation_params(resolved_dep)
+        with self._lock, self._conn:
+            self._insert_dep_relation(params, database)
+        return self._empty_result()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    # One transaction per call. chunk_size is accepted for Neo4jClient compatibility, rows rejected by a constraint
+    # (or malformed) are reported in BulkWriteResult.failures the same way
+    def insert_packages(
+        self, packages: Sequence[gm.Package], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(packages, gm.Package.graph_prop_dict, self._merge_package, database)
+
+    def insert_package_releases(
+        self, releases: Sequence[gm.ReleaseEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(releases, gm.ReleaseEdge.graph_prop_dict, self._insert_release, database)
+
+    def insert_git_snapshots(
+        self, vcs_captures: Sequence[gm.CapturedEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(vcs_captures, gm.CapturedEdge.graph_prop_dict, self._insert_git_snapshot, database)
+
+    def insert_dep_relations_bulk(
+        self, resolved_deps: Sequence[pm.ResolvedDependency], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(resolved_deps, self._dep_relation_params, self._insert_dep_relation, database)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Analysis ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def package_names(self, database: str) -> Iterator[str]:
+        for name, in self._select("SELECT name FROM package WHERE database = ?", (database,)):
+            yield name
+
+    def package_in_degrees(self, database: str) -> Iterator[Tuple[str, int]]:
+        yield from self._select(
+            "SELECT p.name, COUNT(d.target_name) AS in_degree FROM package p "
+            "LEFT JOIN depends_on d ON d.database = p.database AND d.target_name = p.name "
+            "WHERE p.database = ? GROUP BY p.name ORDER BY in_degree DESC",
+            (database,),
+        )
+
+    def package_dependencies(self, database: str) -> Iterator[Tuple[str, str]]:
+        yield from self._select(
+            "SELECT DISTINCT dependent_name, target_name FROM depends_on WHERE database = ?", (database,)
+        )
+
+    def disc_scores(self, database: str) -> Iterator[Tuple[str, int, int, int]]:
+        """
+        Same rows as Neo4jClient.disc_scores. Nothing is stored, the degrees and DISC values the Neo4j inserts keep
+        on Package nodes are computed from the edges on each call, for every package as after a backfill
+        """
+        yield from self._select(
+            "WITH edges AS (SELECT DISTINCT dependent_name, target_name FROM depends_on WHERE database = :database), "
+            "out_degree AS (SELECT dependent_name AS name, COUNT(*) AS degree FROM edges GROUP BY dependent_name), "
+            "coefficient AS ("
+            "    SELECT e.target_name AS name, COUNT(*) AS isolating FROM edges e "
+            "    JOIN out_degree o ON o.name = e.dependent_name WHERE o.degree <= :threshold GROUP BY e.target_name) "
+            "SELECT p.name, COALESCE(o.degree, 0) AS out_degree, COALESCE(c.isolating, 0) AS isolating_coefficient, "
+            "    COALESCE(o.degree, 0) * COALESCE(c.isolating, 0) AS isolating_centrality "
+            "FROM package p LEFT JOIN out_degree o ON o.name = p.name LEFT JOIN coefficient c ON c.name = p.name "
+            "WHERE p.database = :database ORDER BY isolating_centrality DESC",
+            {"database": database, "threshold": DISC_THRESHOLD},
+        )
+
+    def package_forks(self, database: str) -> Iterator[Tuple[str, int]]:
+        yield from self._select(
+            "SELECT name, forks FROM git_snapshot WHERE database = ? ORDER BY forks DESC", (database,)
+        )
+
+    def random_packages(self, database: str, package_count: int) -> List[Tuple[str, Optional[str]]]:
+        return self._select(
+            "SELECT name, repo_url FROM package WHERE database = ? ORDER BY random() LIMIT ?",
+            (database, package_count),
+        )
+
+    def package_repo_url(self, name: str, database: str) -> Optional[str]:
+        rows = self._select("SELECT repo_url FROM package WHERE database = ? AND name = ?", (database, name.lower()))
+        return rows[0][0] if len(rows) > 0 else None
+
+    def package_repo_urls(self, names: Iterable[str], database: str) -> Dict[str, Optional[str]]:
+        names = list({name.lower() for name in names})
+        repo_urls: Dict[str, Optional[str]] = {}
+        # Chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            repo_urls.update(self._select(
+                f"SELECT name, repo_url FROM package WHERE database = ? AND name IN ({', '.join('?' * len(chunk))})",
+                (database, *chunk),
+            ))
+        return repo_urls
+
+    def graph_fingerprint(self, database: str) -> Dict[str, int]:
+        counts = {
+            "packages": "SELECT COUNT(*) FROM package WHERE database = ?",
+            "versions": "SELECT COUNT(*) FROM package_version WHERE database = ?",
+            "git_snapshots": "SELECT COUNT(*) FROM git_snapshot WHERE database = ?",
+            # A Released edge is a version row joined to its package row
+            "released": "SELECT COUNT(*) FROM package_version v JOIN package p "
+                        "ON p.database = v.database AND p.name = v.name WHERE v.database = ?",
+            "depends_on": "SELECT COUNT(*) FROM depends_on WHERE database = ?",
+            "resolved_dependencies": "SELECT COUNT(*) FROM resolved_dependency WHERE database = ?",
+        }
+        return {key: self._select(statement, (database,))[0][0] for key, statement in counts.items()}
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def _select(self, statement: str, params: Union[tuple, Dict[str, Any]]) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(statement, params).fetchall()
+
+    def _merge_package(self, props: Dict[str, Any], database: str) -> bool:
+        """
+        MERGE on (name, language) under a unique name constraint, False where Neo4j would raise a ConstraintError.
+        Called holding _lock inside a transaction
+        """
+        self._conn.execute(
+            "INSERT INTO package VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+            (database, props["name"], props["language"], props["description"], props["license"],
+             props["homepage_url"], props["repo_url"], props["author"], json.dumps(props["maintainer"]),
+             _now_millis()),
+        )
+        language = self._conn.execute(
+            "SELECT language FROM package WHERE database = ? AND name = ?", (database, props["name"])
+        ).fetchone()[0]
+        return language == props["language"]
+
+    def _insert_release(self, props: Dict[str, Any], database: str) -> bool:
+        if not self._merge_package(props, database):
+            return False
+        self._conn.execute(
+            "INSERT INTO package_version VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+            (database, props["name"], props["version"], props["change_notes"], props["vcs_tag"], _now_millis(),
+             props["released_at"]),
+        )
+        return True
+
+    def _insert_git_snapshot(self, props: Dict[str, Any], database: str) -> bool:
+        # Only captured when the package exists, and like the MERGE only the first snapshot of a package sticks
+        self._conn.execute(
+            "INSERT INTO git_snapshot "
+            "SELECT database, name, ?, ?, ?, ?, ?, ?, ?, ?, ? FROM package WHERE database = ? AND name = ? "
+            "ON CONFLICT DO NOTHING",
+            (props["stars"], props["forks"], props["watchers"], props["issues"], props["contributors"],
+             props["active_contributors"], _plain(props["ci_cd"]), _now_millis(), props["captured_at"],
+             database, props["name"]),
+        )
+        return True
+
+    def _insert_dep_relation(self, params: Dict[str, Any], database: str) -> bool:
+        both_exist = self._conn.execute(
+            "SELECT "
+            "EXISTS (SELECT 1 FROM package_version WHERE database = ? AND name = ? AND version = ?) AND "
+            "EXISTS (SELECT 1 FROM package_version WHERE database = ? AND name = ? AND version = ?)",
+            (database, params["dependent_name"], params["dependent_version"],
+             database, params["target_name"], params["resolved_version"]),
+        ).fetchone()[0]
+        if not both_exist:
+            return True
+        self._conn.execute(
+            "INSERT INTO depends_on VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+            (database, params["dependent_name"], params["dependent_version"], params["target_name"],
+             params["unresolved_version"], _plain(params["version_constraint"])),
+        )
+        self._conn.execute(
+            "INSERT INTO resolved_dependency VALUES (?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+            (database, params["dependent_name"], params["dependent_version"], params["target_name"],
+             params["resolved_version"]),
+        )
+        return True
+
+    def _run_bulk_insert(
+        self,
+        items: Sequence[T],
+        to_row: Callable[[T], Dict[str, Any]],
+        insert_row: Callable[[Dict[str, Any], str], bool],
+        database: str,
+    ) -> BulkWriteResult:
+        result = BulkWriteResult(rows_submitted=len(items), chunks_sent=1)
+        with self._lock, self._conn:
+            for idx, item in enumerate(items):
+                try:
+                    row = to_row(item)
+                except ValueError as err:
+                    result.failures.append(RowFailure(index=idx, reason=str(err)))
+                    continue
+                if insert_row(row, database):
+                    result.rows_written += 1
+                else:
+                    reason = "Package already exists with another language"
+                    result.failures.append(RowFailure(index=idx, row=row, reason=reason))
+        return result
+
+    _dep_relation_params = staticmethod(dep_relation_params)
+
+    @staticmethod
+    def _package_from_row(row: tuple) -> gm.Package:
+        package = dict(zip(PACKAGE_COLUMNS, row))
+        package["maintainer"] = json.loads(package["maintainer"])
+        package["indexed_at"] = gm.from_graph_timestamp(package["indexed_at"])
+        return gm.Package(**package)
+
+    @staticmethod
+    def _empty_result() -> QueryResult:
+        return QueryResult(values=[], keys=(), summary=None)
+
+
+def _now_millis() -> int:
+    # Same units as Cypher's timestamp()
+    return int(time.time() * 1000)
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, List, Optional
 
 from pydantic import BaseModel
 
@@ -7,3 +7,24 @@ class QueryResult(BaseModel):
     values: list
     keys: tuple
     summary: Any
+
+
+class RowFailure(BaseModel):
+    index: int  # Position of the row in the batch handed to the bulk insert
+    row: Optional[dict] = None
+    reason: str
+
+
+class BulkWriteResult(BaseModel):
+    rows_submitted: int = 0
+    rows_written: int = 0
+    chunks_sent: int = 0
+    failures: List[RowFailure] = []
+
+    def merge(self, other: "BulkWriteResult") -> "BulkWriteResult":
+        return BulkWriteResult(
+            rows_submitted=self.rows_submitted + other.rows_submitted,
+            rows_written=self.rows_written + other.rows_written,
+            chunks_sent=self.chunks_sent + other.chunks_sent,
+            failures=self.failures + other.failures,
+        )
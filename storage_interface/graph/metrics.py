@@ -0,0 +1,174 @@
+"""
+Per-query instrumentation for the graph clients. Stats are aggregated per (label, database) so a run can be broken
+down by which queries dominate it, and exported as a log summary, JSON, or Prometheus text exposition format.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+from neo4j import Query
+from pydantic import BaseModel
+
+from storage_interface.graph.queries import QUERY_LABELS
+
+# Statements that can't be prefixed with PROFILE
+_UNPROFILABLE_PREFIXES = (
+    "EXPLAIN", "PROFILE", "CREATE DATABASE", "CREATE CONSTRAINT", "CREATE INDEX", "USE ", "DROP ",
+)
+
+
+class QueryStats(BaseModel):
+    label: str
+    database: str
+    count: int = 0
+    rows: int = 0
+    wall_ms: float = 0.0
+    max_wall_ms: float = 0.0
+    available_after_ms: float = 0.0  # Server side time until the first record was available
+    consumed_after_ms: float = 0.0  # Server side time from first record available to result fully consumed
+    db_hits: Optional[int] = None  # Only populated when queries are PROFILEd
+
+    @property
+    def mean_wall_ms(self) -> float:
+        return self.wall_ms / self.count if self.count > 0 else 0.0
+
+
+def query_label(cypher_query: Query) -> str:
+    """
+    Name of the shared query constant if it is one, otherwise the query's first line
+    """
+    if cypher_query.text in QUERY_LABELS:
+        return QUERY_LABELS[cypher_query.text]
+    first_line = " ".join(cypher_query.text.strip().splitlines()[0].split()) if cypher_query.text.strip() else ""
+    return first_line[:60]
+
+
+def as_profiled(cypher_query: Query) -> Query:
+    if cypher_query.text.lstrip().upper().startswith(_UNPROFILABLE_PREFIXES):
+        return cypher_query
+    return Query(f"PROFILE {cypher_query.text}", cypher_query.metadata, cypher_query.timeout)
+
+
+def profile_db_hits(profile: Optional[Dict[str, Any]]) -> int:
+    """
+    Sums dbHits over a PROFILE plan tree
+    """
+    if profile is None:
+        return 0
+    hits = profile.get("dbHits", 0) or 0
+    for child in profile.get("children", []):
+        hits += profile_db_hits(child)
+    return hits
+
+
+class QueryMetrics:
+    """
+    Thread safe registry of QueryStats. Recording is a dict update under a lock, cheap next to a network round trip.
+    """
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], QueryStats] = dict()
+        self._lock = threading.Lock()
+        self._log_timer: Optional[threading.Timer] = None
+
+    def record(
+        self,
+        label: str,
+        database: Optional[str],
+        wall_seconds: float,
+        summary: Any = None,
+        rows: int = 0,
+        db_hits: Optional[int] = None,
+    ):
+        database = database or "default"
+        wall_ms = wall_seconds * 1000
+        with self._lock:
+            stats = self._stats.setdefault((label, database), QueryStats(label=label, database=database))
+            stats.count += 1
+            stats.rows += rows
+            stats.wall_ms += wall_ms
+            stats.max_wall_ms = max(stats.max_wall_ms, wall_ms)
+            if summary is not None:
+                stats.available_after_ms += summary.result_available_after or 0
+                stats.consumed_after_ms += summary.result_consumed_after or 0
+            if db_hits is not None:
+                stats.db_hits = (stats.db_hits or 0) + db_hits
+
+    def snapshot(self) -> List[QueryStats]:
+        """
+        Copies of the current stats, slowest (by total wall time) first
+        """
+        with self._lock:
+            stats = [entry.model_copy() for entry in self._stats.values()]
+        return sorted(stats, key=lambda entry: entry.wall_ms, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Exports ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def log_summary(self, top: int = 10):
+        stats = self.snapshot()
+        if len(stats) == 0:
+            return
+        lines = [
+            f"{entry.label} [{entry.database}]: {entry.count} runs, {entry.wall_ms / 1000:.2f}s total, "
+            f"{entry.mean_wall_ms:.1f}ms mean, {entry.max_wall_ms:.1f}ms max, {entry.rows} rows"
+            + (f", {entry.db_hits} db hits" if entry.db_hits is not None else "")
+            for entry in stats[:top]
+        ]
+        logger.info("Query metrics (by total wall time):\n    " + "\n    ".join(lines))
+
+    def start_periodic_log(self, interval_seconds: float = 300, top: int = 10):
+        """
+        Logs a summary every interval_seconds on a daemon timer until stop_periodic_log is called
+        """
+        def tick():
+            self.log_summary(top)
+            self.start_periodic_log(interval_seconds, top)
+
+        self._log_timer = threading.Timer(interval_seconds, tick)
+        self._log_timer.daemon = True
+        self._log_timer.start()
+
+    def stop_periodic_log(self):
+        if self._log_timer is not None:
+            self._log_timer.cancel()
+            self._log_timer = None
+
+    def to_json(self) -> str:
+        return json.dumps([entry.model_dump() for entry in self.snapshot()], indent=2)
+
+    def to_prometheus(self, prefix: str = "neo4j_query") -> str:
+        series = [
+            ("count", "counter", "Queries run", lambda entry: entry.count),
+            ("rows_total", "counter", "Records returned", lambda entry: entry.rows),
+            ("wall_seconds_total", "counter", "Client side wall time", lambda entry: entry.wall_ms / 1000),
+            ("wall_seconds_max", "gauge", "Slowest single run", lambda entry: entry.max_wall_ms / 1000),
+            ("result_available_after_seconds_total", "counter", "Server time to first record",
+             lambda entry: entry.available_after_ms / 1000),
+            ("result_consumed_after_seconds_total", "counter", "Server time to consume the result",
+             lambda entry: entry.consumed_after_ms / 1000),
+            ("db_hits_total", "counter", "PROFILE db hits", lambda entry: entry.db_hits),
+        ]
+        stats = self.snapshot()
+        lines: List[str] = []
+        for suffix, metric_type, description, value_of in series:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for entry in stats:
+                value = value_of(entry)
+                if value is None:
+                    continue
+                label = entry.label.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{name}{{label="{label}",database="{entry.database}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, output_path: Union[str, Path]):
+        """
+        Writes the stats to output_path, as Prometheus text if it ends in .prom otherwise as JSON
+        """
+        output_path = Path(output_path)
+        output_path.write_text(self.to_prometheus() if output_path.suffix == ".prom" else self.to_json())
@@ -1,4 +1,6 @@
-from typing import Optional, Dict, Any, Literal, List, Union
+import threading
+import time
+from typing import Optional, Dict, Any, List, Union, Callable, Sequence, TypeVar, Set, Tuple, Iterator, Iterable
 
 from loguru import logger
 from neo4j import GraphDatabase, Driver, Query, Session, exceptions
@@ -7,23 +9,72 @@ from neo4j.exceptions import ConstraintError
 from storage_interface.config import Neo4jConfig
 import shared_models.graph_models as gm
 import shared_models.packages as pm
-from storage_interface.graph.internal_models import QueryResult
+from storage_interface.graph.internal_models import QueryResult, BulkWriteResult, RowFailure
+from storage_interface.graph.backend import DB_MAP, dep_relation_params
+import storage_interface.graph.queries as cq
+from storage_interface.graph.schema import apply_schema
+from storage_interface.graph.metrics import QueryMetrics, query_label, as_profiled, profile_db_hits
+
+T = TypeVar("T")
 
 
 class Neo4jClient:
+    """
+    Safe to share between threads: the driver pools connections and each thread gets its own long-lived session per
+    (database, fetch_size), reused across queries. Use as a context manager, or call close(), to release them.
+    """
     db_config: Neo4jConfig
     db_driver: Driver
-    DB_MAP: Dict[pm.PackageLocation, str] = {pm.PackageLocation.PYPI: "pypi", pm.PackageLocation.NPM: "npm"}
+    metrics: QueryMetrics
+    DB_MAP: Dict[pm.PackageLocation, str] = DB_MAP
+
+    # Auth check + DDL only need running once per process for a given server
+    _bootstrapped_uris: Set[str] = set()
+    _bootstrap_lock = threading.Lock()
+    _shared_instance: Optional["Neo4jClient"] = None
+    _shared_lock = threading.Lock()
 
     def __init__(self, conf: Neo4jConfig = Neo4jConfig()):
         self.db_config = conf
         uri = f"neo4j://{self.db_config.host}:{self.db_config.port}"
         logger.info(f"Targeting neo4j on URI {uri}")
         self.db_driver = GraphDatabase.driver(uri=uri, auth=("neo4j", self.db_config.password))
-        logger.info(f"DB Auth: {self.db_driver.verify_authentication()}")
-        self._create_dbs()
+        self.metrics = QueryMetrics()
+        self._local = threading.local()
+        self._open_sessions: List[Session] = []
+        self._sessions_lock = threading.Lock()
+        with self._bootstrap_lock:
+            if uri not in self._bootstrapped_uris:
+                logger.info(f"DB Auth: {self.db_driver.verify_authentication()}")
+                self._create_dbs()
+                self._bootstrapped_uris.add(uri)
+
+    @classmethod
+    def shared(cls) -> "Neo4jClient":
+        """
+        Process wide client built from the default config, for scripts that would otherwise build one per call
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+        return cls._shared_instance
+
+    def __enter__(self) -> "Neo4jClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def __del__(self):
+        if hasattr(self, "db_driver"):
+            self.close()
+
+    def close(self):
+        with self._sessions_lock:
+            for session in self._open_sessions:
+                session.close()
+            self._open_sessions.clear()
+        self._local = threading.local()
         self.db_driver.close()
 
     """
@@ -37,23 +88,15 @@ class Neo4jClient:
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Read Queries ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
     def package_version_exists(self, target: pm.PackageVersionIdentifier) -> bool:
         target_db = self.DB_MAP[target.location]
-        query_text = ("MATCH (p:Package {name: $name})-[:Released]->(pv:PackageVersion {version: $version})"
-                      "WITH COUNT(pv) > 0  as node_exists "
-                      "RETURN node_exists"
-                     )
         query_params = {"version": target.version, "name": target.name.lower()}
-        response = self._run_query(Query(query_text), query_params, target_db)
+        response = self._run_query(cq.PACKAGE_VERSION_EXISTS_QUERY, query_params, target_db)
         exists = response.values[0][0]
         return exists
 
     def package_exists(self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]) -> bool:
         target_db = self.DB_MAP[target.location]
-        query_text = ("MATCH (p:Package {name: $name})"
-                      "WITH COUNT(p) > 0  as node_exists "
-                      "RETURN node_exists"
-                      )
         query_params = {"name": target.name.lower()}
-        response = self._run_query(Query(query_text), query_params, target_db)
+        response = self._run_query(cq.PACKAGE_EXISTS_QUERY, query_params, target_db)
         exists = response.values[0][0]
         return exists
 
@@ -61,11 +104,8 @@ class Neo4jClient:
         self, target: Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]
     ) -> Optional[gm.Package]:
         target_db = self.DB_MAP[target.location]
-        query_text = ("MATCH (p:Package {name: $name})"
-                      "RETURN p"
-                      )
         query_params = {"name": target.name.lower()}
-        response = self._run_query(Query(query_text), query_params, target_db)
+        response = self._run_query(cq.READ_PACKAGE_QUERY, query_params, target_db)
         logger.debug(f"reading package response: {response.values}")
         if len(response.values) == 0:
             return None
@@ -74,35 +114,112 @@ class Neo4jClient:
 
     def read_package_version_release_edge(self, target: pm.PackageVersionIdentifier) -> Optional[gm.ReleaseEdge]:
         target_db = self.DB_MAP[target.location]
-        query_text = ("MATCH (p:Package {name: $name})-[r:Released]->(pv:PackageVersion {version: $version})"
-                      "RETURN p, r, pv"
-                      )
         query_params = {"name": target.name.lower(), "version": target.version}
-        response = self._run_query(Query(query_text), query_params, target_db)
+        response = self._run_query(cq.READ_RELEASE_EDGE_QUERY, query_params, target_db)
         logger.debug(f"reading package version response: {response.values}")
         if (response.values is None or len(response.values) == 0) or len(response.values[0]) != 3:
             return None
         package_node, release_relation, version_node = response.values[0]
         return gm.ReleaseEdge.from_relation(release_relation)
 
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Reads ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    """
+    Bulk variants of the read queries above. Targets are grouped by database (via DB_MAP) and each group is resolved
+    with one UNWIND query, or one per chunk_size targets if given.
+    """
+    def existing_package_versions(
+        self, targets: Sequence[pm.PackageVersionIdentifier], chunk_size: Optional[int] = None
+    ) -> Set[pm.PackageVersionIdentifier]:
+        existing: Set[pm.PackageVersionIdentifier] = set()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=True)
+            rows = [{"name": name, "version": version} for name, version in by_key.keys()]
+            for values in self._run_grouped_read(cq.BULK_PACKAGE_VERSIONS_EXIST_QUERY, rows, database, chunk_size):
+                existing.update(by_key[(values[0], values[1])])
+        return existing
+
+    def read_package_nodes(
+        self,
+        targets: Sequence[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.Package]:
+        """
+        Returns the Package node for each target that exists, missing targets are left out.
+        For large reads read_package_rows skips hydrating and validating, see bench_decode for the difference
+        """
+        packages: Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.Package] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=False)
+            rows = [{"name": name} for name, _ in by_key.keys()]
+            for values in self._run_grouped_read(cq.BULK_READ_PACKAGES_QUERY, rows, database, chunk_size):
+                package = gm.Package.from_node(values[1])
+                for target in by_key[(values[0], None)]:
+                    packages[target] = package
+        return packages
+
+    def read_release_edges(
+        self,
+        targets: Sequence[pm.PackageVersionIdentifier],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[pm.PackageVersionIdentifier, gm.ReleaseEdge]:
+        """
+        Returns the Released edge for each target that exists, missing targets are left out.
+        read_release_rows is the unvalidated equivalent
+        """
+        releases: Dict[pm.PackageVersionIdentifier, gm.ReleaseEdge] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=True)
+            rows = [{"name": name, "version": version} for name, version in by_key.keys()]
+            for values in self._run_grouped_read(cq.BULK_READ_RELEASE_EDGES_QUERY, rows, database, chunk_size):
+                release = gm.ReleaseEdge.from_relation(values[2])
+                for target in by_key[(values[0], values[1])]:
+                    releases[target] = release
+        return releases
+
+    def read_package_rows(
+        self,
+        targets: Sequence[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier]],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.PackageRow]:
+        """
+        read_package_nodes as unvalidated gm.PackageRow tuples, built from the record values without hydrating nodes
+        """
+        packages: Dict[Union[pm.PackageIdentifier, pm.PackageVersionIdentifier], gm.PackageRow] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=False)
+            rows = [{"name": name} for name, _ in by_key.keys()]
+            for values in self._run_grouped_read(cq.BULK_READ_PACKAGE_ROWS_QUERY, rows, database, chunk_size):
+                package = gm.PackageRow._make(values[1:])
+                for target in by_key[(values[0], None)]:
+                    packages[target] = package
+        return packages
+
+    def read_release_rows(
+        self,
+        targets: Sequence[pm.PackageVersionIdentifier],
+        chunk_size: Optional[int] = None,
+    ) -> Dict[pm.PackageVersionIdentifier, gm.ReleaseRow]:
+        """
+        read_release_edges as unvalidated gm.ReleaseRow tuples
+        """
+        releases: Dict[pm.PackageVersionIdentifier, gm.ReleaseRow] = dict()
+        for database, group in self._group_by_database(targets).items():
+            by_key = self._index_targets(group, with_version=True)
+            rows = [{"name": name, "version": version} for name, version in by_key.keys()]
+            for values in self._run_grouped_read(cq.BULK_READ_RELEASE_ROWS_QUERY, rows, database, chunk_size):
+                release = gm.ReleaseRow.from_values(values[2:])
+                for target in by_key[(values[0], values[1])]:
+                    releases[target] = release
+        return releases
+
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Insert Nodes Without Edges ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
     def insert_package(self, package: gm.Package, database: str) -> Optional[QueryResult]:
         """
         Inserts a standalone package
         """
-        query_text = ("MERGE (package: Package {name:$name, language:$language})\n"
-                      "ON CREATE\n"
-                      "    SET package.description = $description\n"
-                      "    SET package.license = $license\n"
-                      "    SET package.homepage_url = $homepage_url\n"
-                      "    SET package.repo_url = $repo_url\n"
-                      "    SET package.author = $author\n"
-                      "    SET package.maintainer = $maintainer\n"
-                      "    SET package.indexed_at = timestamp()\n"
-                     )
         query_params: Dict[str, Any] = package.graph_prop_dict()
         try:
-            response = self._run_query(Query(query_text), query_params, database)
+            response = self._run_query(cq.INSERT_PACKAGE_QUERY, query_params, database)
         except ConstraintError as err:
             logger.debug(f"{err.message}")
             return None
@@ -113,25 +230,9 @@ class Neo4jClient:
         """
         Inserts a package, a version of that package, and an edge connecting the two into the target db
         """
-        query_text = ("MERGE (package: Package {name:$name, language:$language})\n"
-                      "ON CREATE\n"
-                      "    SET package.description = $description\n"
-                      "    SET package.license = $license\n"
-                      "    SET package.homepage_url = $homepage_url\n"
-                      "    SET package.repo_url = $repo_url\n"
-                      "    SET package.author = $author\n"
-                      "    SET package.maintainer = $maintainer\n"
-                      "    SET package.indexed_at = timestamp()\n"
-                      "MERGE (package)-[release: Released]->(package_version: PackageVersion {version:$version})\n"
-                      "ON CREATE\n"
-                      "    SET package_version.change_notes = $change_notes\n"
-                      "    SET package_version.vcs_tag = $vcs_tag\n"
-                      "    SET package_version.indexed_at = timestamp()\n"
-                      "    SET release.released_at = $released_at\n"
-                     )
         query_params: Dict[str, Any] = release.graph_prop_dict()
         try:
-            response = self._run_query(Query(query_text), query_params, database)
+            response = self._run_query(cq.INSERT_RELEASE_QUERY, query_params, database)
         except ConstraintError as err:
             logger.debug(f"{err.message}")
             return None
@@ -141,23 +242,9 @@ class Neo4jClient:
         """
         inserts a GitSnapshot for an existing Package and connects the two with an edge
         """
-        query_text = (
-            "MATCH (tgt_package:Package {name:$name})\n"
-            "MERGE (git_capture: GitSnapshot)-[capture_edge: Captured]->(tgt_package)\n"
-            "ON CREATE\n"
-            "    SET git_capture.stars = $stars\n"
-            "    SET git_capture.forks = $forks\n"
-            "    SET git_capture.watchers = $watchers\n"
-            "    SET git_capture.issue_count = $issues\n"
-            "    SET git_capture.contributor_count = $contributors\n"
-            "    SET git_capture.active_contributor_count = $active_contributors\n"
-            "    SET git_capture.ci_cd = $ci_cd\n"
-            "    SET git_capture.indexed_at = timestamp()\n"
-            "    SET capture_edge.captured_at = $captured_at\n"
-        )
         query_params: Dict[str, Any] = vcs_capture.graph_prop_dict()
         try:
-            response = self._run_query(Query(query_text), query_params, database)
+            response = self._run_query(cq.INSERT_GIT_SNAPSHOT_QUERY, query_params, database)
         except ConstraintError as err:
             logger.debug(f"{err.message}")
             return None
@@ -171,74 +258,336 @@ class Neo4jClient:
         Inserts outbound edges from a PackageVersion to a Package, and from the PackageVersion to a release of the Package.
         Assumes that the dependent PackageVersion is already present and well formed.
         Assumes that the dependee Package and PackageVersion are already present and well formed.
+        Bumps the target's in_degree and, if no other version already depended on the target, the dependent
+        Package's distinct_out_degree.
         """
-        if resolved_dep.source is None:
-            raise ValueError("Dependency is missing source package")
-
-        query_text: Literal = (
-            "MATCH (:Package {name:$dependent_name})-[: Released]->(dependent: PackageVersion {version:$dependent_version})\n"
-            "MATCH (tgt_package: Package {name:$target_name})-[: Released]->(tgt_version: PackageVersion {version:$resolved_version})\n"
-            "MERGE (dependent)-[dep_edge: DependsOn]->(tgt_package)\n"
-            "ON CREATE\n"
-            "    SET dep_edge.version = $unresolved_version\n"
-            "    SET dep_edge.constraint = $version_constraint\n"
-            "MERGE (dependent)-[resolved_dep_edge: HasResolvedDependencyOn]->(tgt_version)\n"
-        )
-        query_params: Dict[str, Any] = {
-            "dependent_name": resolved_dep.source.name.lower(),
-            "dependent_version": resolved_dep.source.version,
-            "target_name": resolved_dep.target_package.name.lower(),
-            "unresolved_version": resolved_dep.target_version,
-            "version_constraint": resolved_dep.version_constraint,
-            "resolved_version": resolved_dep.resolved_version,
-        }
+        query_params: Dict[str, Any] = self._dep_relation_params(resolved_dep)
         try:
-            response = self._run_query(Query(query_text), query_params, database)
+            response = self._run_query(cq.INSERT_DEP_RELATIONS_QUERY, query_params, database)
         except ConstraintError as err:
             logger.debug(f"{err.message}")
             return None
         return response
 
-    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
-    def _create_dbs(self):
-        session = self.db_driver.session()
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    """
+    Bulk variants of the insert methods above. Each chunk of rows is sent as a single UNWIND query (one round trip,
+    one transaction). If a chunk trips a constraint the chunk is bisected and retried so only the offending rows are
+    dropped, these are reported back in BulkWriteResult.failures.
+    """
+    def insert_packages(
+        self, packages: Sequence[gm.Package], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(
+            cq.BULK_INSERT_PACKAGES_QUERY, packages, gm.Package.graph_prop_dict, database, chunk_size
+        )
+
+    def insert_package_releases(
+        self, releases: Sequence[gm.ReleaseEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(
+            cq.BULK_INSERT_RELEASES_QUERY, releases, gm.ReleaseEdge.graph_prop_dict, database, chunk_size
+        )
+
+    def insert_git_snapshots(
+        self, vcs_captures: Sequence[gm.CapturedEdge], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        return self._run_bulk_insert(
+            cq.BULK_INSERT_GIT_SNAPSHOTS_QUERY, vcs_captures, gm.CapturedEdge.graph_prop_dict, database, chunk_size
+        )
+
+    def insert_dep_relations_bulk(
+        self, resolved_deps: Sequence[pm.ResolvedDependency], database: str, chunk_size: Optional[int] = None
+    ) -> BulkWriteResult:
+        """
+        Same assumptions as insert_dep_relations. Dependencies missing a source are reported as failures
+        rather than raising, so one bad entry doesn't sink the batch.
+        """
+        return self._run_bulk_insert(
+            cq.BULK_INSERT_DEP_RELATIONS_QUERY, resolved_deps, self._dep_relation_params, database, chunk_size
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Streaming ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def stream_query(
+        self,
+        cypher_query: Query,
+        query_params: Dict[str, Any],
+        database: Optional[str] = None,
+        fetch_size: int = 1000,
+        label: Optional[str] = None
+    ) -> Iterator[list]:
+        """
+        Yields the values of each record as they arrive, the driver pulls fetch_size records from the server at a time
+        so only that many are held in memory. Runs on its own session as an open result would block the thread's
+        shared session.
+        """
+        logger.debug(f"Streaming Query: {cypher_query.text}, against {'default' if database is None else database} db")
+        started_at = time.perf_counter()
+        row_count = 0
         try:
-            session.run("CREATE DATABASE pypi")
-            session.run("USE pypi\n"
-                        "CREATE CONSTRAINT package_name\n"
-                        "FOR (package:Package) REQUIRE package.name IS UNIQUE")
-        except exceptions.DatabaseError as err:
-            if "already exists" not in err.message:
-                raise err
+            with self.db_driver.session(database=database, fetch_size=fetch_size) as session:
+                response = session.run(cypher_query, query_params)
+                for record in response:
+                    row_count += 1
+                    yield record.values()
+        finally:
+            # Recorded even if the consumer stops early, the server side timings aren't known until fully consumed
+            self.metrics.record(
+                label or query_label(cypher_query), database, time.perf_counter() - started_at, rows=row_count
+            )
+
+    def stream_query_batches(
+        self,
+        cypher_query: Query,
+        query_params: Dict[str, Any],
+        database: Optional[str] = None,
+        batch_size: int = 10000,
+        fetch_size: Optional[int] = None,
+        label: Optional[str] = None
+    ) -> Iterator[List[list]]:
+        """
+        stream_query grouped into lists of at most batch_size records
+        """
+        batch: List[list] = []
+        for values in self.stream_query(cypher_query, query_params, database, fetch_size or batch_size, label):
+            batch.append(values)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
 
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Analysis Queries ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    """
+    The whole-ecosystem reads the analyses are built on, part of the GraphBackend protocol so the embedded backend
+    can answer them too. All of them stream, rows are tuples.
+    """
+    def package_names(self, database: str) -> Iterator[str]:
+        for name, in self.stream_query(cq.PACKAGE_NAMES_QUERY, dict(), database):
+            yield name
+
+    def package_in_degrees(self, database: str) -> Iterator[Tuple[str, int]]:
+        """
+        (package name, DependsOn edges pointing at it), highest in-degree first
+        """
+        for name, in_degree in self.stream_query(cq.PACKAGE_IN_DEGREES_QUERY, dict(), database):
+            yield name, in_degree
+
+    def package_dependencies(self, database: str) -> Iterator[Tuple[str, str]]:
+        """
+        Distinct (dependent package, dependency package) pairs, DependsOn collapsed over the dependent's versions
+        """
+        for name, dependency in self.stream_query(cq.PACKAGE_DEPENDENCIES_QUERY, dict(), database):
+            yield name, dependency
+
+    def disc_scores(self, database: str) -> Iterator[Tuple[str, int, int, int]]:
+        """
+        (package name, outDegree, isolatingCoefficient, isolatingCentrality) from the DISC properties the inserts
+        maintain, for every package (0s where it has no DependsOn edges), highest centrality first. Only as current
+        as the last degrees backfill for pre-existing data
+        """
+        for values in self.stream_query(cq.DISC_SCORES_QUERY, dict(), database):
+            yield tuple(values)
+
+    def package_forks(self, database: str) -> Iterator[Tuple[str, int]]:
+        """
+        (package name, forks) for every package with a GitSnapshot, most forked first
+        """
+        for name, forks in self.stream_query(cq.PACKAGE_FORKS_QUERY, dict(), database):
+            yield name, forks
+
+    def random_packages(self, database: str, package_count: int) -> List[Tuple[str, Optional[str]]]:
+        """
+        Uniform sample of package_count (package name, repo url) pairs
+        """
+        response = self._run_query(cq.RANDOM_PACKAGES_QUERY, {"package_count": package_count}, database)
+        return [(name, url) for name, url, _ in response.values]
+
+    def package_repo_url(self, name: str, database: str) -> Optional[str]:
+        response = self._run_query(cq.PACKAGE_REPO_URL_QUERY, {"name": name.lower()}, database)
+        return response.values[0][0] if len(response.values) > 0 else None
+
+    def package_repo_urls(self, names: Iterable[str], database: str) -> Dict[str, Optional[str]]:
+        """
+        {package name: repo url} for every name that is a package, fetched in one round trip. Names are lowercased
+        """
+        names = list({name.lower() for name in names})
+        response = self._run_query(cq.PACKAGE_REPO_URLS_QUERY, {"names": names}, database)
+        return {name: repo_url for name, repo_url in response.values}
+
+    def graph_fingerprint(self, database: str) -> Dict[str, int]:
+        """
+        Node and relationship counts by type, cheap enough to check before every analysis run. Doesn't see property
+        only changes
+        """
+        response = self._run_query(cq.GRAPH_FINGERPRINT_QUERY, dict(), database)
+        return dict(zip(response.keys, response.values[0]))
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Transactions ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def execute_read(self, work: Callable[..., T], database: Optional[str] = None, *args, **kwargs) -> T:
+        """
+        Runs work(tx, *args, **kwargs) in a managed read transaction on this thread's session, retrying on
+        transient errors. work must be idempotent and should consume its results before returning.
+        """
+        return self._session(database).execute_read(work, *args, **kwargs)
+
+    def execute_write(self, work: Callable[..., T], database: Optional[str] = None, *args, **kwargs) -> T:
+        """
+        Write counterpart of execute_read
+        """
+        return self._session(database).execute_write(work, *args, **kwargs)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    _dep_relation_params = staticmethod(dep_relation_params)
+
+    def _group_by_database(self, targets: Sequence[pm.PackageIdentifier]) -> Dict[str, List[pm.PackageIdentifier]]:
+        grouped: Dict[str, List[pm.PackageIdentifier]] = dict()
+        for target in targets:
+            if target.location not in self.DB_MAP:
+                logger.warning(f"No database for {target.location}, skipping {target.name}")
+                continue
+            grouped.setdefault(self.DB_MAP[target.location], []).append(target)
+        return grouped
+
+    @staticmethod
+    def _index_targets(
+        targets: Sequence[pm.PackageIdentifier], with_version: bool
+    ) -> Dict[Tuple[str, Optional[str]], List[pm.PackageIdentifier]]:
+        """
+        Maps the (lowercase name, version) a target is stored under to every target asking for it, so duplicates
+        and differently cased names are only sent once but all get an answer
+        """
+        indexed: Dict[Tuple[str, Optional[str]], List[pm.PackageIdentifier]] = dict()
+        for target in targets:
+            key = (target.name.lower(), target.version if with_version else None)
+            indexed.setdefault(key, []).append(target)
+        return indexed
+
+    def _run_grouped_read(
+        self, cypher_query: Query, rows: List[Dict[str, Any]], database: str, chunk_size: Optional[int] = None
+    ) -> Iterator[list]:
+        chunk_size = chunk_size or max(len(rows), 1)
+        for start in range(0, len(rows), chunk_size):
+            response = self._run_query(cypher_query, {"rows": rows[start:start + chunk_size]}, database)
+            yield from response.values
+
+    def _run_bulk_insert(
+        self,
+        cypher_query: Query,
+        items: Sequence[T],
+        to_row: Callable[[T], Dict[str, Any]],
+        database: str,
+        chunk_size: Optional[int] = None,
+    ) -> BulkWriteResult:
+        chunk_size = chunk_size or self.db_config.bulk_chunk_size
+        result = BulkWriteResult(rows_submitted=len(items))
+
+        # Build rows up front so malformed items are reported instead of raised
+        indexed_rows: List[tuple] = []
+        for idx, item in enumerate(items):
+            try:
+                indexed_rows.append((idx, to_row(item)))
+            except ValueError as err:
+                result.failures.append(RowFailure(index=idx, reason=str(err)))
+
+        for start in range(0, len(indexed_rows), chunk_size):
+            chunk = indexed_rows[start:start + chunk_size]
+            result = result.merge(self._write_chunk(cypher_query, chunk, database))
+        logger.debug(
+            f"Bulk insert into {database}: {result.rows_written}/{result.rows_submitted} rows written "
+            f"in {result.chunks_sent} chunks, {len(result.failures)} failures"
+        )
+        return result
+
+    def _write_chunk(self, cypher_query: Query, chunk: List[tuple], database: str) -> BulkWriteResult:
+        """
+        Writes a chunk of (index, row) pairs in one query. On a constraint violation the chunk is split in half and
+        each half retried, narrowing down to the offending rows in O(failures * log(chunk size)) extra queries.
+        """
+        rows = [row for _, row in chunk]
+        started_at = time.perf_counter()
         try:
-            session.run("CREATE DATABASE npm")
-            session.run("USE npm\n"
-                        "CREATE CONSTRAINT package_name\n"
-                        "FOR (package:Package) REQUIRE package.name IS UNIQUE")
-        except exceptions.DatabaseError as err:
-            if "already exists" not in err.message:
-                raise err
+            # Managed write transaction, so deadlocks and other transient errors are retried by the driver
+            summary = self.execute_write(lambda tx: tx.run(cypher_query, {"rows": rows}).consume(), database)
+        except ConstraintError as err:
+            if len(chunk) == 1:
+                idx, row = chunk[0]
+                logger.debug(f"Row {idx} rejected: {err.message}")
+                failure = RowFailure(index=idx, row=row, reason=err.message or str(err))
+                return BulkWriteResult(chunks_sent=1, failures=[failure])
+            middle = len(chunk) // 2
+            left = self._write_chunk(cypher_query, chunk[:middle], database)
+            right = self._write_chunk(cypher_query, chunk[middle:], database)
+            failed_attempt = BulkWriteResult(chunks_sent=1)
+            return failed_attempt.merge(left).merge(right)
+        self.metrics.record(query_label(cypher_query), database, time.perf_counter() - started_at, summary)
+        return BulkWriteResult(rows_written=len(chunk), chunks_sent=1)
 
+    def _create_dbs(self):
+        session = self.db_driver.session()
+        try:
+            for database in self.DB_MAP.values():
+                try:
+                    session.run(f"CREATE DATABASE {database}").consume()
+                except exceptions.DatabaseError as err:
+                    if "already exists" not in err.message:
+                        raise err
         finally:
             session.close()
+        # Constraints and indexes are declared IF NOT EXISTS, so are safe to re-apply to existing dbs
+        apply_schema(self)
+
+    def _session(self, database: Optional[str] = None, fetch_size: int = 1000) -> Session:
+        """
+        Returns this thread's long-lived session for the database, opening one on first use.
+        Sessions aren't thread safe so they're never handed across threads.
+        """
+        sessions: Dict[Tuple[Optional[str], int], Session] = getattr(self._local, "sessions", None)
+        if sessions is None:
+            sessions = self._local.sessions = dict()
+        session = sessions.get((database, fetch_size))
+        if session is None or session.closed():
+            session = self.db_driver.session(database=database, fetch_size=fetch_size)
+            sessions[(database, fetch_size)] = session
+            with self._sessions_lock:
+                self._open_sessions.append(session)
+        return session
+
+    def _discard_session(self, database: Optional[str], fetch_size: int):
+        sessions = getattr(self._local, "sessions", dict())
+        session = sessions.pop((database, fetch_size), None)
+        if session is None:
+            return
+        with self._sessions_lock:
+            if session in self._open_sessions:
+                self._open_sessions.remove(session)
+        session.close()
 
     def _run_query(
         self,
         cypher_query: Query,
         query_params: Dict[str, Any],
         database: Optional[str] = None,
-        fetch_size: int = 1000
+        fetch_size: int = 1000,
+        label: Optional[str] = None
     ) -> QueryResult:
         result: QueryResult
         logger.debug(f"Running Query: {cypher_query.text}, against {'default' if database is None else database} db")
-        with self.db_driver.session(database=database, fetch_size=fetch_size) as session:
-            try:
-                response = session.run(cypher_query, query_params)
-                result = QueryResult(values=response.values(), keys=response.keys(), summary=None)
-                result.summary = response.consume()
-            finally:
-                # docs say will run close then re-raise any error
-                # https://docs.python.org/3/reference/compound_stmts.html#finally
-                session.close()
+        label = label or query_label(cypher_query)
+        if self.db_config.profile_queries:
+            cypher_query = as_profiled(cypher_query)
+        session = self._session(database, fetch_size)
+        started_at = time.perf_counter()
+        try:
+            response = session.run(cypher_query, query_params)
+            result = QueryResult(values=response.values(), keys=response.keys(), summary=None)
+            result.summary = response.consume()
+        except (exceptions.ServiceUnavailable, exceptions.SessionExpired):
+            # Connection went away underneath the session, don't hand it out again
+            self._discard_session(database, fetch_size)
+            raise
+        db_hits = profile_db_hits(result.summary.profile) if result.summary.profile is not None else None
+        self.metrics.record(
+            label, database, time.perf_counter() - started_at, result.summary, len(result.values), db_hits
+        )
         return result
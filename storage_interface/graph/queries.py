@@ -0,0 +1,368 @@
+"""
+Cypher used by the graph clients, shared so the sync and async clients stay in step
+"""
+import textwrap
+
+from neo4j import Query
+
+# Dependents with at most this many distinct dependencies count towards a package's isolating coefficient.
+# The DISC properties kept on Package nodes are for this value, changing it needs a re-run of the DISC backfill.
+DISC_THRESHOLD = 2
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Read Queries ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+PACKAGE_VERSION_EXISTS_QUERY = Query(
+    "MATCH (p:Package {name: $name})-[:Released]->(pv:PackageVersion {version: $version})"
+    "WITH COUNT(pv) > 0  as node_exists "
+    "RETURN node_exists"
+)
+
+PACKAGE_EXISTS_QUERY = Query(
+    "MATCH (p:Package {name: $name})"
+    "WITH COUNT(p) > 0  as node_exists "
+    "RETURN node_exists"
+)
+
+READ_PACKAGE_QUERY = Query(
+    "MATCH (p:Package {name: $name})"
+    "RETURN p"
+)
+
+READ_RELEASE_EDGE_QUERY = Query(
+    "MATCH (p:Package {name: $name})-[r:Released]->(pv:PackageVersion {version: $version})"
+    "RETURN p, r, pv"
+)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Reads ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+BULK_PACKAGE_VERSIONS_EXIST_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MATCH (p:Package {name: row.name})-[:Released]->(pv:PackageVersion {version: row.version})\n"
+    "RETURN DISTINCT row.name AS name, row.version AS version"
+)
+
+BULK_READ_PACKAGES_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MATCH (p:Package {name: row.name})\n"
+    "RETURN row.name AS name, p"
+)
+
+BULK_READ_RELEASE_EDGES_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MATCH (p:Package {name: row.name})-[r:Released]->(pv:PackageVersion {version: row.version})\n"
+    "RETURN row.name AS name, row.version AS version, r"
+)
+
+# Same reads returning properties rather than nodes, so nothing is hydrated into Node/Relationship objects. Columns
+# after the row key are in the field order of gm.PackageRow and gm.ReleaseRow
+_PACKAGE_ROW_COLUMNS = (
+    "toLower(p.name), p.language, p.description, p.license, p.homepage_url, p.repo_url, p.author, p.maintainer,"
+    " p.indexed_at"
+)
+
+BULK_READ_PACKAGE_ROWS_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MATCH (p:Package {name: row.name})\n"
+    f"RETURN row.name AS name, {_PACKAGE_ROW_COLUMNS}"
+)
+
+BULK_READ_RELEASE_ROWS_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MATCH (p:Package {name: row.name})-[r:Released]->(pv:PackageVersion {version: row.version})\n"
+    f"RETURN row.name AS name, row.version AS version, {_PACKAGE_ROW_COLUMNS},\n"
+    "       pv.version, pv.change_notes, pv.vcs_tag, pv.indexed_at, r.released_at"
+)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+INSERT_PACKAGE_QUERY = Query(
+    "MERGE (package: Package {name:$name, language:$language})\n"
+    "ON CREATE\n"
+    "    SET package.description = $description\n"
+    "    SET package.license = $license\n"
+    "    SET package.homepage_url = $homepage_url\n"
+    "    SET package.repo_url = $repo_url\n"
+    "    SET package.author = $author\n"
+    "    SET package.maintainer = $maintainer\n"
+    "    SET package.indexed_at = timestamp()\n"
+)
+
+INSERT_RELEASE_QUERY = Query(
+    "MERGE (package: Package {name:$name, language:$language})\n"
+    "ON CREATE\n"
+    "    SET package.description = $description\n"
+    "    SET package.license = $license\n"
+    "    SET package.homepage_url = $homepage_url\n"
+    "    SET package.repo_url = $repo_url\n"
+    "    SET package.author = $author\n"
+    "    SET package.maintainer = $maintainer\n"
+    "    SET package.indexed_at = timestamp()\n"
+    "MERGE (package)-[release: Released]->(package_version: PackageVersion {version:$version})\n"
+    "ON CREATE\n"
+    "    SET package_version.change_notes = $change_notes\n"
+    "    SET package_version.vcs_tag = $vcs_tag\n"
+    "    SET package_version.indexed_at = timestamp()\n"
+    "    SET release.released_at = $released_at\n"
+)
+
+INSERT_GIT_SNAPSHOT_QUERY = Query(
+    "MATCH (tgt_package:Package {name:$name})\n"
+    "MERGE (git_capture: GitSnapshot)-[capture_edge: Captured]->(tgt_package)\n"
+    "ON CREATE\n"
+    "    SET git_capture.stars = $stars\n"
+    "    SET git_capture.forks = $forks\n"
+    "    SET git_capture.watchers = $watchers\n"
+    "    SET git_capture.issue_count = $issues\n"
+    "    SET git_capture.contributor_count = $contributors\n"
+    "    SET git_capture.active_contributor_count = $active_contributors\n"
+    "    SET git_capture.ci_cd = $ci_cd\n"
+    "    SET git_capture.indexed_at = timestamp()\n"
+    "    SET capture_edge.captured_at = $captured_at\n"
+)
+
+# Tail of the dep relation inserts keeping the DISC properties current, it only does work when the edge is a new
+# package level dependency. The dependent gains a dependency, so the target gains a low degree dependent if the
+# dependent's new out-degree is within DISC_THRESHOLD. If that new dependency took the dependent just past the
+# threshold it stops counting towards everything else it depends on. Cost is bounded by the dependent's own
+# out-degree, never by the size of the graph.
+_INCREMENTAL_DISC = (
+    "WITH dependent_package, tgt_package, package_dep_existed\n"
+    "CALL {\n"
+    "    WITH dependent_package, tgt_package, package_dep_existed\n"
+    "    WITH dependent_package, tgt_package WHERE NOT package_dep_existed\n"
+    "    SET tgt_package.isolating_coefficient = coalesce(tgt_package.isolating_coefficient, 0)\n"
+    f"        + CASE WHEN dependent_package.distinct_out_degree <= {DISC_THRESHOLD} THEN 1 ELSE 0 END\n"
+    "    SET tgt_package.isolating_centrality =\n"
+    "        coalesce(tgt_package.distinct_out_degree, 0) * tgt_package.isolating_coefficient\n"
+    "    SET dependent_package.isolating_centrality =\n"
+    "        dependent_package.distinct_out_degree * coalesce(dependent_package.isolating_coefficient, 0)\n"
+    f"    WITH dependent_package, tgt_package WHERE dependent_package.distinct_out_degree = {DISC_THRESHOLD + 1}\n"
+    "    MATCH (dependent_package)-[:Released]->(:PackageVersion)-[:DependsOn]->(other:Package)\n"
+    "    WHERE other <> tgt_package\n"
+    "    WITH DISTINCT other\n"
+    "    SET other.isolating_coefficient = other.isolating_coefficient - 1\n"
+    "    SET other.isolating_centrality = coalesce(other.distinct_out_degree, 0) * other.isolating_coefficient\n"
+    "}\n"
+)
+
+# Also maintains the degree counters on the Package nodes, see BACKFILL_DEGREES_QUERY for their definitions.
+# Writing distinct_out_degree before the EXISTS check takes the dependent Package's write lock, so concurrent
+# writers adding the same package level dependency through two different versions can't both count it.
+INSERT_DEP_RELATIONS_QUERY = Query(
+    "MATCH (dependent_package:Package {name:$dependent_name})"
+    "-[: Released]->(dependent: PackageVersion {version:$dependent_version})\n"
+    "MATCH (tgt_package: Package {name:$target_name})"
+    "-[: Released]->(tgt_version: PackageVersion {version:$resolved_version})\n"
+    "SET dependent_package.distinct_out_degree = coalesce(dependent_package.distinct_out_degree, 0)\n"
+    "WITH dependent_package, dependent, tgt_package, tgt_version, EXISTS {\n"
+    "    MATCH (dependent_package)-[:Released]->(:PackageVersion)-[:DependsOn]->(tgt_package)\n"
+    "} AS package_dep_existed\n"
+    "MERGE (dependent)-[dep_edge: DependsOn]->(tgt_package)\n"
+    "ON CREATE\n"
+    "    SET dep_edge.version = $unresolved_version\n"
+    "    SET dep_edge.constraint = $version_constraint\n"
+    "    SET tgt_package.in_degree = coalesce(tgt_package.in_degree, 0) + 1\n"
+    "    SET dependent_package.distinct_out_degree = dependent_package.distinct_out_degree\n"
+    "        + CASE WHEN package_dep_existed THEN 0 ELSE 1 END\n"
+    "MERGE (dependent)-[resolved_dep_edge: HasResolvedDependencyOn]->(tgt_version)\n"
+    + _INCREMENTAL_DISC
+)
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Bulk Inserts ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+BULK_INSERT_PACKAGES_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MERGE (package: Package {name:row.name, language:row.language})\n"
+    "ON CREATE\n"
+    "    SET package.description = row.description\n"
+    "    SET package.license = row.license\n"
+    "    SET package.homepage_url = row.homepage_url\n"
+    "    SET package.repo_url = row.repo_url\n"
+    "    SET package.author = row.author\n"
+    "    SET package.maintainer = row.maintainer\n"
+    "    SET package.indexed_at = timestamp()\n"
+)
+
+BULK_INSERT_RELEASES_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MERGE (package: Package {name:row.name, language:row.language})\n"
+    "ON CREATE\n"
+    "    SET package.description = row.description\n"
+    "    SET package.license = row.license\n"
+    "    SET package.homepage_url = row.homepage_url\n"
+    "    SET package.repo_url = row.repo_url\n"
+    "    SET package.author = row.author\n"
+    "    SET package.maintainer = row.maintainer\n"
+    "    SET package.indexed_at = timestamp()\n"
+    "MERGE (package)-[release: Released]->(package_version: PackageVersion {version:row.version})\n"
+    "ON CREATE\n"
+    "    SET package_version.change_notes = row.change_notes\n"
+    "    SET package_version.vcs_tag = row.vcs_tag\n"
+    "    SET package_version.indexed_at = timestamp()\n"
+    "    SET release.released_at = row.released_at\n"
+)
+
+BULK_INSERT_GIT_SNAPSHOTS_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "MATCH (tgt_package:Package {name:row.name})\n"
+    "MERGE (git_capture: GitSnapshot)-[capture_edge: Captured]->(tgt_package)\n"
+    "ON CREATE\n"
+    "    SET git_capture.stars = row.stars\n"
+    "    SET git_capture.forks = row.forks\n"
+    "    SET git_capture.watchers = row.watchers\n"
+    "    SET git_capture.issue_count = row.issues\n"
+    "    SET git_capture.contributor_count = row.contributors\n"
+    "    SET git_capture.active_contributor_count = row.active_contributors\n"
+    "    SET git_capture.ci_cd = row.ci_cd\n"
+    "    SET git_capture.indexed_at = timestamp()\n"
+    "    SET capture_edge.captured_at = row.captured_at\n"
+)
+
+# Each row runs in its own subquery call so a row sees the edges created by the rows before it, otherwise two rows
+# adding the same package level dependency in one chunk would both count it
+BULK_INSERT_DEP_RELATIONS_QUERY = Query(
+    "UNWIND $rows AS row\n"
+    "CALL {\n"
+    "    WITH row\n"
+    "    MATCH (dependent_package:Package {name:row.dependent_name})"
+    "-[: Released]->(dependent: PackageVersion {version:row.dependent_version})\n"
+    "    MATCH (tgt_package: Package {name:row.target_name})"
+    "-[: Released]->(tgt_version: PackageVersion {version:row.resolved_version})\n"
+    "    SET dependent_package.distinct_out_degree = coalesce(dependent_package.distinct_out_degree, 0)\n"
+    "    WITH row, dependent_package, dependent, tgt_package, tgt_version, EXISTS {\n"
+    "        MATCH (dependent_package)-[:Released]->(:PackageVersion)-[:DependsOn]->(tgt_package)\n"
+    "    } AS package_dep_existed\n"
+    "    MERGE (dependent)-[dep_edge: DependsOn]->(tgt_package)\n"
+    "    ON CREATE\n"
+    "        SET dep_edge.version = row.unresolved_version\n"
+    "        SET dep_edge.constraint = row.version_constraint\n"
+    "        SET tgt_package.in_degree = coalesce(tgt_package.in_degree, 0) + 1\n"
+    "        SET dependent_package.distinct_out_degree = dependent_package.distinct_out_degree\n"
+    "            + CASE WHEN package_dep_existed THEN 0 ELSE 1 END\n"
+    "    MERGE (dependent)-[resolved_dep_edge: HasResolvedDependencyOn]->(tgt_version)\n"
+    + textwrap.indent(_INCREMENTAL_DISC, "    ")
+    + "}\n"
+)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Degree Counters ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+# in_degree: DependsOn edges pointing at the Package, the same count as apoc.node.degree(package, '<DependsOn')
+# distinct_out_degree: distinct Packages depended on by any version of the Package, as in the DISC out-degree
+BACKFILL_DEGREES_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "CALL {\n"
+    "    WITH package\n"
+    "    SET package.in_degree = apoc.node.degree(package, '<DependsOn')\n"
+    "    SET package.distinct_out_degree = SIZE(COLLECT {\n"
+    "        MATCH (package)-[:Released]->(:PackageVersion)-[:DependsOn]->(deptarg:Package)\n"
+    "        RETURN DISTINCT deptarg\n"
+    "    })\n"
+    "} IN TRANSACTIONS OF $batch_size ROWS"
+)
+
+# isolating_coefficient: distinct dependent Packages with distinct_out_degree <= DISC_THRESHOLD
+# isolating_centrality: distinct_out_degree * isolating_coefficient, the DISC score
+# Reads the dependents' distinct_out_degree, so runs after BACKFILL_DEGREES_QUERY
+BACKFILL_DISC_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "CALL {\n"
+    "    WITH package\n"
+    "    SET package.isolating_coefficient = SIZE(COLLECT {\n"
+    "        MATCH (dependent:Package)-[:Released]->(:PackageVersion)-[:DependsOn]->(package)\n"
+    f"        WHERE dependent.distinct_out_degree <= {DISC_THRESHOLD}\n"
+    "        RETURN DISTINCT dependent\n"
+    "    })\n"
+    "    SET package.isolating_centrality = package.distinct_out_degree * package.isolating_coefficient\n"
+    "} IN TRANSACTIONS OF $batch_size ROWS"
+)
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Analysis Queries ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+# A Package with DependsOn edges but no counter on that side, i.e. data loaded before the inserts maintained them and
+# never backfilled. Edgeless packages legitimately have no counters
+MISSING_DEGREE_COUNTERS_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "WHERE (package.in_degree IS NULL AND EXISTS { (:PackageVersion)-[:DependsOn]->(package) })\n"
+    "    OR (package.distinct_out_degree IS NULL\n"
+    "        AND EXISTS { (package)-[:Released]->(:PackageVersion)-[:DependsOn]->(:Package) })\n"
+    "RETURN package.name as name\n"
+    "LIMIT 1"
+)
+
+# The IS NOT NULL lets the planner answer from the name uniqueness constraint's index without loading Package nodes,
+# every Package has a name
+PACKAGE_NAMES_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "WHERE package.name IS NOT NULL\n"
+    "RETURN package.name as name"
+)
+
+PACKAGE_IN_DEGREES_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "CALL {\n"
+    "    WITH package\n"
+    "    WITH apoc.node.degree(package, '<DependsOn') as inDegree\n"
+    "    RETURN inDegree\n"
+    "}\n"
+    "RETURN package.name as name, inDegree\n"
+    "ORDER BY inDegree DESC"
+)
+
+# Package level DependsOn, distinct per dependent inside the subquery so neither side holds the version level edges
+PACKAGE_DEPENDENCIES_QUERY = Query(
+    "MATCH (p:Package)\n"
+    "CALL {\n"
+    "    WITH p\n"
+    "    MATCH (p)-[:Released]->(:PackageVersion)-[:DependsOn]->(dep:Package)\n"
+    "    RETURN DISTINCT dep.name as dependency\n"
+    "}\n"
+    "RETURN p.name as name, dependency"
+)
+
+# Reads the maintained DISC properties, same columns and rows as analysis.disc_engine.DiscEngine.scores. The inserts
+# only set them once a package has a DependsOn edge, so packages without are scored 0 as DiscEngine scores them
+DISC_SCORES_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "RETURN package.name as package_name, coalesce(package.distinct_out_degree, 0) as outDegree,\n"
+    "       coalesce(package.isolating_coefficient, 0) as isolatingCoefficient,\n"
+    "       coalesce(package.isolating_centrality, 0) as isolatingCentrality\n"
+    "ORDER BY isolatingCentrality DESC"
+)
+
+PACKAGE_FORKS_QUERY = Query(
+    "MATCH (p:Package)<-[c:Captured]-(g:GitSnapshot)\n"
+    "RETURN p.name as package_name, g.forks as forks\n"
+    "ORDER BY g.forks DESC"
+)
+
+RANDOM_PACKAGES_QUERY = Query(
+    "MATCH (package:Package)\n"
+    "RETURN package.name as name, package.repo_url as url, rand() as r\n"
+    "ORDER BY r\n"
+    "LIMIT $package_count"
+)
+
+PACKAGE_REPO_URL_QUERY = Query(
+    "MATCH (p:Package {name: $name})\n"
+    "RETURN p.repo_url"
+)
+
+PACKAGE_REPO_URLS_QUERY = Query(
+    "UNWIND $names as name\n"
+    "MATCH (p:Package {name: name})\n"
+    "RETURN p.name as name, p.repo_url as repo_url"
+)
+
+# Node and relationship counts, all answered from the count store so it costs the same on any size of graph
+GRAPH_FINGERPRINT_QUERY = Query(
+    "CALL { MATCH (p:Package) RETURN count(p) as packages }\n"
+    "CALL { MATCH (v:PackageVersion) RETURN count(v) as versions }\n"
+    "CALL { MATCH (g:GitSnapshot) RETURN count(g) as git_snapshots }\n"
+    "CALL { MATCH ()-[r:Released]->() RETURN count(r) as released }\n"
+    "CALL { MATCH ()-[d:DependsOn]->() RETURN count(d) as depends_on }\n"
+    "CALL { MATCH ()-[h:HasResolvedDependencyOn]->() RETURN count(h) as resolved_dependencies }\n"
+    "RETURN packages, versions, git_snapshots, released, depends_on, resolved_dependencies"
+)
+
+# Metrics label for each query above, e.g. INSERT_RELEASE_QUERY -> insert_release
+QUERY_LABELS = {
+    value.text: name[:-len("_QUERY")].lower()
+    for name, value in list(globals().items()) if name.endswith("_QUERY") and isinstance(value, Query)
+}
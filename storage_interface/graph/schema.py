@@ -0,0 +1,247 @@
+"""
+Declares the constraints/indexes every ecosystem database needs and checks the plans of the project's Cypher.
+
+Run as `python -m storage_interface.graph.schema` to apply the schema to every database and EXPLAIN every Query
+in QUERY_MODULES, flagging plans that scan or blow up.
+"""
+import ast
+import importlib
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+from neo4j import Query
+from pydantic import BaseModel
+
+REPO_ROOT = Path(__file__).parents[2]
+QUERY_SOURCE_DIRS = ["analysis", "scorecard_validation", "storage_interface/graph"]
+
+# Modules whose queries are EXPLAINed: every module level Query, and the queries() of module level objects (or dicts
+# of them) that build their Cypher, such as DegreeSpec and CypherPopulation. They are imported rather than parsed, so
+# queries assembled from fragments or f-strings are checked as the text that actually runs
+QUERY_MODULES = [
+    "storage_interface.graph.queries",
+    "storage_interface.graph.snapshot",
+    "analysis.degree_analysis",
+    "analysis.disc_sampling",
+    "analysis.popularity_sampling",
+]
+# Build Query objects only to wrap other queries or schema statements, nothing of their own to check
+QUERY_WRAPPER_MODULES = [
+    "storage_interface.graph.schema",
+    "storage_interface.graph.metrics",
+    "storage_interface.graph.async_neo4j_client",
+    "analysis.stratified_sampling",  # CypherPopulation, checked through the populations in the sampling modules
+]
+
+# Operators that mean a query touches the whole graph, or materialises it, before it can do anything useful
+FLAGGED_OPERATORS: Set[str] = {"AllNodesScan", "CartesianProduct", "Eager"}
+
+# Values for parameters that the planner needs to be given, anything else is bound to an empty string
+EXPLAIN_PARAMS: Dict[str, Any] = {
+    "rows": [], "names": [], "package_count": 1, "batch_size": 1000, "per_bin": 1, "include_low": False,
+}
+
+
+class SchemaItem(BaseModel):
+    name: str
+    statement: str
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Declarations ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+SCHEMA: List[SchemaItem] = [
+    # Uniqueness constraint is also the lookup index for Package {name}
+    SchemaItem(
+        name="package_name",
+        statement="CREATE CONSTRAINT package_name IF NOT EXISTS "
+                  "FOR (package:Package) REQUIRE package.name IS UNIQUE",
+    ),
+    SchemaItem(
+        name="package_language",
+        statement="CREATE INDEX package_language IF NOT EXISTS FOR (package:Package) ON (package.language)",
+    ),
+    SchemaItem(
+        name="package_indexed_at",
+        statement="CREATE INDEX package_indexed_at IF NOT EXISTS FOR (package:Package) ON (package.indexed_at)",
+    ),
+    SchemaItem(
+        name="package_in_degree",
+        statement="CREATE INDEX package_in_degree IF NOT EXISTS FOR (package:Package) ON (package.in_degree)",
+    ),
+    SchemaItem(
+        name="package_distinct_out_degree",
+        statement="CREATE INDEX package_distinct_out_degree IF NOT EXISTS "
+                  "FOR (package:Package) ON (package.distinct_out_degree)",
+    ),
+    SchemaItem(
+        name="package_isolating_centrality",
+        statement="CREATE INDEX package_isolating_centrality IF NOT EXISTS "
+                  "FOR (package:Package) ON (package.isolating_centrality)",
+    ),
+    SchemaItem(
+        name="package_version_version",
+        statement="CREATE INDEX package_version_version IF NOT EXISTS "
+                  "FOR (package_version:PackageVersion) ON (package_version.version)",
+    ),
+    SchemaItem(
+        name="package_version_indexed_at",
+        statement="CREATE INDEX package_version_indexed_at IF NOT EXISTS "
+                  "FOR (package_version:PackageVersion) ON (package_version.indexed_at)",
+    ),
+    SchemaItem(
+        name="released_at",
+        statement="CREATE INDEX released_at IF NOT EXISTS FOR ()-[release:Released]-() ON (release.released_at)",
+    ),
+    SchemaItem(
+        name="git_snapshot_indexed_at",
+        statement="CREATE INDEX git_snapshot_indexed_at IF NOT EXISTS "
+                  "FOR (git_capture:GitSnapshot) ON (git_capture.indexed_at)",
+    ),
+    SchemaItem(
+        name="git_snapshot_forks",
+        statement="CREATE INDEX git_snapshot_forks IF NOT EXISTS FOR (git_capture:GitSnapshot) ON (git_capture.forks)",
+    ),
+    SchemaItem(
+        name="captured_at",
+        statement="CREATE INDEX captured_at IF NOT EXISTS "
+                  "FOR ()-[capture_edge:Captured]-() ON (capture_edge.captured_at)",
+    ),
+]
+
+
+class PlanFinding(BaseModel):
+    source: str  # Where find_queries found the query
+    database: str
+    operators: List[str]
+    query_text: str
+
+
+def _schema_statements(databases: List[str]) -> Iterator[Tuple[str, Query]]:
+    for database in databases:
+        for item in SCHEMA:
+            logger.debug(f"Applying {item.name} to {database}")
+            yield database, Query(item.statement)
+    logger.info(f"Schema applied to {', '.join(databases)}")
+
+
+def apply_schema(client, databases: Optional[Iterable[str]] = None):
+    """
+    Idempotently applies SCHEMA to each database (all of client.DB_MAP by default)
+    """
+    for database, statement in _schema_statements(list(databases or client.DB_MAP.values())):
+        client._run_query(statement, dict(), database)
+
+
+async def apply_schema_async(client, databases: Optional[Iterable[str]] = None):
+    """
+    apply_schema for an AsyncNeo4jClient
+    """
+    for database, statement in _schema_statements(list(databases or client.DB_MAP.values())):
+        await client._run_query(statement, dict(), database)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Plan Checks ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def _builds_queries(value: Any) -> bool:
+    return not isinstance(value, type) and callable(getattr(value, "queries", None))
+
+
+def _built_queries(source: str, value: Any) -> Dict[str, str]:
+    if isinstance(value, Query):
+        return {source: value.text}
+    if _builds_queries(value):
+        return {f"{source}.{builder}": query.text for builder, query in value.queries().items()}
+    found: Dict[str, str] = dict()
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, Query) or _builds_queries(item):
+                found.update(_built_queries(f"{source}[{key!r}]", item))
+    return found
+
+
+def find_queries(modules: Iterable[str] = QUERY_MODULES) -> Dict[str, str]:
+    """
+    Every query the given modules declare, see QUERY_MODULES. Returns {"module.NAME[.builder]": query text}
+    """
+    found: Dict[str, str] = dict()
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+        for name, value in vars(module).items():
+            found.update(_built_queries(f"{module_name}.{name}", value))
+    return found
+
+
+def unchecked_query_sources(
+    modules: Iterable[str] = QUERY_MODULES, source_dirs: Iterable[str] = QUERY_SOURCE_DIRS
+) -> List[str]:
+    """
+    file:line of every Query(...) call in the source dirs outside the checked and wrapper modules, whatever they
+    build is never EXPLAINed
+    """
+    covered = set(modules) | set(QUERY_WRAPPER_MODULES)
+    unchecked: List[str] = []
+    for source_dir in source_dirs:
+        for path in sorted(REPO_ROOT.joinpath(source_dir).glob("*.py")):
+            if ".".join(path.relative_to(REPO_ROOT).with_suffix("").parts) in covered:
+                continue
+            tree = ast.parse(path.read_text(), filename=path.as_posix())
+            unchecked.extend(
+                f"{path.relative_to(REPO_ROOT)}:{node.lineno}" for node in ast.walk(tree)
+                if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "Query"
+            )
+    return unchecked
+
+
+def flagged_operators(plan: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Walks an EXPLAIN plan tree, returning the flagged operators it contains
+    """
+    if plan is None:
+        return []
+    # Operator names come back with the runtime appended, e.g. AllNodesScan@neo4j
+    operator = plan.get("operatorType", "").split("@")[0]
+    hits = [operator] if operator in FLAGGED_OPERATORS else []
+    for child in plan.get("children", []):
+        hits.extend(flagged_operators(child))
+    return hits
+
+
+def explain(client, query_text: str, database: str) -> Optional[Dict[str, Any]]:
+    params = {name: EXPLAIN_PARAMS.get(name, "") for name in re.findall(r"\$(\w+)", query_text)}
+    response = client._run_query(Query(f"EXPLAIN {query_text}"), params, database)
+    return response.summary.plan
+
+
+def check_query_plans(client, databases: Optional[Iterable[str]] = None) -> List[PlanFinding]:
+    databases = list(databases or client.DB_MAP.values())
+    findings: List[PlanFinding] = []
+    for source in unchecked_query_sources():
+        logger.warning(f"Query built at {source} is not in QUERY_MODULES, its plan is not checked")
+    queries = find_queries()
+    logger.info(f"Checking the plans of {len(queries)} queries on {', '.join(databases)}")
+    for source, query_text in queries.items():
+        for database in databases:
+            operators = flagged_operators(explain(client, query_text, database))
+            if len(operators) > 0:
+                findings.append(
+                    PlanFinding(source=source, database=database, operators=operators, query_text=query_text)
+                )
+                logger.warning(f"{source} on {database} plans with {', '.join(operators)}")
+    return findings
+
+
+def main():
+    from storage_interface.graph.neo4j_client import Neo4jClient
+
+    neo_client = Neo4jClient.shared()
+    apply_schema(neo_client)
+    findings = check_query_plans(neo_client)
+    if len(findings) > 0:
+        logger.error(f"{len(findings)} query plans contain flagged operators")
+        sys.exit(1)
+    logger.info("No flagged operators in any query plan")
+
+
+if __name__ == '__main__':
+    main()
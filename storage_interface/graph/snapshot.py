@@ -0,0 +1,294 @@
+"""
+Offline, compressed snapshot of an ecosystem database for analyses that don't need a live Neo4j.
+
+Layout of a snapshot directory (one per database):
+    meta.json                       counts, source database, export time
+    package_names.{bin,offsets}.npy interned package names, package id = position in this table
+    repo_urls.{bin,offsets}.npy     repo_url per package id
+    depends_on_{indptr,indices}.npy CSR adjacency Package -> Package DependsOn, collapsed over versions
+    depended_by_{indptr,indices}.npy  the transpose, for in-degree and dependent lookups
+    depends_on_in_degrees.npy       DependsOn edges pointing at each package, one per dependent version
+    version_{indptr,strings}        versions of each package (CSR over package ids), with released_at
+    snapshot_*.npy                  latest GitSnapshot metrics per package, snapshot_mask marks packages with one
+
+Everything is a flat .npy array so GraphSnapshot can memory-map it.
+Export both ecosystems with `python -m storage_interface.graph.snapshot`. degree_distrib and disc_sampling take
+`--snapshot [directory]` to run from the exports instead of the database.
+"""
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from loguru import logger
+from neo4j import Query
+
+import storage_interface.graph.queries as cq
+
+SNAPSHOT_FORMAT_VERSION = 2
+DEFAULT_SNAPSHOT_DIR = Path(__file__).parents[2].joinpath("dataset", "snapshots")
+
+PACKAGES_QUERY = Query(
+    "MATCH (p:Package)\n"
+    "RETURN p.name as name, p.repo_url as repo_url, apoc.node.degree(p, '<DependsOn') as depends_on_in_degree"
+)
+RELEASES_QUERY = Query(
+    "MATCH (p:Package)-[r:Released]->(pv:PackageVersion)\n"
+    "RETURN p.name as name, pv.version as version, r.released_at as released_at"
+)
+GIT_SNAPSHOTS_QUERY = Query(
+    "MATCH (g:GitSnapshot)-[c:Captured]->(p:Package)\n"
+    "RETURN p.name as name, c.captured_at as captured_at, g.stars, g.forks, g.watchers, g.issue_count,\n"
+    "       g.contributor_count, g.active_contributor_count"
+)
+SNAPSHOT_METRICS = ["stars", "forks", "watchers", "issue_count", "contributor_count", "active_contributor_count"]
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ String Tables ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+class StringTable:
+    """
+    Immutable list of strings stored as one utf-8 blob plus offsets, element i is blob[offsets[i]:offsets[i+1]]
+    """
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self._index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[Optional[str]]) -> "StringTable":
+        encoded = [(value or "").encode("utf-8") for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+        np.cumsum(lengths, out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    @classmethod
+    def load(cls, directory: Path, name: str, mmap_mode: Optional[str] = "r") -> "StringTable":
+        return cls(
+            np.load(directory.joinpath(f"{name}.bin.npy"), mmap_mode=mmap_mode),
+            np.load(directory.joinpath(f"{name}.offsets.npy"), mmap_mode=mmap_mode),
+        )
+
+    def save(self, directory: Path, name: str):
+        np.save(directory.joinpath(f"{name}.bin.npy"), self.blob)
+        np.save(directory.joinpath(f"{name}.offsets.npy"), self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        return bytes(self.blob[self.offsets[idx]:self.offsets[idx + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        raw = bytes(self.blob)
+        for start, end in zip(self.offsets[:-1], self.offsets[1:]):
+            yield raw[start:end].decode("utf-8")
+
+    def index_of(self, value: str) -> Optional[int]:
+        """
+        Reverse lookup, the index is built on first use
+        """
+        if self._index is None:
+            self._index = {entry: idx for idx, entry in enumerate(self)}
+        return self._index.get(value)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Loader ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+class GraphSnapshot:
+    """
+    Memory-mapped view over a snapshot directory written by export_snapshot
+    """
+    def __init__(self, directory: Union[str, Path], mmap_mode: Optional[str] = "r"):
+        self.directory = Path(directory)
+        self.meta = json.loads(self.directory.joinpath("meta.json").read_text())
+        if self.meta["format_version"] != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Snapshot at {self.directory} is format {self.meta['format_version']}, "
+                f"expected {SNAPSHOT_FORMAT_VERSION}. Re-export it."
+            )
+
+        def array(name: str) -> np.ndarray:
+            return np.load(self.directory.joinpath(f"{name}.npy"), mmap_mode=mmap_mode)
+
+        self.package_names = StringTable.load(self.directory, "package_names", mmap_mode)
+        self.repo_urls = StringTable.load(self.directory, "repo_urls", mmap_mode)
+        self.depends_on_indptr = array("depends_on_indptr")
+        self.depends_on_indices = array("depends_on_indices")
+        self.depended_by_indptr = array("depended_by_indptr")
+        self.depended_by_indices = array("depended_by_indices")
+        self.depends_on_in_degrees = array("depends_on_in_degrees")
+        self.version_indptr = array("version_indptr")
+        self.version_strings = StringTable.load(self.directory, "version_strings", mmap_mode)
+        self.version_released_at = array("version_released_at")
+        self.snapshot_mask = array("snapshot_mask")
+        self.snapshot_captured_at = array("snapshot_captured_at")
+        self.snapshot_metrics: Dict[str, np.ndarray] = {
+            metric: array(f"snapshot_{metric}") for metric in SNAPSHOT_METRICS
+        }
+
+    @property
+    def package_count(self) -> int:
+        return len(self.package_names)
+
+    def out_degrees(self) -> np.ndarray:
+        """
+        Distinct packages each package depends on, across all of its versions
+        """
+        return np.diff(self.depends_on_indptr)
+
+    def in_degrees(self) -> np.ndarray:
+        """
+        Distinct packages with at least one version depending on each package
+        """
+        return np.diff(self.depended_by_indptr)
+
+    def dependencies(self, package_id: int) -> np.ndarray:
+        return self.depends_on_indices[self.depends_on_indptr[package_id]:self.depends_on_indptr[package_id + 1]]
+
+    def dependents(self, package_id: int) -> np.ndarray:
+        return self.depended_by_indices[self.depended_by_indptr[package_id]:self.depended_by_indptr[package_id + 1]]
+
+    def versions(self, package_id: int) -> List[Tuple[str, float]]:
+        start, end = self.version_indptr[package_id], self.version_indptr[package_id + 1]
+        return [(self.version_strings[idx], float(self.version_released_at[idx])) for idx in range(start, end)]
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Exporter ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+def build_csr(sources: np.ndarray, targets: np.ndarray, node_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CSR (indptr, indices) for the given edge list, duplicate edges are dropped and neighbours come out sorted
+    """
+    keys = np.unique(sources.astype(np.int64) * node_count + targets.astype(np.int64))
+    sorted_sources = keys // node_count
+    indices = (keys % node_count).astype(np.int32)
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sorted_sources, minlength=node_count), out=indptr[1:])
+    return indptr, indices
+
+
+def export_snapshot(client, database: str, output_dir: Union[str, Path], batch_size: int = 50000) -> Path:
+    """
+    Streams the database into a snapshot directory at output_dir/database. Peak memory is the name index plus the
+    id-encoded edge list, raw query results are only ever held batch_size records at a time.
+    """
+    started_at = time.perf_counter()
+    directory = Path(output_dir).joinpath(database)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Intern package names, ids are assigned in stream order
+    names: List[str] = []
+    repo_urls: List[Optional[str]] = []
+    depends_on_in_degrees: List[int] = []
+    for batch in client.stream_query_batches(PACKAGES_QUERY, dict(), database, batch_size, label="snapshot_packages"):
+        for name, repo_url, depends_on_in_degree in batch:
+            names.append(name)
+            repo_urls.append(repo_url)
+            depends_on_in_degrees.append(depends_on_in_degree)
+    name_to_id = {name: idx for idx, name in enumerate(names)}
+    package_count = len(names)
+    logger.info(f"{database}: interned {package_count} package names")
+
+    # Package level dependency edges
+    source_chunks: List[np.ndarray] = []
+    target_chunks: List[np.ndarray] = []
+    for batch in client.stream_query_batches(
+        cq.PACKAGE_DEPENDENCIES_QUERY, dict(), database, batch_size, label="snapshot_dependencies"
+    ):
+        source_chunks.append(np.fromiter((name_to_id[name] for name, _ in batch), dtype=np.int32, count=len(batch)))
+        target_chunks.append(np.fromiter((name_to_id[dep] for _, dep in batch), dtype=np.int32, count=len(batch)))
+    sources = np.concatenate(source_chunks) if source_chunks else np.zeros(0, dtype=np.int32)
+    targets = np.concatenate(target_chunks) if target_chunks else np.zeros(0, dtype=np.int32)
+    depends_on_indptr, depends_on_indices = build_csr(sources, targets, package_count)
+    depended_by_indptr, depended_by_indices = build_csr(targets, sources, package_count)
+    del sources, targets, source_chunks, target_chunks
+    logger.info(f"{database}: {len(depends_on_indices)} package level dependency edges")
+
+    # Releases, grouped by package so they can be addressed CSR style
+    release_package: List[int] = []
+    release_versions: List[str] = []
+    release_times: List[float] = []
+    for batch in client.stream_query_batches(RELEASES_QUERY, dict(), database, batch_size, label="snapshot_releases"):
+        for name, version, released_at in batch:
+            release_package.append(name_to_id[name])
+            release_versions.append(version)
+            release_times.append(np.nan if released_at is None else float(released_at))
+    release_ids = np.asarray(release_package, dtype=np.int64)
+    release_order = np.argsort(release_ids, kind="stable")
+    version_indptr = np.zeros(package_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(release_ids, minlength=package_count), out=version_indptr[1:])
+    version_strings = StringTable.from_strings(release_versions[idx] for idx in release_order)
+    version_released_at = np.asarray(release_times, dtype=np.float64)[release_order]
+    del release_package, release_versions, release_times, release_ids
+
+    # Latest GitSnapshot per package
+    snapshot_mask = np.zeros(package_count, dtype=bool)
+    snapshot_captured_at = np.full(package_count, np.nan, dtype=np.float64)
+    snapshot_metrics = {metric: np.full(package_count, -1, dtype=np.int64) for metric in SNAPSHOT_METRICS}
+    for batch in client.stream_query_batches(
+        GIT_SNAPSHOTS_QUERY, dict(), database, batch_size, label="snapshot_git_snapshots"
+    ):
+        for name, captured_at, *metrics in batch:
+            package_id = name_to_id[name]
+            captured_at = np.nan if captured_at is None else float(captured_at)
+            latest = snapshot_captured_at[package_id]
+            if snapshot_mask[package_id] and not (captured_at > latest or np.isnan(latest)):
+                continue
+            snapshot_mask[package_id] = True
+            snapshot_captured_at[package_id] = captured_at
+            for metric, value in zip(SNAPSHOT_METRICS, metrics):
+                snapshot_metrics[metric][package_id] = -1 if value is None else int(value)
+
+    StringTable.from_strings(names).save(directory, "package_names")
+    StringTable.from_strings(repo_urls).save(directory, "repo_urls")
+    version_strings.save(directory, "version_strings")
+    arrays = {
+        "depends_on_indptr": depends_on_indptr,
+        "depends_on_indices": depends_on_indices,
+        "depended_by_indptr": depended_by_indptr,
+        "depended_by_indices": depended_by_indices,
+        "depends_on_in_degrees": np.asarray(depends_on_in_degrees, dtype=np.int64),
+        "version_indptr": version_indptr,
+        "version_released_at": version_released_at,
+        "snapshot_mask": snapshot_mask,
+        "snapshot_captured_at": snapshot_captured_at,
+        **{f"snapshot_{metric}": values for metric, values in snapshot_metrics.items()},
+    }
+    for name, values in arrays.items():
+        np.save(directory.joinpath(f"{name}.npy"), values)
+    directory.joinpath("meta.json").write_text(json.dumps({
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "database": database,
+        "exported_at": time.time(),
+        "package_count": package_count,
+        "dependency_edge_count": int(len(depends_on_indices)),
+        "version_count": int(len(version_released_at)),
+        "git_snapshot_count": int(snapshot_mask.sum()),
+    }, indent=2))
+    logger.info(f"{database}: snapshot written to {directory} in {time.perf_counter() - started_at:.1f}s")
+    return directory
+
+
+def snapshot_arg(args: List[str]) -> Optional[Path]:
+    """
+    The snapshot directory from `--snapshot [directory]` in a script's args, DEFAULT_SNAPSHOT_DIR if no directory
+    follows the flag, None without it
+    """
+    if "--snapshot" not in args:
+        return None
+    position = args.index("--snapshot")
+    following = args[position + 1:position + 2]
+    return Path(following[0]) if following and not following[0].startswith("--") else DEFAULT_SNAPSHOT_DIR
+
+
+def main():
+    from storage_interface.graph.neo4j_client import Neo4jClient
+
+    neo_client = Neo4jClient.shared()
+    for database in neo_client.DB_MAP.values():
+        export_snapshot(neo_client, database, DEFAULT_SNAPSHOT_DIR)
+
+
+if __name__ == '__main__':
+    main()
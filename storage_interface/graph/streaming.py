@@ -0,0 +1,95 @@
+"""
+Adapters turning Neo4jClient.stream_query_batches into DataFrames or files one batch at a time, so peak memory is
+bounded by batch_size records rather than by the size of the ecosystem.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+from loguru import logger
+from neo4j import Query
+
+from storage_interface.graph.neo4j_client import Neo4jClient
+
+
+def query_to_dataframe(
+    client: Neo4jClient,
+    cypher_query: Query,
+    query_params: Optional[Dict[str, Any]] = None,
+    database: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    batch_size: int = 10000,
+    label: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Builds the result DataFrame chunk by chunk. The raw record lists for a chunk are dropped as soon as they are
+    converted, so only the (much denser) typed frame is kept around.
+    """
+    frames: List[pd.DataFrame] = []
+    batches = client.stream_query_batches(cypher_query, query_params or dict(), database, batch_size, label=label)
+    for batch in batches:
+        frames.append(pd.DataFrame(batch, columns=columns))
+    if len(frames) == 0:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def query_to_csv(
+    client: Neo4jClient,
+    cypher_query: Query,
+    output_path: Union[str, Path],
+    query_params: Optional[Dict[str, Any]] = None,
+    database: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    header: bool = False,
+    batch_size: int = 10000,
+    label: Optional[str] = None,
+) -> int:
+    """
+    Streams the result straight to a CSV, returns the number of rows written
+    """
+    row_count = 0
+    batches = client.stream_query_batches(cypher_query, query_params or dict(), database, batch_size, label=label)
+    with Path(output_path).open("w", newline="") as csv_file:
+        for batch in batches:
+            chunk = pd.DataFrame(batch, columns=columns)
+            chunk.to_csv(csv_file, index=False, header=header and row_count == 0)
+            row_count += len(chunk)
+    logger.debug(f"Wrote {row_count} rows to {output_path}")
+    return row_count
+
+
+def query_to_parquet(
+    client: Neo4jClient,
+    cypher_query: Query,
+    output_path: Union[str, Path],
+    columns: List[str],
+    query_params: Optional[Dict[str, Any]] = None,
+    database: Optional[str] = None,
+    batch_size: int = 100000,
+    label: Optional[str] = None,
+) -> int:
+    """
+    Streams the result into a parquet file, one row group per batch. Needs pyarrow, which isn't a core requirement.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as err:
+        raise ImportError("Writing parquet requires pyarrow, install it with: pip install pyarrow") from err
+
+    row_count = 0
+    writer: Optional[pq.ParquetWriter] = None
+    batches = client.stream_query_batches(cypher_query, query_params or dict(), database, batch_size, label=label)
+    try:
+        for batch in batches:
+            table = pa.Table.from_pandas(pd.DataFrame(batch, columns=columns), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(Path(output_path).as_posix(), table.schema)
+            writer.write_table(table)
+            row_count += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    logger.debug(f"Wrote {row_count} rows to {output_path}")
+    return row_count
@@ -0,0 +1,237 @@
+"""
+Write-behind buffer in front of Neo4jClient. Producers hand over edges without waiting on the database, each one is
+appended to a local msgpack journal before being buffered, and a background thread flushes the buffer through the
+bulk inserts once it reaches flush_size records or flush_interval_seconds have passed. Once max_pending records are
+buffered (a slow or unreachable database), producers block until a flush drains the buffer.
+
+Journal segments are only deleted once everything in them has been written, so segments left behind by a crash (or
+by a database outage) are replayed the next time a BufferedWriter is opened on the same directory.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import msgpack
+from loguru import logger
+from pydantic import BaseModel
+
+import shared_models.graph_models as gm
+import shared_models.packages as pm
+from storage_interface.graph.internal_models import BulkWriteResult
+from storage_interface.graph.neo4j_client import Neo4jClient
+
+DEFAULT_JOURNAL_DIR = Path(__file__).parents[2].joinpath("dataset", "write_journal")
+
+# Flushed in this order so the nodes a dependency edge MATCHes on were written by an earlier flush step
+RECORD_KINDS: Dict[str, Type[BaseModel]] = {
+    "release": gm.ReleaseEdge,
+    "git_snapshot": gm.CapturedEdge,
+    "dep_relation": pm.ResolvedDependency,
+}
+
+JournalRecord = Tuple[str, str, Dict[str, Any]]  # (kind, database, model dump)
+
+
+class BufferedWriter:
+    """
+    The add_* methods only append to the journal and an in-memory list, they never touch the database, but they wait
+    while max_pending records are buffered. A failed flush keeps its records (and their segments) for the next
+    attempt, rows rejected by a constraint are logged and dropped the same way the bulk inserts report them.
+    """
+    def __init__(
+        self,
+        client: Optional[Neo4jClient] = None,
+        journal_dir: Path = DEFAULT_JOURNAL_DIR,
+        flush_size: int = 1000,
+        flush_interval_seconds: float = 5.0,
+        max_pending: int = 100_000,
+        fsync: bool = False,
+    ):
+        if max_pending < flush_size:
+            raise ValueError(f"max_pending ({max_pending}) must be at least flush_size ({flush_size})")
+        self.client = client or Neo4jClient.shared()
+        self.journal_dir = Path(journal_dir)
+        self.flush_size = flush_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Only one flush writes at a time
+        self._drained = threading.Condition(self._lock)  # Notified when a flush finishes, or on close
+        self._in_flight = 0  # Records taken by the running flush, still held in memory until it returns
+        self._buffer: List[JournalRecord] = []
+        self._sealed: List[Path] = []  # Segments whose records are all in _buffer or already written
+        self._segment: Optional[BinaryIO] = None
+        self._segment_path: Optional[Path] = None
+        self._closed = False
+        self._wake = threading.Event()
+
+        pending = self._existing_segments()
+        self._next_segment = int(pending[-1].stem.split("-")[1]) + 1 if len(pending) > 0 else 0
+        if len(pending) > 0:
+            self._replay(pending)
+        self._open_segment()
+        self._flusher = threading.Thread(target=self._flush_loop, name="write-buffer-flusher", daemon=True)
+        self._flusher.start()
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Producers ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def add_release(self, release: gm.ReleaseEdge, database: str):
+        self._append("release", database, release)
+
+    def add_git_snapshot(self, vcs_capture: gm.CapturedEdge, database: str):
+        self._append("git_snapshot", database, vcs_capture)
+
+    def add_dep_relation(self, resolved_dep: pm.ResolvedDependency, database: str):
+        self._append("dep_relation", database, resolved_dep)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Flushing ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def flush(self) -> BulkWriteResult:
+        """
+        Writes everything buffered so far. Raises if the database is unreachable, the records stay buffered
+        """
+        with self._flush_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+                self._rotate_segment()
+                sealed = list(self._sealed)
+                self._in_flight = len(records)
+            try:
+                result = self._write(records)
+            except Exception:
+                with self._lock:
+                    self._buffer = records + self._buffer
+                    self._in_flight = 0
+                raise
+            with self._lock:
+                self._in_flight = 0
+                self._drained.notify_all()
+            for segment_path in sealed:
+                segment_path.unlink(missing_ok=True)
+            with self._lock:
+                self._sealed = [path for path in self._sealed if path not in sealed]
+        return result
+
+    def close(self):
+        """
+        Stops the flusher and makes a final flush, if that fails the journal is left to be replayed on next open
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        with self._lock:
+            self._drained.notify_all()
+        self._flusher.join()
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                if self._segment is not None:
+                    self._segment.close()
+                    self._segment = None
+                    self._drop_if_empty(self._segment_path)
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Journal ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def _append(self, kind: str, database: str, item: BaseModel):
+        if self._closed:
+            raise RuntimeError("BufferedWriter is closed")
+        record: JournalRecord = (kind, database, item.model_dump(mode="json"))
+        packed = msgpack.packb(record, use_bin_type=True)
+        with self._lock:
+            # Backpressure: hold the producer until a flush has written what it took, a failing flush puts its
+            # records back so producers keep waiting until the database accepts them again
+            while len(self._buffer) + self._in_flight >= self.max_pending and not self._closed:
+                self._wake.set()
+                self._drained.wait()
+            if self._closed:
+                raise RuntimeError("BufferedWriter is closed")
+            self._segment.write(packed)
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self._wake.set()
+
+    def _existing_segments(self) -> List[Path]:
+        return sorted(self.journal_dir.glob("segment-*.msgpack"))
+
+    def _open_segment(self):
+        self._segment_path = self.journal_dir.joinpath(f"segment-{self._next_segment:08d}.msgpack")
+        self._next_segment += 1
+        self._segment = self._segment_path.open("ab")
+
+    def _rotate_segment(self):
+        """
+        Seals the current segment and starts a new one, called holding _lock
+        """
+        self._segment.close()
+        if not self._drop_if_empty(self._segment_path):
+            self._sealed.append(self._segment_path)
+        self._open_segment()
+
+    @staticmethod
+    def _drop_if_empty(segment_path: Path) -> bool:
+        if segment_path.stat().st_size == 0:
+            segment_path.unlink()
+            return True
+        return False
+
+    def _replay(self, segments: Sequence[Path]):
+        replayed = 0
+        for segment_path in segments:
+            with segment_path.open("rb") as segment:
+                # A crash mid append leaves a truncated last record, the unpacker stops before it
+                for kind, database, payload in msgpack.Unpacker(segment, raw=False):
+                    self._buffer.append((kind, database, payload))
+                    replayed += 1
+            self._sealed.append(segment_path)
+        logger.info(f"Replaying {replayed} journaled writes from {len(segments)} segments")
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            if self._closed:
+                return
+            try:
+                if self.pending() > 0:
+                    self.flush()
+            except Exception as err:
+                logger.warning(f"Buffered flush failed, retrying next interval: {err}")
+
+    def _write(self, records: List[JournalRecord]) -> BulkWriteResult:
+        bulk_writes: Dict[str, Callable[..., BulkWriteResult]] = {
+            "release": self.client.insert_package_releases,
+            "git_snapshot": self.client.insert_git_snapshots,
+            "dep_relation": self.client.insert_dep_relations_bulk,
+        }
+        grouped: Dict[Tuple[str, str], List[BaseModel]] = dict()
+        for kind, database, payload in records:
+            grouped.setdefault((kind, database), []).append(RECORD_KINDS[kind].model_validate(payload))
+
+        result = BulkWriteResult()
+        for kind in RECORD_KINDS:
+            for (group_kind, database), items in grouped.items():
+                if group_kind != kind:
+                    continue
+                written = bulk_writes[kind](items, database)
+                for failure in written.failures:
+                    logger.warning(f"Dropped buffered {kind} on {database}: {failure.reason}")
+                result = result.merge(written)
+        return result
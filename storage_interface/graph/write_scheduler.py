@@ -0,0 +1,240 @@
+"""
+Routes concurrent writes through a fixed pool of worker threads, partitioned by a hash of the package name each
+write locks. Writes that MERGE onto the same hot Package always land on the same worker, so they queue behind each
+other instead of deadlocking across transactions, while writes to different packages proceed in parallel.
+
+A dep relation write locks both of its packages (and, when the dependent crosses DISC_THRESHOLD, the dependent's other
+targets), so no single key serializes all of its locks. It is partitioned on the dependent, which every row locks
+first, and contention on shared targets across workers is left to the transient error retries.
+"""
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from loguru import logger
+from neo4j import exceptions
+from pydantic import BaseModel
+
+import shared_models.graph_models as gm
+import shared_models.packages as pm
+from storage_interface.graph.internal_models import BulkWriteResult, QueryResult
+from storage_interface.graph.neo4j_client import Neo4jClient
+
+T = TypeVar("T")
+
+# Deadlocks and lock timeouts surface as TransientError, the others mean the connection needs replacing
+TRANSIENT_ERRORS = (exceptions.TransientError, exceptions.ServiceUnavailable, exceptions.SessionExpired)
+_STOP = object()
+
+
+def _dependent_name(resolved_dep: pm.ResolvedDependency) -> str:
+    # The client rejects a dependency without a source, any key will do to get it there
+    return resolved_dep.source.name if resolved_dep.source is not None else resolved_dep.target_package.name
+
+
+class SchedulerStats(BaseModel):
+    submitted: int
+    completed: int
+    retried: int
+    failed: int
+    queued: int
+
+
+class _WriteJob:
+    __slots__ = ("write", "args", "kwargs", "retry", "future")
+
+    def __init__(self, write: Callable[..., Any], args: tuple, kwargs: Dict[str, Any], retry: bool = True):
+        self.write = write
+        self.args = args
+        self.kwargs = kwargs
+        self.retry = retry
+        self.future: Future = Future()
+
+
+class WriteScheduler:
+    """
+    Each worker owns a bounded queue, submit() blocks once the target queue is full so producers are slowed to the
+    rate the database can absorb rather than buffering without limit. Writes that fail with a transient error are
+    retried with exponential backoff and jitter, anything else (or running out of retries) is set on the returned
+    Future. All of the client's inserts are MERGEs, so re-running one after a partial failure is safe. The bulk inserts
+    aren't retried here, the client already runs each chunk in a managed transaction the driver retries.
+    """
+    def __init__(
+        self,
+        client: Optional[Neo4jClient] = None,
+        workers: Optional[int] = None,
+        queue_size: int = 1000,
+        max_retries: int = 5,
+        backoff_seconds: float = 0.1,
+        max_backoff_seconds: float = 5.0,
+    ):
+        self.client = client or Neo4jClient.shared()
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        worker_count = workers or os.cpu_count() or 4
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(worker_count)]
+        self._lock = threading.Lock()
+        self._closed = False
+        self._submitted = 0
+        self._completed = 0
+        self._retried = 0
+        self._failed = 0
+        self._workers = [
+            threading.Thread(target=self._work, args=(jobs,), name=f"write-worker-{index}", daemon=True)
+            for index, jobs in enumerate(self._queues)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self) -> "WriteScheduler":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Submission ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def submit(
+        self, partition_key: str, write: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs
+    ) -> "Future[T]":
+        """
+        Queues write(*args, **kwargs) on the worker owning partition_key. Blocks while that worker's queue is full,
+        raising queue.Full if timeout is given and elapses first
+        """
+        return self._submit(partition_key, _WriteJob(write, args, kwargs), timeout)
+
+    def partition(self, partition_key: str) -> int:
+        # crc32 rather than hash() so the assignment doesn't change between processes
+        return zlib.crc32(partition_key.lower().encode("utf-8")) % len(self._queues)
+
+    def insert_package(self, package: gm.Package, database: str) -> "Future[Optional[QueryResult]]":
+        return self.submit(package.name, self.client.insert_package, package, database)
+
+    def insert_package_release(self, release: gm.ReleaseEdge, database: str) -> "Future[Optional[QueryResult]]":
+        return self.submit(release.package.name, self.client.insert_package_release, release, database)
+
+    def insert_git_snapshot(self, vcs_capture: gm.CapturedEdge, database: str) -> "Future[Optional[QueryResult]]":
+        return self.submit(vcs_capture.package.name, self.client.insert_git_snapshot, vcs_capture, database)
+
+    def insert_dep_relations(
+        self, resolved_dep: pm.ResolvedDependency, database: str
+    ) -> "Future[Optional[QueryResult]]":
+        """
+        Partitioned on the dependent package, see the module docstring
+        """
+        return self.submit(_dependent_name(resolved_dep), self.client.insert_dep_relations, resolved_dep, database)
+
+    def insert_dep_relations_bulk(
+        self, resolved_deps: Sequence[pm.ResolvedDependency], database: str
+    ) -> "List[Future[BulkWriteResult]]":
+        """
+        Splits the batch by partition and queues one bulk insert per worker
+        """
+        return self._submit_split(resolved_deps, _dependent_name, self.client.insert_dep_relations_bulk, database)
+
+    def insert_package_releases(
+        self, releases: Sequence[gm.ReleaseEdge], database: str
+    ) -> "List[Future[BulkWriteResult]]":
+        return self._submit_split(
+            releases, lambda release: release.package.name, self.client.insert_package_releases, database
+        )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Lifecycle ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def flush(self):
+        """
+        Blocks until every write queued so far has completed or failed
+        """
+        for jobs in self._queues:
+            jobs.join()
+
+    def close(self, wait: bool = True):
+        if self._closed:
+            return
+        self._closed = True
+        for jobs in self._queues:
+            jobs.put(_STOP)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def stats(self) -> SchedulerStats:
+        with self._lock:
+            return SchedulerStats(
+                submitted=self._submitted,
+                completed=self._completed,
+                retried=self._retried,
+                failed=self._failed,
+                queued=sum(jobs.qsize() for jobs in self._queues),
+            )
+
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ Internal methods ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━ #
+    def _submit(self, partition_key: str, job: _WriteJob, timeout: Optional[float] = None) -> Future:
+        if self._closed:
+            raise RuntimeError("WriteScheduler is closed")
+        self._queues[self.partition(partition_key)].put(job, timeout=timeout)
+        with self._lock:
+            self._submitted += 1
+        return job.future
+
+    def _submit_split(
+        self, items: Sequence[Any], key_of: Callable[[Any], str], bulk_write: Callable[..., T], database: str
+    ) -> "List[Future[T]]":
+        partitions: Dict[int, List[Any]] = dict()
+        for item in items:
+            partitions.setdefault(self.partition(key_of(item)), []).append(item)
+        futures: List[Future] = []
+        for partition_items in partitions.values():
+            # Any key of the partition routes back to the same worker
+            job = _WriteJob(bulk_write, (partition_items, database), dict(), retry=False)
+            futures.append(self._submit(key_of(partition_items[0]), job))
+        return futures
+
+    def _work(self, jobs: queue.Queue):
+        while True:
+            job = jobs.get()
+            try:
+                if job is _STOP:
+                    return
+                if job.future.set_running_or_notify_cancel():
+                    self._run(job)
+            finally:
+                jobs.task_done()
+
+    def _run(self, job: _WriteJob):
+        attempt = 0
+        while True:
+            try:
+                result = job.write(*job.args, **job.kwargs)
+            except TRANSIENT_ERRORS as err:
+                if not job.retry or attempt >= self.max_retries:
+                    logger.warning(f"Write failed after {attempt} retries: {err}")
+                    self._finish(job, error=err)
+                    return
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+                attempt += 1
+                with self._lock:
+                    self._retried += 1
+                logger.debug(f"Transient write error, retry {attempt} in {delay:.2f}s: {err}")
+                time.sleep(random.uniform(delay / 2, delay))
+            except Exception as err:
+                self._finish(job, error=err)
+                return
+            else:
+                self._finish(job, result=result)
+                return
+
+    def _finish(self, job: _WriteJob, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(error)